@@ -21,7 +21,8 @@ import traceback
 
 from services.matrix_agent import MatrixAdvisor
 from services.agents.content_agent import ContentQualityAgent
-from models.analysis import VideoItem, VideoScore, AIAnalysisRequest, AIAnalysisResponse
+from models.analysis import VideoItem, VideoScore, AIAnalysisRequest, AIAnalysisResponse, AnalysisTaskStatus
+from services.analysis_jobs import get_analysis_job_manager
 # Phase 3: 每日复盘
 from services.review.routes import router as review_router
 
@@ -55,6 +56,7 @@ app.add_middleware(
 # 初始化 Agent
 legacy_agent = MatrixAdvisor()
 content_agent = ContentQualityAgent()
+analysis_jobs = get_analysis_job_manager(content_agent)
 
 
 # ================== 数据模型 ==================
@@ -71,6 +73,8 @@ class TaskItem(BaseModel):
 class AnalyzeRequest(BaseModel):
     """分析请求"""
     tasks: List[TaskItem]
+    use_cache: bool = True  # 是否读取 LLM 结果缓存，False 时强制重新分析
+    batch_size: Optional[int] = None  # 每次 LLM 调用评估的任务数，默认取 MATRIX_BATCH_SIZE
 
 
 class AnalysisResult(BaseModel):
@@ -107,6 +111,19 @@ class FeishuWriteRequest(BaseModel):
         "AI 建议": "optimization_advice",
         "分析理由": "reasoning"
     }
+    bulk: bool = True  # 批量模式（batch_update），False 时逐条查找并更新
+
+
+# ================== 生命周期 ==================
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """应用退出时释放资源"""
+    from services.feishu_executor import shutdown_feishu_executor
+    from services.llm_clients import close_llm_clients
+    await analysis_jobs.shutdown()
+    await close_llm_clients()
+    shutdown_feishu_executor()
 
 
 # ================== API 路由 ==================
@@ -142,7 +159,11 @@ async def analyze_schedule(request: AnalyzeRequest):
         tasks = [task.model_dump() for task in request.tasks]
 
         # 调用 Agent 分析
-        results = legacy_agent.analyze_schedule(tasks)
+        results = await legacy_agent.analyze_schedule_async(
+            tasks,
+            use_cache=request.use_cache,
+            batch_size=request.batch_size
+        )
 
         return {"status": "success", "data": results}
 
@@ -160,16 +181,26 @@ async def analyze_content(request: AIAnalysisRequest):
     视频内容层分析（新接口）
 
     分析视频内容质量，提供评分、建议和病毒指数
+    默认以后台任务执行，立即返回 task_id，通过 /api/analyze/status/{task_id} 查询进度和结果；
+    async_mode=false 时同步等待分析完成
     """
     try:
-        print(f"[API] 收到分析请求，视频数量: {len(request.videos)}")
+        print(f"[API] 收到分析请求，视频数量: {len(request.videos)}, async_mode={request.async_mode}")
 
         # 转换为字典列表
         videos = [video.model_dump() for video in request.videos]
         print(f"[API] 第一个视频数据: {videos[0] if videos else 'None'}")
 
-        # 批量分析
-        results = content_agent.batch_analyze(videos)
+        if request.async_mode:
+            job = await analysis_jobs.submit(videos, use_cache=request.use_cache)
+            return AIAnalysisResponse(
+                status="analyzing",
+                message="分析任务已提交",
+                task_id=job.task_id
+            )
+
+        # 批量分析（异步并发，不阻塞事件循环）
+        results = await content_agent.batch_analyze_async(videos, use_cache=request.use_cache)
         print(f"[API] 分析完成，结果数量: {len(results)}")
 
         # 直接返回字典，避免 VideoScore 验证问题
@@ -205,16 +236,19 @@ async def write_scores_to_feishu(request: FeishuWriteRequest):
         print(f"[API] 第一个 score: {request.scores[0] if request.scores else 'None'}")
 
         from services.feishu_writer import create_feishu_writer
+        from services.feishu_executor import run_feishu_call
 
         # 创建飞书写入服务
         writer = create_feishu_writer(request.app_id, request.app_secret)
 
-        # 批量更新
-        result = writer.batch_update_video_scores(
+        # 批量更新（飞书 SDK 为同步调用，放到线程池执行，避免阻塞事件循环）
+        result = await run_feishu_call(
+            writer.batch_update_video_scores,
             app_token=request.app_token,
             table_id=request.table_id,
             scores=request.scores,
-            field_mapping=request.field_mapping
+            field_mapping=request.field_mapping,
+            bulk=request.bulk
         )
 
         print(f"[API] 飞书写入完成: {result}")
@@ -231,19 +265,42 @@ async def write_scores_to_feishu(request: FeishuWriteRequest):
         raise HTTPException(status_code=500, detail=f"飞书写入失败: {str(e)}")
 
 
-@app.get("/api/analyze/status/{task_id}")
-async def get_analysis_status(task_id: str):
+@app.get("/api/feishu/writer-stats")
+async def get_feishu_writer_stats():
     """
-    查询分析任务状态（占位接口）
+    查询飞书写入服务池的缓存命中统计
 
-    后续可扩展为异步任务队列
+    用于观察字段表缓存和记录 ID 缓存节省的请求次数
     """
-    return {
-        "task_id": task_id,
-        "status": "completed",
-        "progress": 100,
-        "message": "分析完成"
-    }
+    from services.feishu_writer import get_writer_pool_stats
+    return get_writer_pool_stats()
+
+
+@app.get("/api/llm-cache/stats")
+async def get_llm_cache_stats():
+    """
+    查询 LLM 结果缓存统计
+
+    返回命中、未命中、写入、淘汰次数以及当前条目数和占用字节数
+    """
+    from services.llm_cache import get_llm_cache
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.get_stats()}
+
+
+@app.get("/api/analyze/status/{task_id}", response_model=AnalysisTaskStatus)
+async def get_analysis_status(task_id: str, include_results: bool = True):
+    """
+    查询分析任务状态
+
+    返回批次进度、已评分视频数、预计剩余时间，以及已完成的（部分）结果
+    """
+    job = await analysis_jobs.get_job(task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="分析任务不存在或已过期")
+    return job.to_status(include_results=include_results)
 
 
 # ================== 主程序入口 ==================
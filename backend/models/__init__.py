@@ -9,7 +9,8 @@ from .analysis import (
     AccountContext,
     VideoScore,
     AIAnalysisRequest,
-    AIAnalysisResponse
+    AIAnalysisResponse,
+    AnalysisTaskStatus
 )
 
 __all__ = [
@@ -18,4 +19,5 @@ __all__ = [
     "VideoScore",
     "AIAnalysisRequest",
     "AIAnalysisResponse",
+    "AnalysisTaskStatus",
 ]
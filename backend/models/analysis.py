@@ -57,6 +57,8 @@ class AIAnalysisRequest(BaseModel):
     """AI 分析请求"""
     videos: List[VideoItem] = Field(..., description="视频列表")
     account_context: Optional[AccountContext] = Field(None, description="账号上下文")
+    async_mode: bool = Field(True, description="是否以后台任务执行（立即返回 task_id）")
+    use_cache: bool = Field(True, description="是否读取 LLM 结果缓存（false 时强制重新分析）")
 
 
 class AIAnalysisResponse(BaseModel):
@@ -67,6 +69,21 @@ class AIAnalysisResponse(BaseModel):
     results: Optional[List[VideoScore]] = Field(None, description="分析结果列表")
 
 
+class AnalysisTaskStatus(BaseModel):
+    """AI 分析任务状态"""
+    task_id: str = Field(..., description="任务ID")
+    status: str = Field(..., description="状态: queued/analyzing/completed/error")
+    progress: int = Field(0, ge=0, le=100, description="进度百分比")
+    message: str = Field(..., description="状态消息")
+    total_videos: int = Field(0, description="视频总数")
+    videos_scored: int = Field(0, description="已完成分析的视频数")
+    total_batches: int = Field(0, description="总批次数")
+    batches_done: int = Field(0, description="已完成批次数")
+    eta_seconds: Optional[int] = Field(None, description="预计剩余时间（秒）")
+    created_at: Optional[str] = Field(None, description="创建时间")
+    results: List[dict] = Field(default_factory=list, description="已完成的分析结果（进行中为部分结果），每项的 index 为对应视频在输入中的位置")
+
+
 class AnalyzeScheduleRequest(BaseModel):
     """排期分析请求（兼容旧接口）"""
     tasks: List[dict] = Field(..., description="任务列表")
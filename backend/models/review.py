@@ -112,6 +112,7 @@ class StartReviewResponse(BaseModel):
     dataSummary: DataSummary
     agents: List[AgentType]
     estimatedTime: int = Field(10, description="预计准备时间（秒）")
+    warnings: List[str] = Field(default_factory=list, description="数据读取提示（读取失败的分组、Mock 数据等）")
 
 
 class ReviewStatusResponse(BaseModel):
@@ -142,6 +143,7 @@ class AskQuestionResponse(BaseModel):
     agent: AgentType
     answer: str
     timestamp: int
+    promptTokens: Optional[int] = Field(None, description="本次提问的估算 prompt token 数")
 
 
 # ==================== 总结模型 ====================
@@ -177,6 +179,7 @@ class ReviewSummary(BaseModel):
     keyInsights: List[str] = Field(default_factory=list)
     actionItems: List[ActionItem] = Field(default_factory=list)
     hypotheses: List[str] = Field(default_factory=list)
+    warnings: List[str] = Field(default_factory=list, description="数据读取提示，非空时本次复盘基于不完整的数据")
 
 
 class SummarizeResponse(BaseModel):
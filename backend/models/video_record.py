@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Video Record - 紧凑的视频记录类型
+飞书记录在读取时只解析一次（数值字段、完播率百分比、播放时长秒数），
+以 __slots__ 对象在统计、分析数据包和提示词之间传递，
+只在输出 JSON 时（持久化、接口响应）转换为 camelCase 字典
+"""
+import re
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_int(value: Any) -> int:
+    """解析整数（支持 "1,234" 形式），无法解析时返回 0"""
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(float(value.replace(",", "").replace("，", "").strip()))
+        except ValueError:
+            return 0
+    return 0
+
+
+def parse_percent(value: Any) -> float:
+    """
+    解析百分比为 0-100 的数值
+
+    "85.50%" -> 85.5；数值型字段中 <= 1 的值视为比例（0.855 -> 85.5）
+    """
+    if isinstance(value, bool):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value) * 100 if 0 < value <= 1 else float(value)
+    if isinstance(value, str):
+        match = _NUMBER_PATTERN.search(value)
+        if match:
+            number = float(match.group())
+            return number if "%" in value else (number * 100 if 0 < number <= 1 else number)
+    return 0.0
+
+
+def parse_seconds(value: Any) -> float:
+    """
+    解析播放时长为秒
+
+    支持 "15.30秒"、"1分30秒"、"01:30" 和数值
+    """
+    if isinstance(value, bool):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return 0.0
+    text = value.strip()
+    if ":" in text:
+        seconds = 0.0
+        for part in text.split(":"):
+            match = _NUMBER_PATTERN.search(part)
+            seconds = seconds * 60 + (float(match.group()) if match else 0.0)
+        return seconds
+    numbers = [float(n) for n in _NUMBER_PATTERN.findall(text)]
+    if not numbers:
+        return 0.0
+    if "分" in text and len(numbers) >= 2:
+        return numbers[0] * 60 + numbers[1]
+    if "分" in text and "秒" not in text:
+        return numbers[0] * 60
+    return numbers[0]
+
+
+class VideoRecord:
+    """
+    视频记录
+
+    数值字段在构建时解析完成，完播率以百分数（85.5）、平均播放时长以秒（15.3）保存，
+    发布时间以毫秒时间戳保存；完播率 / 播放时长的原始文本另行保留，转换为字典时原样输出
+    """
+
+    __slots__ = (
+        "object_id", "name", "account", "group_name",
+        "read_count", "like_count", "comment_count", "forward_count", "fav_count",
+        "full_play_rate", "avg_play_time", "full_play_rate_text", "avg_play_time_text", "publish_ms",
+        "url", "cover_url", "tags", "ai_analysis",
+    )
+
+    def __init__(
+        self,
+        object_id: str = "",
+        name: str = "",
+        account: str = "未知",
+        read_count: int = 0,
+        like_count: int = 0,
+        comment_count: int = 0,
+        forward_count: int = 0,
+        fav_count: int = 0,
+        full_play_rate: float = 0.0,
+        avg_play_time: float = 0.0,
+        publish_ms: int = 0,
+        url: str = "",
+        cover_url: str = "",
+        tags: Tuple[str, ...] = (),
+        ai_analysis: Optional[Dict[str, Any]] = None,
+        group_name: Optional[str] = None,
+        full_play_rate_text: Optional[str] = None,
+        avg_play_time_text: Optional[str] = None
+    ):
+        self.object_id = object_id
+        self.name = name
+        self.account = account
+        self.read_count = read_count
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.forward_count = forward_count
+        self.fav_count = fav_count
+        self.full_play_rate = full_play_rate
+        self.avg_play_time = avg_play_time
+        self.full_play_rate_text = full_play_rate_text
+        self.avg_play_time_text = avg_play_time_text
+        self.publish_ms = publish_ms
+        self.url = url
+        self.cover_url = cover_url
+        self.tags = tuple(tags)
+        self.ai_analysis = ai_analysis
+        self.group_name = group_name
+
+    @property
+    def interactions(self) -> int:
+        """互动数（点赞 + 评论 + 转发）"""
+        return self.like_count + self.comment_count + self.forward_count
+
+    @property
+    def engagement_rate(self) -> float:
+        """互动率（%）"""
+        return self.interactions / self.read_count * 100 if self.read_count > 0 else 0.0
+
+    @property
+    def publish_hour(self) -> int:
+        """发布小时（0-23），无发布时间时返回 -1"""
+        return datetime.fromtimestamp(self.publish_ms / 1000).hour if self.publish_ms else -1
+
+    @property
+    def publish_time(self) -> str:
+        """发布时间 HH:MM（无发布时间时为 00:00）"""
+        return datetime.fromtimestamp(self.publish_ms / 1000).strftime("%H:%M") if self.publish_ms else "00:00"
+
+    @classmethod
+    def from_feishu(
+        cls,
+        record_id: str,
+        fields: Dict[str, Any],
+        account_field: str,
+        tags: Tuple[str, ...] = (),
+        ai_analysis: Optional[Dict[str, Any]] = None
+    ) -> "VideoRecord":
+        """
+        由飞书记录字段构建（字段值已合并为字符串 / 数值）
+
+        Args:
+            record_id: 飞书记录 ID
+            fields: 记录字段
+            account_field: 账号字段名
+            tags: 已解析的标签
+            ai_analysis: 已解析的 AI 分析结果
+        """
+        full_play_rate = fields.get("完播率", "0%")
+        avg_play_time = fields.get("平均播放时长", "0秒")
+        return cls(
+            object_id=record_id,
+            name=fields.get("视频标题", ""),
+            account=fields.get(account_field, "未知"),
+            read_count=parse_int(fields.get("浏览次数", 0)),
+            like_count=parse_int(fields.get("点赞数", 0)),
+            comment_count=parse_int(fields.get("评论数", 0)),
+            forward_count=parse_int(fields.get("转发数", 0)),
+            fav_count=parse_int(fields.get("收藏数", 0)),
+            full_play_rate=parse_percent(full_play_rate),
+            avg_play_time=parse_seconds(avg_play_time),
+            full_play_rate_text=full_play_rate if isinstance(full_play_rate, str) else None,
+            avg_play_time_text=avg_play_time if isinstance(avg_play_time, str) else None,
+            publish_ms=parse_int(fields.get("发布时间", 0)),
+            url=fields.get("视频链接", ""),
+            cover_url=fields.get("封面图", ""),
+            tags=tags,
+            ai_analysis=ai_analysis,
+        )
+
+    @classmethod
+    def from_dict(cls, video: Dict[str, Any]) -> "VideoRecord":
+        """由 to_dict 格式的字典构建（持久化会话的还原、Mock 数据）"""
+        publish_ms = 0
+        create_time = video.get("createTime")
+        if create_time:
+            try:
+                publish_ms = int(datetime.strptime(create_time, "%Y-%m-%d %H:%M").timestamp() * 1000)
+            except ValueError:
+                publish_ms = 0
+        full_play_rate = video.get("fullPlayRate", "0%")
+        avg_play_time = video.get("avgPlayTimeSec", "0秒")
+        return cls(
+            object_id=video.get("objectId", ""),
+            name=video.get("name", ""),
+            account=video.get("account", "未知"),
+            read_count=parse_int(video.get("readCount", 0)),
+            like_count=parse_int(video.get("likeCount", 0)),
+            comment_count=parse_int(video.get("commentCount", 0)),
+            forward_count=parse_int(video.get("forwardCount", 0)),
+            fav_count=parse_int(video.get("favCount", 0)),
+            full_play_rate=parse_percent(full_play_rate),
+            avg_play_time=parse_seconds(avg_play_time),
+            full_play_rate_text=full_play_rate if isinstance(full_play_rate, str) else None,
+            avg_play_time_text=avg_play_time if isinstance(avg_play_time, str) else None,
+            publish_ms=publish_ms,
+            url=video.get("url", ""),
+            cover_url=video.get("coverUrl", ""),
+            tags=tuple(video.get("tags") or ()),
+            ai_analysis=video.get("aiAnalysis"),
+            group_name=video.get("groupName"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为接口使用的 camelCase 字典（输出 JSON 时调用）
+
+        fullPlayRate / avgPlayTimeSec 原样输出读取时的文本，原始值不是文本时按 "85.50%" / "15.30秒" 格式化
+        """
+        if self.publish_ms:
+            published = datetime.fromtimestamp(self.publish_ms / 1000)
+            publish_time = published.strftime("%H:%M")
+            create_time = published.strftime("%Y-%m-%d %H:%M")
+        else:
+            publish_time, create_time = "00:00", ""
+        full_play_rate = self.full_play_rate_text
+        if full_play_rate is None:
+            full_play_rate = f"{self.full_play_rate:.2f}%"
+        avg_play_time = self.avg_play_time_text
+        if avg_play_time is None:
+            avg_play_time = f"{self.avg_play_time:.2f}秒"
+
+        video = {
+            "name": self.name,
+            "account": self.account,
+            "readCount": self.read_count,
+            "likeCount": self.like_count,
+            "commentCount": self.comment_count,
+            "forwardCount": self.forward_count,
+            "favCount": self.fav_count,
+            "fullPlayRate": full_play_rate,
+            "avgPlayTimeSec": avg_play_time,
+            "url": self.url,
+            "coverUrl": self.cover_url,
+            "objectId": self.object_id,
+            "tags": list(self.tags),
+            "publishTime": publish_time,
+            "createTime": create_time,
+        }
+        if self.ai_analysis:
+            video["aiAnalysis"] = self.ai_analysis
+        if self.group_name is not None:
+            video["groupName"] = self.group_name
+        return video
+
+    def __repr__(self) -> str:
+        return f"VideoRecord({self.object_id!r}, {self.name!r}, account={self.account!r}, views={self.read_count})"
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps 的 default：VideoRecord 转换为字典，其余对象按 str 输出"""
+    if isinstance(value, VideoRecord):
+        return value.to_dict()
+    return str(value)
@@ -3,6 +3,11 @@
 Content Analysis Prompts
 视频内容分析提示词模板
 """
+from typing import Optional
+
+# 提示词模板版本：修改下方模板或 format_videos_list 的输出格式时需递增，
+# 使 LLM 结果缓存中旧模板生成的结果失效
+PROMPT_VERSION = "3"
 
 # ==================== 单个视频分析提示词 ====================
 
@@ -76,7 +81,7 @@ BATCH_ANALYSIS_PROMPT = """你是一个短视频矩阵运营专家，正在分
 - **B级** (5-6分)：一般内容，可发布或优化后再发布
 - **C级** (1-4分)：内容欠佳，不建议发布
 
-请对每个视频返回 JSON 数组格式：
+请对每个视频返回 JSON 数组格式（每个视频一条，video_id 与视频列表中的“视频ID”一致）：
 [
   {{
     "video_id": "视频ID",
@@ -106,12 +111,13 @@ BATCH_ANALYSIS_PROMPT = """你是一个短视频矩阵运营专家，正在分
 
 # ==================== 视频列表格式化函数 ====================
 
-def format_videos_list(videos_data: list) -> str:
+def format_videos_list(videos_data: list, max_description_chars: Optional[int] = None) -> str:
     """
     格式化视频列表用于 prompt
 
     Args:
         videos_data: 视频数据列表
+        max_description_chars: 描述最大字符数，None 表示不截断（由调用方按 token 预算控制）
 
     Returns:
         格式化的字符串
@@ -119,19 +125,21 @@ def format_videos_list(videos_data: list) -> str:
     result = []
     for i, video in enumerate(videos_data, 1):
         # 提取数据
-        title = video.get("title", "无标题")
-        desc = video.get("description", "")[:100]  # 限制长度
-
-        # 互动数据
-        views = video.get("views", 0)
-        likes = video.get("like_count", 0)
-        comments = video.get("comment_count", 0)
-        shares = video.get("share_count", 0)
-        favs = video.get("fav_count", 0)
+        title = video.get("title") or "无标题"
+        desc = " ".join((video.get("description") or "").split())
+        if max_description_chars is not None and len(desc) > max_description_chars:
+            desc = desc[:max_description_chars] + "…"
+
+        # 互动数据（字段可能为 None）
+        views = video.get("views") or 0
+        likes = video.get("like_count") or 0
+        comments = video.get("comment_count") or 0
+        shares = video.get("share_count") or 0
+        favs = video.get("fav_count") or 0
 
         # 播放数据
-        play_rate = video.get("full_play_rate", "0%")
-        play_time = video.get("avg_play_time", "0秒")
+        play_rate = video.get("full_play_rate") or "0%"
+        play_time = video.get("avg_play_time") or "0秒"
 
         # 计算互动率（点赞+评论+分享）/浏览量
         if views > 0:
@@ -140,8 +148,12 @@ def format_videos_list(videos_data: list) -> str:
         else:
             engagement_str = "N/A"
 
+        # 视频ID（结果按此匹配，缺失时使用序号）
+        video_id = video.get("video_id") or str(i)
+
         # 格式化单条视频信息
         video_str = f"""【视频 {i}】
+- 视频ID: {video_id}
 - 标题: {title}
 - 描述: {desc}
 - 浏览: {views} | 点赞: {likes} | 评论: {comments} | 分享: {shares} | 收藏: {favs}
@@ -3,7 +3,7 @@
 Review Agent Prompts - 每日复盘 Agent 提示词
 定义三个复盘 Agent 的 System Prompt
 """
-import json
+from services.review.analytics import get_review_analytics
 
 # ==================== 数据分析 Agent ====================
 
@@ -194,6 +194,18 @@ SUMMARIZER_USER_PROMPT_TEMPLATE = """
 请返回 JSON 格式的总结报告。
 """
 
+CHUNK_SUMMARY_PROMPT_TEMPLATE = """
+以下是【{agent_label} Agent】发言的第 {index}/{total} 段，请提炼其中的核心观点、关键数据、建议和假设。
+
+要求：
+- 保留具体数字、账号名、时间段等关键信息
+- 不要添加原文没有的内容
+- 不超过 {max_chars} 字，直接输出要点列表
+
+【原文】
+{chunk}
+"""
+
 
 # ==================== Prompt 辅助函数 ====================
 
@@ -204,14 +216,14 @@ def build_data_analyst_prompt(context: dict) -> str:
         return f"""用户向你提问：{context['user_question']}
 
 请根据你的专业角色（数据分析师）来回答这个问题。
-- 如果问题与今日数据相关，请基于以下数据回答：
-{json.dumps({k: v for k, v in context.items() if k not in ['user_question']}, ensure_ascii=False, indent=2)}
+- 如果问题与今日数据相关，请基于以下数据摘要回答：
+{context.get('question_context', '暂无数据')}
 - 如果问题是一般性咨询，请以数据分析师的专业视角给出建议
 """
 
-    # 正常的数据分析流程
-    videos = context.get("videos", [])
-    summary = context.get("summary", {})
+    # 正常的数据分析流程（统计数据来自复盘分析数据包）
+    analytics = get_review_analytics(context)
+    totals = analytics["totals"]
     date = context.get("date", "")
 
     return f"""请分析以下视频数据：
@@ -219,22 +231,25 @@ def build_data_analyst_prompt(context: dict) -> str:
 【日期】{date}
 
 【今日概览】
-- 发布视频数：{len(videos)} 条
-- 总播放量：{summary.get('total_views', 0):,}
-- 平均播放量：{summary.get('avg_views', 0):,.0f}
-- 平均互动率：{summary.get('avg_engagement_rate', 0):.2f}%
+- 发布视频数：{totals['total_videos']} 条
+- 总播放量：{totals['total_views']:,}
+- 平均播放量：{totals['avg_views']:,.0f}
+- 平均互动率：{totals['avg_engagement_rate']:.2f}%
 
 【Top 3 表现】
-{_format_top3_with_account(videos)}
+{_format_top3_with_account(analytics['top'])}
 
 【按账号统计】
-{_format_account_summary(summary.get('accounts', {}))}
+{_format_account_summary(analytics['accounts'])}
 
 【需关注的数据】
-{_format_concerns(videos)}
+{_format_concerns(analytics)}
 
 【AI 评分摘要】
-{_format_ai_summary(videos)}
+{_format_ai_summary(analytics['grade_distribution'])}
+
+【历史对比】
+{_format_history_comparison(context.get('previousReviews') or [], totals)}
 
 请按照要求输出数据分析报告。
 """
@@ -247,12 +262,13 @@ def build_strategist_prompt(context: dict) -> str:
         return f"""用户向你提问：{context['user_question']}
 
 请根据你的专业角色（排期策略专家）来回答这个问题。
-- 如果问题与排期策略相关，请基于今日数据给出专业建议
+- 如果问题与排期策略相关，请基于以下今日数据摘要给出专业建议：
+{context.get('question_context', '暂无数据')}
 - 如果问题是一般性咨询，请以策略专家的视角给出分析
 """
 
-    videos = context.get("videos", [])
-    summary = context.get("summary", {})
+    analytics = get_review_analytics(context)
+    totals = analytics["totals"]
     date = context.get("date", "")
 
     return f"""请分析今日的排期策略效果：
@@ -260,18 +276,18 @@ def build_strategist_prompt(context: dict) -> str:
 【日期】{date}
 
 【今日排期执行情况】
-- 计划发布数：{len(videos)} 条
-- 实际发布数：{len(videos)} 条
+- 计划发布数：{totals['total_videos']} 条
+- 实际发布数：{totals['total_videos']} 条
 - 完成度：100%
 
 【时段效果分析】
-{_analyze_time_slots(videos)}
+{_analyze_time_slots(analytics['time_slots'])}
 
 【账号表现对比】
-{_format_account_performance(summary.get('accounts', {}))}
+{_format_account_performance(analytics['accounts'])}
 
 【历史数据对比】
-暂无历史数据（首次运行）
+{_format_history_comparison(context.get('previousReviews') or [], totals)}
 
 请按照要求输出策略分析报告。
 """
@@ -287,9 +303,12 @@ def build_growth_hacker_prompt(context: dict) -> str:
 - 以增长黑客的思维方式回答：关注实验、假设、快速迭代
 - 提出有洞察力的观点和可验证的建议
 - 鼓励创新思维和非常规观点
+
+今日数据摘要（供参考）：
+{context.get('question_context', '暂无数据')}
 """
 
-    videos = context.get("videos", [])
+    analytics = get_review_analytics(context)
     date = context.get("date", "")
 
     return f"""请基于以下数据提出增长建议：
@@ -297,16 +316,16 @@ def build_growth_hacker_prompt(context: dict) -> str:
 【日期】{date}
 
 【关键发现】
-{_extract_key_findings(videos)}
+{_extract_key_findings(analytics)}
 
 【视频AI评分分析】
-{_format_ai_analysis_for_growth(videos)}
+{_format_ai_analysis_for_growth(analytics['ai_insights'])}
 
 【意外表现】
-{_find_unexpected_performers(videos)}
+{_find_unexpected_performers(analytics)}
 
 【昨日假设验证】
-暂无昨日假设（首次运行）
+{_format_yesterday_hypotheses(context.get('yesterdayHypotheses') or [])}
 
 【竞品/行业趋势】
 暂无行业趋势数据
@@ -316,174 +335,155 @@ def build_growth_hacker_prompt(context: dict) -> str:
 
 
 def build_summarizer_prompt(analyst_msg: str, strategist_msg: str, hacker_msg: str) -> str:
-    """构建总结 Agent 的用户提示"""
+    """构建总结 Agent 的用户提示（过长的发言应先经 build_chunk_summary_prompt 分段提炼）"""
     return SUMMARIZER_USER_PROMPT_TEMPLATE.format(
-        analyst_summary=analyst_msg[:500],  # 截取前500字符
-        strategist_summary=strategist_msg[:500],
-        hacker_summary=hacker_msg[:500]
+        analyst_summary=analyst_msg or "暂无",
+        strategist_summary=strategist_msg or "暂无",
+        hacker_summary=hacker_msg or "暂无"
+    )
+
+
+def build_chunk_summary_prompt(agent_label: str, chunk: str, index: int, total: int, max_chars: int) -> str:
+    """构建单段发言的提炼提示（总结前的 map 阶段）"""
+    return CHUNK_SUMMARY_PROMPT_TEMPLATE.format(
+        agent_label=agent_label,
+        chunk=chunk,
+        index=index,
+        total=total,
+        max_chars=max_chars
     )
 
 
 # ==================== 辅助函数 ====================
+# 以下函数的输入均来自复盘分析数据包（services/review/analytics.py），不再遍历视频列表
 
-def _format_top3_with_account(videos: list) -> str:
+def _format_top3_with_account(top: list) -> str:
     """格式化 Top3 视频（带账号信息）"""
-    sorted_videos = sorted(videos, key=lambda x: x.get("readCount", 0), reverse=True)[:3]
     result = []
-    for i, v in enumerate(sorted_videos, 1):
+    for i, v in enumerate(top[:3], 1):
         medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉"
-        account = v.get("account", "未知")
-        name = v.get("name", "未知")
-        views = v.get("readCount", 0)
-        ai_grade = v.get("aiAnalysis", {}).get("grade", "N/A")
-        result.append(f"{medal} [{account}] {name} - 播放 {views:,} - 评级 {ai_grade}")
+        result.append(f"{medal} [{v['account']}] {v['name']} - 播放 {v['views']:,} - 评级 {v['grade']}")
     return "\n".join(result) if result else "暂无数据"
 
 
-def _format_account_summary(accounts: dict) -> str:
+def _format_account_summary(accounts: list) -> str:
     """格式化账号汇总"""
     if not accounts:
         return "暂无账号数据"
     result = []
-    for acc, data in accounts.items():
-        result.append(f"- {acc}: {data['count']} 条视频, 平均播放 {data['avg_views']:,.0f}")
+    for data in accounts:
+        result.append(
+            f"- {data['account']}: {data['count']} 条视频, 平均播放 {data['avg_views']:,.0f}, "
+            f"互动率 {data['engagement_rate']:.2f}%"
+        )
     return "\n".join(result)
 
 
-def _format_ai_summary(videos: list) -> str:
+def _format_ai_summary(grade_distribution: dict) -> str:
     """格式化 AI 评分摘要"""
-    if not videos:
+    if not grade_distribution:
         return "暂无 AI 评分"
-    grades = {}
-    for v in videos:
-        grade = v.get("aiAnalysis", {}).get("grade", "N/A")
-        grades[grade] = grades.get(grade, 0) + 1
-    result = []
-    grade_order = ["S", "A", "B", "C", "N/A"]
-    for g in grade_order:
-        if g in grades:
-            result.append(f"{g} 级: {grades[g]} 条")
-    return " | ".join(result) if result else "暂无数据"
+    return " | ".join(f"{g} 级: {count} 条" for g, count in grade_distribution.items())
 
 
-def _format_account_performance(accounts: dict) -> str:
-    """格式化账号表现对比"""
+def _format_account_performance(accounts: list) -> str:
+    """格式化账号表现对比（已按平均播放量降序）"""
     if not accounts:
         return "各账号表现均衡，无明显差异"
 
-    # 按平均播放量排序
-    sorted_accounts = sorted(accounts.items(), key=lambda x: x[1].get("avg_views", 0), reverse=True)
-
     result = []
-    for i, (acc, data) in enumerate(sorted_accounts, 1):
-        avg_views = data.get("avg_views", 0)
-        count = data.get("count", 0)
-        result.append(f"{i}. {acc}: 平均 {avg_views:,.0f} 播放 ({count} 条)")
+    for i, data in enumerate(accounts, 1):
+        result.append(f"{i}. {data['account']}: 平均 {data['avg_views']:,.0f} 播放 ({data['count']} 条)")
     return "\n".join(result)
 
 
-def _format_ai_analysis_for_growth(videos: list) -> str:
+def _format_ai_analysis_for_growth(ai_insights: list) -> str:
     """为增长黑客格式化 AI 分析"""
     insights = []
-    for v in videos:
-        analysis = v.get("aiAnalysis", {})
-        if analysis:
-            grade = analysis.get("grade", "N/A")
-            score = analysis.get("overall_score", 0)
-            advice = analysis.get("optimization_advice", "")
-            name = v.get("name", "未知")
-            insights.append(f"- {name} (评分 {score:.1f}/{grade}): {advice}")
+    for v in ai_insights:
+        score = v.get("score") or 0
+        insights.append(f"- {v['name']} (评分 {score:.1f}/{v['grade']}): {v.get('advice', '')}")
     return "\n".join(insights) if insights else "暂无 AI 分析"
 
 
-def _find_unexpected_performers(videos: list) -> str:
-    """发现意外表现的视频"""
-    if len(videos) < 2:
+def _find_unexpected_performers(analytics: dict) -> str:
+    """发现意外表现的视频（评分低但播放高，或评分高但播放低）"""
+    if analytics["totals"]["total_videos"] < 2:
         return "数据不足，无法分析"
 
-    # 计算平均播放量
-    avg_views = sum(v.get("readCount", 0) for v in videos) / len(videos)
-
     unexpected = []
-    for v in videos:
-        views = v.get("readCount", 0)
-        grade = v.get("aiAnalysis", {}).get("grade", "N/A")
-        # 评分低但播放高，或评分高但播放低
-        if grade in ["C", "B"] and views > avg_views * 1.2:
-            unexpected.append(f"💡 意外成功: {v.get('name', '未知')} (评分 {grade}, 播放 {views:,})")
-        elif grade in ["S", "A"] and views < avg_views * 0.8:
-            unexpected.append(f"🔍 需关注: {v.get('name', '未知')} (评分 {grade}, 播放 {views:,})")
-
+    for v in analytics["unexpected"]:
+        label = "💡 意外成功" if v["kind"] == "surprise" else "🔍 需关注"
+        unexpected.append(f"{label}: {v['name']} (评分 {v['grade']}, 播放 {v['views']:,})")
     return "\n".join(unexpected) if unexpected else "无明显异常"
 
 
-def _calculate_avg_engagement(videos: list) -> float:
-    """计算平均互动率"""
-    if not videos:
-        return 0.0
-    total = sum((v.get("likeCount", 0) + v.get("commentCount", 0) + v.get("forwardCount", 0))
-                for v in videos)
-    views = sum(v.get("readCount", 1) for v in videos)
-    return (total / views * 100) if views > 0 else 0.0
-
-
-def _format_top3(videos: list) -> str:
-    """格式化 Top3 视频"""
-    sorted_videos = sorted(videos, key=lambda x: x.get("readCount", 0), reverse=True)[:3]
-    result = []
-    for i, v in enumerate(sorted_videos, 1):
-        medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉"
-        result.append(f"{medal} {v.get('name', '未知')} - 播放 {v.get('readCount', 0):,}")
-    return "\n".join(result) if result else "暂无数据"
-
-
-def _format_concerns(videos: list) -> str:
+def _format_concerns(analytics: dict) -> str:
     """格式化需关注的数据"""
     concerns = []
-    low_views = [v for v in videos if v.get("readCount", 0) < 1000]
-    if low_views:
-        concerns.append(f"⚠️ {len(low_views)} 条视频播放量 < 1000")
+    if analytics["low_views_count"]:
+        concerns.append(f"⚠️ {analytics['low_views_count']} 条视频播放量 < 1000")
+    for v in analytics["outliers"]["low"]:
+        concerns.append(f"⚠️ 播放明显偏低: [{v['account']}] {v['name']} - 播放 {v['views']:,}")
     return "\n".join(concerns) if concerns else "无明显问题"
 
 
-def _format_history_comparison(history: list) -> str:
-    """格式化历史对比"""
+def _format_history_comparison(history: list, totals: dict = None) -> str:
+    """格式化历史对比（history 为按日期倒序的历史复盘统计，totals 为今日统计）"""
     if not history:
         return "暂无历史数据"
-    return f"有 {len(history)} 天历史复盘记录可供参考"
 
-
-def _analyze_time_slots(videos: list) -> str:
-    """分析时段效果"""
-    # 简化实现，实际应根据 createTime 分析
-    return "🟢 19:30-20:30 时段效果最佳\n🟡 17:00-18:00 时段一般\n🔴 12:00-13:00 时段较弱"
+    result = []
+    for record in history:
+        stats = record.get("stats", {})
+        result.append(
+            f"- {record.get('date', '')}: {stats.get('total_videos', 0)} 条｜"
+            f"总播放 {stats.get('total_views', 0):,}｜平均 {stats.get('avg_views', 0):,.0f}｜"
+            f"互动率 {stats.get('avg_engagement_rate', 0):.2f}%"
+        )
+
+    # 今日与历史均值对比
+    history_avg = sum(r.get("stats", {}).get("avg_views", 0) for r in history) / len(history)
+    today_avg = (totals or {}).get("avg_views", 0)
+    if history_avg > 0 and today_avg:
+        change = (today_avg - history_avg) / history_avg * 100
+        result.append(f"今日平均播放较近 {len(history)} 天均值 {'上升' if change >= 0 else '下降'} {abs(change):.1f}%")
+
+    # 最近一次复盘的结论
+    insights = history[0].get("keyInsights") or []
+    if insights:
+        result.append(f"{history[0].get('date', '')} 复盘结论：" + "；".join(insights[:3]))
+    return "\n".join(result)
 
 
-def _analyze_accounts(videos: list) -> str:
-    """分析账号表现"""
-    return "各账号表现均衡，无明显差异"
+def _analyze_time_slots(time_slots: list) -> str:
+    """分析时段效果（已按平均播放量降序）"""
+    if not time_slots:
+        return "暂无发布时间数据"
+    result = []
+    for i, slot in enumerate(time_slots):
+        marker = "🟢" if i == 0 else "🔴" if i == len(time_slots) - 1 and len(time_slots) > 2 else "🟡"
+        result.append(
+            f"{marker} {slot['slot']}: {slot['count']} 条, 平均播放 {slot['avg_views']:,.0f}, "
+            f"互动率 {slot['engagement_rate']:.2f}%"
+        )
+    return "\n".join(result)
 
 
-def _extract_key_findings(videos: list) -> str:
+def _extract_key_findings(analytics: dict) -> str:
     """提取关键发现"""
-    if not videos:
+    top, bottom = analytics["top"], analytics["bottom"]
+    if not top:
         return "暂无数据"
-    sorted_videos = sorted(videos, key=lambda x: x.get("readCount", 0), reverse=True)
-    best = sorted_videos[0] if sorted_videos else None
-    worst = sorted_videos[-1] if sorted_videos else None
-    findings = []
-    if best:
-        findings.append(f"💡 最佳表现: {best.get('name', '未知')}")
-    if worst:
-        findings.append(f"🔍 需关注: {worst.get('name', '未知')}")
+    findings = [f"💡 最佳表现: {top[0]['name']}"]
+    worst = bottom[0] if bottom else top[-1]
+    findings.append(f"🔍 需关注: {worst['name']}")
+    for v in analytics["outliers"]["high"]:
+        if v["index"] != top[0]["index"]:
+            findings.append(f"🚀 播放明显偏高: {v['name']} - 播放 {v['views']:,}")
     return "\n".join(findings)
 
 
-def _analyze_content(video_details: list) -> str:
-    """分析内容"""
-    return f"共有 {len(video_details)} 个视频的内容可供分析"
-
-
 def _format_yesterday_hypotheses(hypotheses: list) -> str:
     """格式化昨天假设"""
     if not hypotheses:
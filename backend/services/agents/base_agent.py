@@ -7,9 +7,12 @@ import os
 import json
 from typing import Dict, Any, Optional
 from abc import ABC, abstractmethod
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
+from services.llm_clients import get_openai_client, get_async_openai_client
+from .rate_limiter import estimate_tokens, get_llm_rate_limiter
+
 load_dotenv()
 
 
@@ -18,20 +21,22 @@ class BaseAgent(ABC):
     Agent 基类
 
     提供：
-    - 统一的 LLM 客户端封装
-    - 统一的调用接口
+    - 统一的 LLM 客户端封装（同步 / 异步）
+    - 统一的调用接口（异步调用受全局并发数和 token 预算限制）
     - 降级策略（LLM 调用失败时返回默认值）
     """
 
     def __init__(self):
         """初始化 Agent"""
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
-        )
+        self.client: OpenAI = get_openai_client()
         self.model = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
         self._log_init()
 
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """当前事件循环共享的异步 LLM 客户端（复用连接池）"""
+        return get_async_openai_client()
+
     def _log_init(self):
         """记录初始化日志"""
         print(f"[{self.__class__.__name__}] 初始化完成")
@@ -56,24 +61,67 @@ class BaseAgent(ABC):
         Returns:
             解析后的字典结果
         """
-        # 构建 messages
-        messages = [{"role": "user", "content": prompt}]
+        kwargs = self._build_llm_kwargs(prompt, response_format, temperature)
 
-        # 构建 kwargs
-        kwargs = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": temperature
-        }
+        # 重试机制
+        for attempt in range(max_retries):
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+                content = response.choices[0].message.content.strip()
 
-        # 如果指定响应格式为 JSON，添加相应参数
-        if response_format == "json":
-            kwargs["response_format"] = {"type": "json_object"}
+                # 解析 JSON
+                if response_format == "json":
+                    return json.loads(content)
+                else:
+                    return {"result": content}
+
+            except json.JSONDecodeError as e:
+                print(f"[{self.__class__.__name__}] JSON 解析失败 (尝试 {attempt + 1}/{max_retries}): {e}")
+                if attempt == max_retries - 1:
+                    raise
+                continue
+
+            except Exception as e:
+                print(f"[{self.__class__.__name__}] LLM 调用失败 (尝试 {attempt + 1}/{max_retries}): {e}")
+                if attempt == max_retries - 1:
+                    # 最后一次尝试失败，返回降级结果
+                    return self._get_fallback_result()
+                continue
+
+        return self._get_fallback_result()
+
+    async def _call_llm_async(
+        self,
+        prompt: str,
+        response_format: Optional[str] = None,
+        temperature: float = 0.3,
+        max_retries: int = 3,
+        expected_completion_tokens: int = 500
+    ) -> Dict[str, Any]:
+        """
+        异步调用 LLM 并返回解析后的结果（不阻塞事件循环）
+
+        每次请求都经过全局限流器：占用一个并发槽位，并按预估 token 数扣减每分钟预算
+
+        Args:
+            prompt: 提示词
+            response_format: 响应格式，"json" 或 "text"
+            temperature: 温度参数
+            max_retries: 最大重试次数
+            expected_completion_tokens: 预估的输出 token 数（用于 token 预算）
+
+        Returns:
+            解析后的字典结果
+        """
+        kwargs = self._build_llm_kwargs(prompt, response_format, temperature)
+        estimated_tokens = estimate_tokens(prompt) + expected_completion_tokens
+        limiter = get_llm_rate_limiter()
 
         # 重试机制
         for attempt in range(max_retries):
             try:
-                response = self.client.chat.completions.create(**kwargs)
+                async with limiter.limit(estimated_tokens):
+                    response = await self.async_client.chat.completions.create(**kwargs)
                 content = response.choices[0].message.content.strip()
 
                 # 解析 JSON
@@ -97,6 +145,29 @@ class BaseAgent(ABC):
 
         return self._get_fallback_result()
 
+    def _build_llm_kwargs(
+        self,
+        prompt: str,
+        response_format: Optional[str],
+        temperature: float
+    ) -> Dict[str, Any]:
+        """构建 chat.completions.create 参数"""
+        # 构建 messages
+        messages = [{"role": "user", "content": prompt}]
+
+        # 构建 kwargs
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature
+        }
+
+        # 如果指定响应格式为 JSON，添加相应参数
+        if response_format == "json":
+            kwargs["response_format"] = {"type": "json_object"}
+
+        return kwargs
+
     def _get_fallback_result(self) -> Dict[str, Any]:
         """
         降级策略：返回默认值
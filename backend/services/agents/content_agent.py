@@ -3,10 +3,16 @@
 ContentQualityAgent - 视频内容层分析 Agent（批量优化版）
 负责按账号批量分析视频质量
 """
-from typing import Dict, Any, List
+import os
+import asyncio
+from typing import Dict, Any, List, Callable, Optional
 from collections import defaultdict
 from .base_agent import BaseAgent
-from prompts.content_prompts import VIDEO_ANALYSIS_PROMPT, BATCH_ANALYSIS_PROMPT, format_videos_list
+from .rate_limiter import estimate_tokens, get_context_window
+from services.llm_cache import LLMResultCache, get_llm_cache
+from prompts.content_prompts import (
+    VIDEO_ANALYSIS_PROMPT, BATCH_ANALYSIS_PROMPT, PROMPT_VERSION, format_videos_list
+)
 
 
 class ContentQualityAgent(BaseAgent):
@@ -18,21 +24,65 @@ class ContentQualityAgent(BaseAgent):
     - 评估发布时机合理性
     - 计算病毒传播潜力
     - 给出优化建议
+
+    分批（环境变量）：
+    - LLM_CONTEXT_WINDOW: 模型上下文窗口 token 数，默认按模型名推断
+    - LLM_MAX_OUTPUT_TOKENS: 模型单次输出 token 上限，0 表示只受上下文窗口限制（默认 0）
+    - CONTENT_BATCH_MAX_VIDEOS: 每批最多视频数（默认 50）
+    - CONTENT_DESCRIPTION_MAX_CHARS: 提示词中视频描述的最大字符数（默认 500）
     """
 
-    # 每批最多分析的视频数（防止 token 超限）
-    MAX_BATCH_SIZE = 20
+    # 每个视频预估的输出 token 数（用于 token 预算）
+    COMPLETION_TOKENS_PER_VIDEO = 200
+
+    # 分批时只使用上下文窗口的这一比例（estimate_tokens 为粗略估算，留出余量）
+    CONTEXT_HEADROOM = 0.85
+
+    # 单个视频超出预算时，描述最少保留的字符数
+    MIN_DESCRIPTION_CHARS = 50
+
+    # 降级结果的理由文本（用于识别降级结果：不缓存，也不作为批量响应接受）
+    FALLBACK_REASONING = "LLM 调用失败，使用默认评分"
+
+    # 参与缓存键计算的视频字段（video_id 不参与：内容相同的视频复用分析结果）
+    CACHE_FIELDS = (
+        "title", "description", "views", "publish_time", "account_name", "group_name",
+        "like_count", "comment_count", "share_count", "fav_count", "forward_agg_count",
+        "full_play_rate", "avg_play_time",
+    )
+
+    def __init__(self):
+        """初始化 Agent 及分批 token 预算"""
+        super().__init__()
+        self.context_window = get_context_window(self.model)
+        self.token_budget = int(self.context_window * self.CONTEXT_HEADROOM)
+        self.max_batch_videos = max(1, int(os.getenv("CONTENT_BATCH_MAX_VIDEOS", 50)))
+        max_output_tokens = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", 0))
+        if max_output_tokens > 0:
+            self.max_batch_videos = min(
+                self.max_batch_videos, max(1, max_output_tokens // self.COMPLETION_TOKENS_PER_VIDEO)
+            )
+        self.description_max_chars = max(
+            self.MIN_DESCRIPTION_CHARS, int(os.getenv("CONTENT_DESCRIPTION_MAX_CHARS", 500))
+        )
+        # 模板本身（不含视频列表）的 token 数
+        self._prompt_overhead_tokens = estimate_tokens(BATCH_ANALYSIS_PROMPT) + 50
 
-    def analyze(self, video_data: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze(self, video_data: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
         """
         分析单个视频（兼容旧接口）
 
         Args:
             video_data: 视频数据字典
+            use_cache: 是否读取 LLM 结果缓存（False 时强制重新分析，新结果仍写入缓存）
 
         Returns:
             分析结果字典
         """
+        cached = self._get_cached_result("content_single", video_data, use_cache)
+        if cached is not None:
+            return cached
+
         # 构建 prompt
         prompt = self._build_prompt(video_data)
 
@@ -42,110 +92,386 @@ class ContentQualityAgent(BaseAgent):
         # 添加 video_id
         result["video_id"] = video_data.get("video_id", "")
 
+        self._store_cached_result("content_single", video_data, result)
         return result
 
-    def batch_analyze(self, videos_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def batch_analyze(self, videos_data: List[Dict[str, Any]], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        按账号批量分析视频（同步入口，兼容旧接口）
+
+        内部用 asyncio.run 运行异步批量引擎，只能在没有运行中事件循环的线程里调用；
+        在事件循环中（如 FastAPI 路由）请直接 await batch_analyze_async
+
+        Args:
+            videos_data: 视频数据列表
+            use_cache: 是否读取 LLM 结果缓存
+
+        Returns:
+            分析结果列表（与输入顺序一致）
+
+        Raises:
+            RuntimeError: 在运行中的事件循环里调用
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.batch_analyze_async(videos_data, use_cache=use_cache))
+        raise RuntimeError(
+            "ContentQualityAgent.batch_analyze 不能在运行中的事件循环里调用，请改为 await batch_analyze_async"
+        )
+
+    async def batch_analyze_async(
+        self,
+        videos_data: List[Dict[str, Any]],
+        on_plan: Optional[Callable[[int], None]] = None,
+        on_batch_done: Optional[Callable[[List[int], List[Dict[str, Any]]], None]] = None,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
         """
-        按账号批量分析视频（优化版）
+        按账号批量分析视频（异步并发版）
 
         流程：
         1. 按账号分组
-        2. 每组按 MAX_BATCH_SIZE 分批
-        3. 批量调用 LLM 分析
+        2. 每组按 token 预算分批（_plan_batches）
+        3. 所有批次并发调用 LLM（受全局并发数和 token 预算限制）
+        4. 按输入顺序输出结果
 
         Args:
             videos_data: 视频数据列表
+            on_plan: 分批完成后回调，参数为总批次数
+            on_batch_done: 每个批次完成后回调，参数为 (视频在输入中的位置, 对应结果)
+            use_cache: 是否读取 LLM 结果缓存（命中缓存的视频不再发送给 LLM）
 
         Returns:
-            分析结果列表
+            分析结果列表（与输入顺序一致）
         """
         if not videos_data:
             return []
 
-        # 1. 按账号分组
+        # 1. 按账号分组（记录视频在输入中的位置）
         account_groups = defaultdict(list)
-        for video in videos_data:
+        for index, video in enumerate(videos_data):
             account = video.get("account_name", "unknown")
-            account_groups[account].append(video)
+            account_groups[account].append(index)
 
         print(f"[ContentQualityAgent] 按账号分组: {len(account_groups)} 个账号")
-        for account, videos in account_groups.items():
-            print(f"  - {account}: {len(videos)} 个视频")
-
-        # 2. 每组分批分析
-        all_results = []
-        for account, videos in account_groups.items():
-            print(f"\n[ContentQualityAgent] 开始分析账号: {account}")
-
-            # 按批次大小分组
-            for i in range(0, len(videos), self.MAX_BATCH_SIZE):
-                batch = videos[i:i + self.MAX_BATCH_SIZE]
-                batch_num = i // self.MAX_BATCH_SIZE + 1
-                total_batches = (len(videos) + self.MAX_BATCH_SIZE - 1) // self.MAX_BATCH_SIZE
-
-                print(f"  批次 {batch_num}/{total_batches}: {len(batch)} 个视频")
-
-                try:
-                    batch_results = self._analyze_batch(batch, account)
-                    all_results.extend(batch_results)
-                    print(f"    完成 {len(batch_results)} 个视频分析")
-                except Exception as e:
-                    print(f"    批次分析失败: {e}")
-                    # 降级：逐个分析
-                    for video in batch:
-                        try:
-                            result = self.analyze(video)
-                            all_results.append(result)
-                        except Exception as e2:
-                            print(f"      视频 {video.get('video_id')} 分析失败: {e2}")
-                            all_results.append(self._get_fallback_result(video.get("video_id", "")))
+        for account, indices in account_groups.items():
+            print(f"  - {account}: {len(indices)} 个视频")
+
+        # 2. 每组按 token 预算分批
+        jobs = []
+        for account, indices in account_groups.items():
+            batches = self._plan_batches(videos_data, indices)
+            for batch_num, batch_indices in enumerate(batches, 1):
+                jobs.append((account, batch_indices, batch_num, len(batches)))
+
+        print(
+            f"[ContentQualityAgent] 共 {len(jobs)} 个批次，并发执行"
+            f"（上下文窗口 {self.context_window} tokens，每批最多 {self.max_batch_videos} 个视频）"
+        )
+        if on_plan:
+            on_plan(len(jobs))
+
+        async def run_job(account: str, indices: List[int], batch_num: int, total_batches: int) -> List[Dict[str, Any]]:
+            results = await self._run_batch(videos_data, account, indices, batch_num, total_batches, use_cache)
+            if on_batch_done:
+                on_batch_done(indices, results)
+            return results
+
+        # 3. 并发执行所有批次
+        batch_results = await asyncio.gather(*[
+            run_job(account, indices, batch_num, total_batches)
+            for account, indices, batch_num, total_batches in jobs
+        ])
+
+        # 4. 按输入顺序还原
+        all_results: List[Dict[str, Any]] = [None] * len(videos_data)
+        for (_, indices, _, _), results in zip(jobs, batch_results):
+            for index, result in zip(indices, results):
+                all_results[index] = result
 
         print(f"\n[ContentQualityAgent] 分析完成: 共 {len(all_results)} 个视频")
         return all_results
 
-    def _analyze_batch(self, videos: List[Dict[str, Any]], account_name: str) -> List[Dict[str, Any]]:
+    def _plan_batches(self, videos_data: List[Dict[str, Any]], indices: List[int]) -> List[List[int]]:
+        """
+        按 token 预算把同一账号的视频装入批次
+
+        每个视频的成本 = 其在视频列表中的 prompt token 数 + COMPLETION_TOKENS_PER_VIDEO，
+        按输入顺序依次装入，超过 token_budget 或 max_batch_videos 时开启新批次；
+        单个视频超出预算时单独成批（构建 prompt 时截短描述）
+
+        Args:
+            videos_data: 视频数据列表
+            indices: 该账号视频在输入中的位置
+
+        Returns:
+            批次列表，每个批次为视频位置列表
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = self._prompt_overhead_tokens
+        for index in indices:
+            cost = (
+                estimate_tokens(format_videos_list([videos_data[index]], self.description_max_chars))
+                + self.COMPLETION_TOKENS_PER_VIDEO
+            )
+            if current and (current_tokens + cost > self.token_budget or len(current) >= self.max_batch_videos):
+                batches.append(current)
+                current, current_tokens = [], self._prompt_overhead_tokens
+            current.append(index)
+            current_tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _run_batch(
+        self,
+        videos_data: List[Dict[str, Any]],
+        account: str,
+        indices: List[int],
+        batch_num: int,
+        total_batches: int,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        执行单个批次（缺失 / 无效的结果在 _analyze_batch_async 中合并重试一次），
+        仍失败的视频使用降级结果
+
+        Returns:
+            与 indices 一一对应的分析结果列表
+        """
+        batch = [videos_data[i] for i in indices]
+        print(f"  [{account}] 批次 {batch_num}/{total_batches}: {len(batch)} 个视频")
+
+        try:
+            results = await self._analyze_batch_async(batch, account, use_cache)
+            print(f"    [{account}] 批次 {batch_num} 完成 {len(batch)} 个视频分析")
+            return results
+
+        except Exception as e:
+            print(f"    [{account}] 批次 {batch_num} 分析失败: {e}")
+            return [self._get_fallback_result(video.get("video_id", "")) for video in batch]
+
+    async def _analyze_batch_async(
+        self,
+        videos: List[Dict[str, Any]],
+        account_name: str,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
         """
         批量分析同一账号的视频
 
+        命中缓存的视频直接复用结果，只把未命中的视频发送给 LLM；
+        LLM 结果按 video_id 匹配，缺失或无效的视频合并为一个更小的批次重试一次
+
         Args:
             videos: 视频数据列表
             account_name: 账号名
+            use_cache: 是否读取 LLM 结果缓存
 
         Returns:
-            分析结果列表
+            分析结果列表（与 videos 一一对应）
+        """
+        # 缓存读写是同步 SQLite 操作，放到线程中执行，避免阻塞事件循环
+        cached = await asyncio.to_thread(
+            lambda: [self._get_cached_result("content_batch", video, use_cache) for video in videos]
+        )
+        missing = [video for video, result in zip(videos, cached) if result is None]
+        if not missing:
+            return cached
+
+        results = await self._request_batch_async(missing, account_name)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            print(f"    [{account_name}] {len(pending)}/{len(missing)} 个视频结果缺失或无效，重试一次")
+            retried = await self._request_batch_async([missing[i] for i in pending], account_name)
+            for i, result in zip(pending, retried):
+                results[i] = result
+
+        return await asyncio.to_thread(self._merge_batch_results, videos, cached, results)
+
+    async def _request_batch_async(
+        self,
+        videos: List[Dict[str, Any]],
+        account_name: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        发送一次批量分析请求
+
+        Returns:
+            与 videos 一一对应的结果，缺失 / 无效 / 请求失败的位置为 None
+        """
+        try:
+            # 调用 LLM（期望返回 JSON 数组）
+            response = await self._call_llm_async(
+                self._build_batch_prompt(videos, account_name),
+                response_format="json",
+                expected_completion_tokens=self.COMPLETION_TOKENS_PER_VIDEO * len(videos)
+            )
+            return self._parse_batch_response(response, videos)
+        except Exception as e:
+            print(f"    [{account_name}] 批量请求失败（{len(videos)} 个视频）: {e}")
+            return [None] * len(videos)
+
+    def _merge_batch_results(
+        self,
+        videos: List[Dict[str, Any]],
+        cached: List[Optional[Dict[str, Any]]],
+        results: List[Optional[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        合并缓存结果与 LLM 新结果（与 videos 一一对应），并写入缓存
+
+        Args:
+            videos: 视频数据列表
+            cached: 缓存结果（未命中为 None）
+            results: 与未命中视频一一对应的 LLM 结果（_parse_batch_response 的输出）
+
+        仍缺失的视频使用降级结果（不写入缓存）
+        """
+        fresh = iter(results)
+        merged = []
+        for video, result in zip(videos, cached):
+            if result is None:
+                result = next(fresh, None)
+                if result is None:
+                    result = self._get_fallback_result(video.get("video_id", ""))
+                else:
+                    self._store_cached_result("content_batch", video, result)
+            merged.append(result)
+        return merged
+
+    def _cache_key(self, namespace: str, video: Dict[str, Any]) -> str:
+        """按模型、提示词版本和归一化后的视频字段生成缓存键"""
+        payload = {}
+        for field in self.CACHE_FIELDS:
+            value = video.get(field)
+            if isinstance(value, str):
+                # 归一化空白，避免仅空格/换行不同导致缓存未命中
+                value = " ".join(value.split())
+            payload[field] = value
+        return LLMResultCache.make_key(namespace, self.model, PROMPT_VERSION, payload)
+
+    def _get_cached_result(
+        self,
+        namespace: str,
+        video: Dict[str, Any],
+        use_cache: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """读取缓存的分析结果，未启用缓存或未命中返回 None"""
+        cache = get_llm_cache() if use_cache else None
+        if cache is None:
+            return None
+        result = cache.get(self._cache_key(namespace, video))
+        if result is not None:
+            result["video_id"] = video.get("video_id", "")
+        return result
+
+    def _store_cached_result(self, namespace: str, video: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """写入分析结果缓存（降级结果和格式不完整的结果不缓存）"""
+        cache = get_llm_cache()
+        if cache is None or not isinstance(result, dict) or "overall_score" not in result:
+            return
+        if result.get("reasoning") == self.FALLBACK_REASONING:
+            return
+        value = {k: v for k, v in result.items() if k != "video_id"}
+        cache.set(self._cache_key(namespace, video), namespace, value)
+
+    def _build_batch_prompt(self, videos: List[Dict[str, Any]], account_name: str) -> str:
+        """
+        构建批量分析 prompt
+
+        prompt 加预期输出超出 token_budget 时（如单个视频描述过长）逐步截短描述，
+        最短保留 MIN_DESCRIPTION_CHARS 个字符
         """
         # 获取分组名（从第一个视频中获取）
         group_name = videos[0].get("group_name", "未知")
+        prompt_budget = self.token_budget - self.COMPLETION_TOKENS_PER_VIDEO * len(videos)
+
+        description_chars = self.description_max_chars
+        while True:
+            # 格式化视频列表并构建批量分析 prompt
+            prompt = BATCH_ANALYSIS_PROMPT.format(
+                account_name=account_name,
+                group_name=group_name,
+                video_count=len(videos),
+                videos_list=format_videos_list(videos, description_chars)
+            )
+            if estimate_tokens(prompt) <= prompt_budget or description_chars <= self.MIN_DESCRIPTION_CHARS:
+                return prompt
+            description_chars = max(self.MIN_DESCRIPTION_CHARS, description_chars // 2)
+
+    def _parse_batch_response(
+        self,
+        response: Any,
+        videos: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        解析批量分析的 LLM 响应，按 video_id 与输入视频对齐
 
-        # 格式化视频列表
-        videos_list = format_videos_list(videos)
-
-        # 构建批量分析 prompt
-        prompt = BATCH_ANALYSIS_PROMPT.format(
-            account_name=account_name,
-            group_name=group_name,
-            video_count=len(videos),
-            videos_list=videos_list
-        )
+        - 结果按 video_id 匹配（与 format_videos_list 中的“视频ID”一致，重复 ID 按出现顺序依次匹配）
+        - 没有可识别 video_id 的结果，仅在返回条数与输入一致时按位置补到对应的空位
+        - 格式不完整的结果视为无效
 
-        # 调用 LLM（期望返回 JSON 数组）
-        response = self._call_llm(prompt, response_format="json")
+        Returns:
+            与 videos 一一对应的结果，缺失或无效的位置为 None
 
-        # 确保返回的是列表
+        Raises:
+            ValueError: 响应中找不到结果列表
+        """
+        # JSON 模式下模型通常把数组包在对象里（如 {"results": [...]}）
         if isinstance(response, list):
-            results = response
-        elif isinstance(response, dict) and "results" in response:
-            results = response["results"]
+            items = response
+        elif isinstance(response, dict) and isinstance(response.get("results"), list):
+            items = response["results"]
+        elif isinstance(response, dict) and "overall_score" in response and len(videos) == 1:
+            items = [response]
+        elif isinstance(response, dict) and any(isinstance(v, list) for v in response.values()):
+            items = next(v for v in response.values() if isinstance(v, list))
         else:
             raise ValueError(f"Unexpected response format: {type(response)}")
 
-        # 添加 video_id（确保与输入对应）
-        for i, result in enumerate(results):
-            if i < len(videos):
-                result["video_id"] = videos[i].get("video_id", "")
-
+        # prompt 中的视频ID -> 视频位置（按出现顺序）
+        positions: Dict[str, List[int]] = defaultdict(list)
+        for i, video in enumerate(videos):
+            positions[str(video.get("video_id") or i + 1)].append(i)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(videos)
+        unmatched = []
+        for item_index, item in enumerate(items):
+            if not self._is_valid_result(item):
+                continue
+            slots = positions.get(str(item.get("video_id", "")).strip())
+            if slots:
+                results[slots.pop(0)] = item
+            else:
+                unmatched.append((item_index, item))
+
+        if len(items) == len(videos):
+            for item_index, item in unmatched:
+                if results[item_index] is None:
+                    results[item_index] = item
+
+        for video, result in zip(videos, results):
+            if result is not None:
+                result["video_id"] = video.get("video_id", "")
         return results
 
+    def _is_valid_result(self, result: Any) -> bool:
+        """
+        单条分析结果是否完整可用（评分为 0-10 的数值且有评级）
+
+        重试耗尽时 _call_llm_async 返回的降级结果同样带有评分和评级，需要按理由文本排除，
+        否则单视频批次会把它当作模型结果接受（并跳过重试）
+        """
+        if not isinstance(result, dict) or result.get("reasoning") == self.FALLBACK_REASONING:
+            return False
+        score = result.get("overall_score")
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 10:
+            return False
+        return isinstance(result.get("grade"), str) and bool(result["grade"].strip())
+
     def _build_prompt(self, video_data: Dict[str, Any]) -> str:
         """
         构建单个视频分析提示词（兼容旧接口）
@@ -179,7 +505,7 @@ class ContentQualityAgent(BaseAgent):
             },
             "grade": "C",
             "optimization_advice": "AI 分析服务暂时不可用",
-            "reasoning": "LLM 调用失败，使用默认评分",
+            "reasoning": self.FALLBACK_REASONING,
             "suggested_publish_time": None,
             "viral_index": 0.0
         }
@@ -223,7 +549,7 @@ if __name__ == "__main__":
     print("测试 ContentQualityAgent 批量分析")
     print("=" * 60)
     print(f"总视频数: {len(test_videos)}")
-    print(f"预期批次数: ~2-3 批（按账号分组，每批最多 20 个）\n")
+    print(f"预期批次数: 每个账号按 token 预算分批（上下文窗口 {agent.context_window} tokens）\n")
 
     results = agent.batch_analyze(test_videos)
 
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Rate Limiter - LLM 调用限流
+全局并发数 + 每分钟 token 预算（令牌桶）
+"""
+import os
+import re
+import time
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数
+
+    中日韩字符约 1 字 1 token，其余字符约 4 字符 1 token
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff" or "\u3000" <= ch <= "\u30ff")
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+# 常见模型的上下文窗口（token），按模型名前缀匹配，越具体的前缀越靠前
+MODEL_CONTEXT_WINDOWS = (
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo", 16385),
+    ("deepseek", 64000),
+    ("qwen", 32768),
+    ("glm-4", 128000),
+)
+
+# 未知模型的默认上下文窗口
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+def get_context_window(model: str) -> int:
+    """
+    获取模型的上下文窗口（token）
+
+    优先使用 LLM_CONTEXT_WINDOW；其次解析模型名中的窗口标记（如 moonshot-v1-8k、-32k、-128k）；
+    再按 MODEL_CONTEXT_WINDOWS 前缀匹配；都无法确定时返回 DEFAULT_CONTEXT_WINDOW
+    """
+    configured = int(os.getenv("LLM_CONTEXT_WINDOW", 0))
+    if configured > 0:
+        return configured
+
+    name = (model or "").lower()
+    match = re.search(r"(\d+)k\b", name)
+    if match:
+        return int(match.group(1)) * 1024
+    for prefix, window in MODEL_CONTEXT_WINDOWS:
+        if name.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+class LLMRateLimiter:
+    """
+    LLM 调用限流器
+
+    - max_concurrency: 同时进行的 LLM 请求数上限
+    - tokens_per_minute: 每分钟 token 预算，<= 0 表示不限制
+    """
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int = 0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lock = asyncio.Lock()
+        self._available = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        """按经过的时间补充令牌"""
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._available = min(
+            float(self.tokens_per_minute),
+            self._available + elapsed * self.tokens_per_minute / 60
+        )
+
+    async def _acquire_tokens(self, tokens: int) -> None:
+        """等待直到 token 预算足够（先到先得）"""
+        if self.tokens_per_minute <= 0:
+            return
+        # 单次请求超过整分钟预算时按整分钟预算扣减，避免永久等待
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._available >= tokens:
+                    self._available -= tokens
+                    return
+                await asyncio.sleep((tokens - self._available) * 60 / self.tokens_per_minute)
+
+    @asynccontextmanager
+    async def limit(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """
+        占用一个并发槽位并扣减 token 预算
+
+        Args:
+            estimated_tokens: 本次调用预估的 prompt + completion token 数
+        """
+        async with self._semaphore:
+            await self._acquire_tokens(estimated_tokens)
+            yield
+
+
+# 每个事件循环一个限流器（asyncio 原语不能跨事件循环使用）
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMRateLimiter]" = weakref.WeakKeyDictionary()
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """
+    获取当前事件循环的全局 LLM 限流器
+
+    并发上限由 LLM_MAX_CONCURRENCY 控制（默认 4），
+    每分钟 token 预算由 LLM_TOKENS_PER_MINUTE 控制（默认 0，不限制）
+    """
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = LLMRateLimiter(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+            tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", 0))
+        )
+        _limiters[loop] = limiter
+    return limiter
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Jobs - 内容分析后台任务队列
+/api/analyze/content 提交任务后立即返回 task_id，
+由有界 worker 池在后台执行，/api/analyze/status/{task_id} 查询真实进度
+
+任务在提交它的进程内执行；多 worker 部署时通过 ANALYSIS_JOB_BACKEND=sqlite / redis
+把任务状态和部分结果写入共享存储（复用复盘会话的存储实现），任意 worker 都能查询
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+import traceback
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set
+from dotenv import load_dotenv
+
+from services.review.session_store import SessionStore, SQLiteSessionStore, RedisSessionStore
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisJob:
+    """内容分析任务"""
+
+    def __init__(self, task_id: str, videos: List[Dict[str, Any]], use_cache: bool = True):
+        """
+        初始化任务
+
+        Args:
+            task_id: 任务 ID
+            videos: 待分析的视频列表
+            use_cache: 是否读取 LLM 结果缓存
+        """
+        self.task_id = task_id
+        self.videos = videos
+        self.use_cache = use_cache
+        self.total_videos = len(videos)
+        self.status = "queued"
+        self.total_batches = 0
+        self.batches_done = 0
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(videos)
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def on_plan(self, total_batches: int) -> None:
+        """记录总批次数"""
+        self.total_batches = total_batches
+
+    def on_batch_done(self, indices: List[int], results: List[Dict[str, Any]]) -> None:
+        """记录单个批次的结果"""
+        for index, result in zip(indices, results):
+            self.results[index] = result
+        self.batches_done += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可持久化的字典（不含输入视频）"""
+        return {
+            "task_id": self.task_id,
+            "use_cache": self.use_cache,
+            "total_videos": self.total_videos,
+            "status": self.status,
+            "total_batches": self.total_batches,
+            "batches_done": self.batches_done,
+            "results": self.results,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisJob":
+        """从共享存储还原任务（只用于查询状态，不含输入视频）"""
+        job = cls(data["task_id"], [], data.get("use_cache", True))
+        job.total_videos = data.get("total_videos", 0)
+        job.status = data.get("status", "queued")
+        job.total_batches = data.get("total_batches", 0)
+        job.batches_done = data.get("batches_done", 0)
+        job.results = data.get("results") or [None] * job.total_videos
+        job.error = data.get("error")
+        job.created_at = data.get("created_at", job.created_at)
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        return job
+
+    @property
+    def videos_scored(self) -> int:
+        """已完成分析的视频数"""
+        return sum(1 for r in self.results if r is not None)
+
+    def get_eta_seconds(self) -> Optional[int]:
+        """按已完成批次的平均耗时估算剩余时间"""
+        if self.status != "analyzing" or not self.started_at or not self.batches_done:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = self.total_batches - self.batches_done
+        return int(elapsed / self.batches_done * remaining)
+
+    def to_status(self, include_results: bool = True) -> Dict[str, Any]:
+        """转换为状态查询响应"""
+        videos_scored = self.videos_scored
+        if self.status == "completed":
+            progress = 100
+        elif self.total_batches:
+            progress = int(self.batches_done / self.total_batches * 100)
+        else:
+            progress = 0
+
+        messages = {
+            "queued": "排队中",
+            "analyzing": f"分析中 {self.batches_done}/{self.total_batches} 批",
+            "completed": "分析完成",
+            "error": f"分析失败: {self.error}",
+        }
+
+        status = {
+            "task_id": self.task_id,
+            "status": self.status,
+            "progress": progress,
+            "message": messages.get(self.status, self.status),
+            "total_videos": self.total_videos,
+            "videos_scored": videos_scored,
+            "total_batches": self.total_batches,
+            "batches_done": self.batches_done,
+            "eta_seconds": self.get_eta_seconds(),
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+        }
+        if include_results:
+            # 进行中返回已完成的部分结果（按输入顺序），index 为结果对应视频在输入中的位置
+            status["results"] = [{**r, "index": i} for i, r in enumerate(self.results) if r is not None]
+        return status
+
+
+class AnalysisJobManager:
+    """
+    内容分析任务管理器
+
+    负责：
+    - 任务排队与有界 worker 池调度
+    - 进度跟踪（配置共享存储时同步写入，供其他 worker 查询）
+    - 过期任务清理
+    """
+
+    def __init__(
+        self,
+        agent,
+        max_workers: int = 2,
+        job_ttl: float = 3600,
+        store: Optional[SessionStore] = None
+    ):
+        """
+        初始化管理器
+
+        Args:
+            agent: ContentQualityAgent 实例
+            max_workers: 同时执行的任务数上限
+            job_ttl: 已结束任务的保留时长（秒）
+            store: 多 worker 共享的任务状态存储，None 时任务只在本进程内可查
+        """
+        self.agent = agent
+        self.max_workers = max(1, max_workers)
+        self.job_ttl = job_ttl
+        self.store = store
+        self.jobs: Dict[str, AnalysisJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # 进行中的状态写入任务（持有引用，避免被回收）
+        self._persist_tasks: Set[asyncio.Task] = set()
+
+    def _ensure_workers(self) -> None:
+        """在当前事件循环中按需启动 worker"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.max_workers:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        """worker：循环从队列中取出任务执行"""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: AnalysisJob) -> None:
+        """执行单个任务"""
+        job.status = "analyzing"
+        job.started_at = time.time()
+        logger.info(f"[AnalysisJobs] 开始任务 {job.task_id}，视频数: {job.total_videos}")
+        await self._persist(job)
+
+        def on_plan(total_batches: int) -> None:
+            job.on_plan(total_batches)
+            self._schedule_persist(job)
+
+        def on_batch_done(indices: List[int], results: List[Dict[str, Any]]) -> None:
+            job.on_batch_done(indices, results)
+            self._schedule_persist(job)
+
+        try:
+            results = await self.agent.batch_analyze_async(
+                job.videos,
+                on_plan=on_plan,
+                on_batch_done=on_batch_done,
+                use_cache=job.use_cache
+            )
+            job.results = results
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"[AnalysisJobs] 任务 {job.task_id} 失败: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished_at = time.time()
+            # 释放输入数据，只保留结果
+            job.videos = []
+            logger.info(f"[AnalysisJobs] 任务 {job.task_id} 结束: {job.status}, "
+                        f"耗时 {job.finished_at - job.started_at:.1f}s")
+            await self._persist(job)
+
+    async def _persist(self, job: AnalysisJob) -> None:
+        """把任务状态写入共享存储（未配置时跳过；同一任务的写入按调用顺序串行）"""
+        if self.store is None:
+            return
+        try:
+            await self.store.save_async(job.task_id, job)
+        except Exception as e:
+            logger.warning(f"[AnalysisJobs] 任务 {job.task_id} 状态写入共享存储失败: {e}")
+
+    def _schedule_persist(self, job: AnalysisJob) -> None:
+        """在同步回调中安排一次状态写入"""
+        if self.store is None:
+            return
+        task = asyncio.create_task(self._persist(job))
+        self._persist_tasks.add(task)
+        task.add_done_callback(self._persist_tasks.discard)
+
+    async def submit(self, videos: List[Dict[str, Any]], use_cache: bool = True) -> AnalysisJob:
+        """
+        提交分析任务（需在事件循环中调用）
+
+        Args:
+            videos: 待分析的视频列表
+            use_cache: 是否读取 LLM 结果缓存
+
+        Returns:
+            AnalysisJob 实例
+        """
+        self._purge_expired()
+        self._ensure_workers()
+
+        task_id = f"ana_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        job = AnalysisJob(task_id, videos, use_cache)
+        self.jobs[task_id] = job
+        await self._persist(job)
+        self._queue.put_nowait(job)
+        logger.info(f"[AnalysisJobs] 任务已排队 {task_id}，队列长度: {self._queue.qsize()}")
+        return job
+
+    async def get_job(self, task_id: str) -> Optional[AnalysisJob]:
+        """获取任务：本进程提交的任务直接返回，否则从共享存储读取（由其他 worker 执行）"""
+        job = self.jobs.get(task_id)
+        if job is None and self.store is not None:
+            job = await self.store.get_async(task_id)
+        return job
+
+    def _purge_expired(self) -> None:
+        """清理已结束且超过保留时长的任务"""
+        now = time.time()
+        expired = [
+            task_id for task_id, job in self.jobs.items()
+            if job.finished_at and now - job.finished_at > self.job_ttl
+        ]
+        for task_id in expired:
+            del self.jobs[task_id]
+
+    async def shutdown(self) -> None:
+        """取消所有 worker，等待未完成的状态写入并关闭共享存储（应用退出时调用）"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await asyncio.gather(*self._persist_tasks, return_exceptions=True)
+        if self.store is not None:
+            self.store.close()
+
+
+def create_job_store(job_ttl: float) -> Optional[SessionStore]:
+    """
+    按配置创建多 worker 共享的任务状态存储
+
+    ANALYSIS_JOB_BACKEND: memory（默认，只在本进程内，返回 None）/ sqlite / redis
+    - sqlite：ANALYSIS_JOB_PATH（默认 backend/data/analysis_jobs.sqlite3）
+    - redis：ANALYSIS_REDIS_URL（默认与 REVIEW_REDIS_URL 相同）
+
+    共享存储中的任务在 job_ttl 内无人查询或更新后过期
+    """
+    backend = os.getenv("ANALYSIS_JOB_BACKEND", "memory").lower()
+
+    if backend == "sqlite":
+        db_path = os.getenv(
+            "ANALYSIS_JOB_PATH",
+            os.path.join(os.path.dirname(__file__), "..", "data", "analysis_jobs.sqlite3")
+        )
+        logger.info(f"[AnalysisJobs] 使用 SQLite 任务存储: {db_path}")
+        return SQLiteSessionStore(db_path, AnalysisJob.from_dict, idle_ttl=job_ttl)
+
+    if backend == "redis":
+        url = os.getenv("ANALYSIS_REDIS_URL", os.getenv("REVIEW_REDIS_URL", "redis://localhost:6379/0"))
+        logger.info(f"[AnalysisJobs] 使用 Redis 任务存储: {url}")
+        return RedisSessionStore.from_url(
+            url, AnalysisJob.from_dict, idle_ttl=job_ttl, prefix="video_ops:analysis_job:"
+        )
+
+    if backend != "memory":
+        logger.warning(f"[AnalysisJobs] 未知的 ANALYSIS_JOB_BACKEND={backend}，任务只在本进程内可查")
+    return None
+
+
+# 全局单例
+_job_manager: Optional[AnalysisJobManager] = None
+
+
+def get_analysis_job_manager(agent=None) -> AnalysisJobManager:
+    """
+    获取内容分析任务管理器单例
+
+    worker 数由 ANALYSIS_MAX_WORKERS 控制（默认 2），
+    已结束任务保留时长由 ANALYSIS_JOB_TTL 控制（默认 3600 秒），
+    共享存储由 ANALYSIS_JOB_BACKEND 控制（见 create_job_store）
+    """
+    global _job_manager
+    if _job_manager is None:
+        if agent is None:
+            from services.agents.content_agent import ContentQualityAgent
+            agent = ContentQualityAgent()
+        job_ttl = float(os.getenv("ANALYSIS_JOB_TTL", 3600))
+        _job_manager = AnalysisJobManager(
+            agent,
+            max_workers=int(os.getenv("ANALYSIS_MAX_WORKERS", 2)),
+            job_ttl=job_ttl,
+            store=create_job_store(job_ttl)
+        )
+    return _job_manager
@@ -4,16 +4,42 @@ Feishu Data Service - 飞书数据获取服务
 从飞书获取视频数据，支持按日期筛选
 """
 import os
+import asyncio
 import logging
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
+from models.video_record import VideoRecord
+from services.video_stats import VideoStats
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+def describe_fetch_warnings(report: Dict[str, Any]) -> List[str]:
+    """
+    把分组读取报告转换为面向用户的提示（失败 / 超时 / 跳过的分组，以及是否使用了 Mock 数据）
+
+    Args:
+        report: fetch_group_videos 返回的分组读取报告
+
+    Returns:
+        提示文本列表，全部成功时为空
+    """
+    warnings = []
+    for group in report.get("failed", []):
+        reason = "读取超时" if group["status"] == "timeout" else "读取失败"
+        partial = f"，仅获取到 {group['count']} 条" if group.get("count") else ""
+        warnings.append(f"分组「{group['group']}」{reason}（{group.get('error', '')}）{partial}，数据不完整")
+    for group_name in report.get("skipped", []):
+        warnings.append(f"分组「{group_name}」缺少 baseToken 或 tableId，已跳过")
+    if report.get("mock"):
+        warnings.append("未获取到飞书数据，当前为 Mock 演示数据")
+    return warnings
+
+
 class FeishuDataService:
     """飞书数据服务"""
 
@@ -23,8 +49,104 @@ class FeishuDataService:
         self.app_secret = os.getenv("LARK_APP_SECRET")
         self._token = None
         self._token_expires_at = 0
+        # 分组并发读取上限与单分组超时（秒）
+        self.group_concurrency = int(os.getenv("FEISHU_GROUP_CONCURRENCY", 6))
+        self.group_timeout = float(os.getenv("FEISHU_GROUP_TIMEOUT", 60))
+
+    async def fetch_group_videos(
+        self,
+        reader,
+        account_mapping: Dict[str, Any],
+        target_date: str
+    ) -> Tuple[List[VideoRecord], Dict[str, Any]]:
+        """
+        并发读取所有分组的视频数据
+
+        每个分组独立超时、独立失败，结果按 account_mapping 的顺序合并
+
+        Args:
+            reader: FeishuVideoDataReader 实例
+            account_mapping: 分组 -> 表格配置
+            target_date: 目标日期 YYYY-MM-DD
 
-    async def get_today_videos(self, target_date: Optional[str] = None, use_env_config: bool = False) -> List[Dict[str, Any]]:
+        Returns:
+            (合并后的视频列表, 分组读取报告)
+        """
+        semaphore = asyncio.Semaphore(max(1, self.group_concurrency))
+
+        async def fetch_one(group_name: str, table_config: Dict[str, Any]) -> Dict[str, Any]:
+            base_token = table_config.get("baseToken", "")
+            table_id = table_config.get("tableId", "")
+            account_field = table_config.get("accountField", "账号名称")
+
+            if not base_token or not table_id:
+                logger.warning(f"[Feishu] 跳过无效配置: {group_name}")
+                return {"group": group_name, "status": "skipped", "videos": [], "error": "缺少 baseToken 或 tableId"}
+
+            async with semaphore:
+                logger.info(f"[Feishu] 读取分组: {group_name}")
+                try:
+                    # 从飞书获取该分组的视频数据
+                    videos, stats = await asyncio.wait_for(
+                        reader.get_videos_by_date_with_stats(
+                            base_token=base_token,
+                            table_id=table_id,
+                            target_date=target_date,
+                            account_field=account_field
+                        ),
+                        timeout=self.group_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"[Feishu] 读取 {group_name} 超时 ({self.group_timeout}s)")
+                    return {"group": group_name, "status": "timeout", "videos": [], "error": f"超时 {self.group_timeout}s"}
+                except Exception as e:
+                    logger.error(f"[Feishu] 读取 {group_name} 失败: {e}")
+                    return {"group": group_name, "status": "error", "videos": [], "error": str(e)}
+
+            # 添加账号信息
+            for video in videos:
+                video.group_name = group_name
+
+            if stats.get("error"):
+                # 读取中途失败：保留已拉取的部分数据，同时标记为失败
+                logger.error(f"[Feishu] 读取 {group_name} 失败: {stats['error']}")
+                return {"group": group_name, "status": "error", "videos": videos, "error": stats["error"], "stats": stats}
+
+            logger.info(f"[Feishu] {group_name} 获取到 {len(videos)} 条视频")
+            return {"group": group_name, "status": "ok", "videos": videos, "stats": stats}
+
+        results = await asyncio.gather(*[
+            fetch_one(group_name, table_config)
+            for group_name, table_config in account_mapping.items()
+        ])
+
+        # 按配置顺序合并，保证结果顺序稳定
+        all_videos = []
+        groups = []
+        for result in results:
+            videos = result.pop("videos")
+            all_videos.extend(videos)
+            result["count"] = len(videos)
+            groups.append(result)
+
+        failed = [g for g in groups if g["status"] in ("error", "timeout")]
+        report = {
+            "total_groups": len(groups),
+            "succeeded": sum(1 for g in groups if g["status"] == "ok"),
+            "failed": failed,
+            "skipped": [g["group"] for g in groups if g["status"] == "skipped"],
+            "groups": groups
+        }
+
+        if failed:
+            logger.warning(
+                f"[Feishu] {len(failed)}/{len(groups)} 个分组读取失败: "
+                + ", ".join(f"{g['group']}({g['status']}: {g['error']})" for g in failed)
+            )
+
+        return all_videos, report
+
+    async def get_today_videos(self, target_date: Optional[str] = None, use_env_config: bool = False) -> List[VideoRecord]:
         """
         获取指定日期发布的视频数据（从所有账号）
 
@@ -32,7 +154,24 @@ class FeishuDataService:
             target_date: 目标日期，格式 YYYY-MM-DD，默认为今天
 
         Returns:
-            视频数据列表
+            视频记录列表
+        """
+        videos, _ = await self.get_today_videos_with_report(target_date)
+        return videos
+
+    async def get_today_videos_with_report(
+        self,
+        target_date: Optional[str] = None
+    ) -> Tuple[List[VideoRecord], Dict[str, Any]]:
+        """
+        获取指定日期发布的视频数据（从所有账号），并返回分组读取报告
+
+        Args:
+            target_date: 目标日期，格式 YYYY-MM-DD，默认为今天
+
+        Returns:
+            (视频记录列表, 分组读取报告)；降级为 Mock 数据时报告中 mock 为 True，
+            可用 describe_fetch_warnings 转换为提示文本
         """
         if target_date is None:
             target_date = date.today().isoformat()
@@ -47,57 +186,26 @@ class FeishuDataService:
             reader = get_feishu_reader()
             account_mapping = get_account_table_mapping()
 
-            all_videos = []
-
-            # 遍历所有账号配置
-            for group_name, table_config in account_mapping.items():
-                base_token = table_config.get("baseToken", "")
-                table_id = table_config.get("tableId", "")
-                account_field = table_config.get("accountField", "账号名称")
-
-                if not base_token or not table_id:
-                    logger.warning(f"[Feishu] 跳过无效配置: {group_name}")
-                    continue
-
-                logger.info(f"[Feishu] 读取分组: {group_name}")
-
-                try:
-                    # 从飞书获取该分组的视频数据
-                    videos = await reader.get_videos_by_date(
-                        base_token=base_token,
-                        table_id=table_id,
-                        target_date=target_date,
-                        account_field=account_field
-                    )
-
-                    # 添加账号信息
-                    for video in videos:
-                        video["groupName"] = group_name
-
-                    all_videos.extend(videos)
-                    logger.info(f"[Feishu] {group_name} 获取到 {len(videos)} 条视频")
-
-                except Exception as e:
-                    logger.error(f"[Feishu] 读取 {group_name} 失败: {e}")
-                    continue
+            # 并发读取所有分组
+            all_videos, report = await self.fetch_group_videos(reader, account_mapping, target_date)
 
             logger.info(f"[Feishu] 总共获取到 {len(all_videos)} 条视频")
 
             # 如果没有获取到真实数据，返回 Mock 数据作为降级
             if not all_videos:
                 logger.warning("[Feishu] 未获取到真实数据，使用 Mock 数据")
-                return self._get_mock_videos(target_date)
+                return self._get_mock_videos(target_date), {**report, "mock": True}
 
-            return all_videos
+            return all_videos, report
 
         except Exception as e:
             logger.error(f"[Feishu] 获取视频数据失败: {e}")
             import traceback
             traceback.print_exc()
             # 降级到 Mock 数据
-            return self._get_mock_videos(target_date)
+            return self._get_mock_videos(target_date), {"failed": [], "skipped": [], "mock": True, "error": str(e)}
 
-    async def get_videos_with_config(self, target_date: str, feishu_config: dict) -> List[Dict[str, Any]]:
+    async def get_videos_with_config(self, target_date: str, feishu_config: dict) -> List[VideoRecord]:
         """
         使用前端传递的配置获取视频数据
 
@@ -106,7 +214,25 @@ class FeishuDataService:
             feishu_config: 前端传递的飞书配置
 
         Returns:
-            视频数据列表
+            视频记录列表
+        """
+        videos, _ = await self.get_videos_with_config_with_report(target_date, feishu_config)
+        return videos
+
+    async def get_videos_with_config_with_report(
+        self,
+        target_date: str,
+        feishu_config: dict
+    ) -> Tuple[List[VideoRecord], Dict[str, Any]]:
+        """
+        使用前端传递的配置获取视频数据，并返回分组读取报告（格式同 get_today_videos_with_report）
+
+        Args:
+            target_date: 目标日期 YYYY-MM-DD
+            feishu_config: 前端传递的飞书配置
+
+        Returns:
+            (视频记录列表, 分组读取报告)
         """
         if target_date is None:
             target_date = date.today().isoformat()
@@ -123,7 +249,7 @@ class FeishuDataService:
 
             if not app_id or not app_secret:
                 logger.warning("[Feishu] 前端配置中缺少 feishuAppId 或 feishuAppSecret")
-                return self._get_mock_videos(target_date)
+                return self._get_mock_videos(target_date), {"failed": [], "skipped": [], "mock": True}
 
             logger.info(f"[Feishu] 使用前端凭据创建 reader: {app_id[:10]}...")
 
@@ -132,57 +258,26 @@ class FeishuDataService:
             logger.info(f"[Feishu] account_table_mapping: {account_mapping}")
             logger.info(f"[Feishu] mapping 数量: {len(account_mapping)}")
 
-            all_videos = []
-
-            # 遍历所有账号配置
-            for group_name, table_config in account_mapping.items():
-                base_token = table_config.get("baseToken", "")
-                table_id = table_config.get("tableId", "")
-                account_field = table_config.get("accountField", "账号名称")
-
-                if not base_token or not table_id:
-                    logger.warning(f"[Feishu] 跳过无效配置: {group_name}")
-                    continue
-
-                logger.info(f"[Feishu] 读取分组: {group_name}")
-
-                try:
-                    # 从飞书获取该分组的视频数据
-                    videos = await reader.get_videos_by_date(
-                        base_token=base_token,
-                        table_id=table_id,
-                        target_date=target_date,
-                        account_field=account_field
-                    )
-
-                    # 添加账号信息
-                    for video in videos:
-                        video["groupName"] = group_name
-
-                    all_videos.extend(videos)
-                    logger.info(f"[Feishu] {group_name} 获取到 {len(videos)} 条视频")
-
-                except Exception as e:
-                    logger.error(f"[Feishu] 读取 {group_name} 失败: {e}")
-                    continue
+            # 并发读取所有分组
+            all_videos, report = await self.fetch_group_videos(reader, account_mapping, target_date)
 
             logger.info(f"[Feishu] 总共获取到 {len(all_videos)} 条视频")
 
             # 如果没有获取到真实数据，返回 Mock 数据作为降级
             if not all_videos:
                 logger.warning("[Feishu] 未获取到真实数据，使用 Mock 数据")
-                return self._get_mock_videos(target_date)
+                return self._get_mock_videos(target_date), {**report, "mock": True}
 
-            return all_videos
+            return all_videos, report
 
         except Exception as e:
             logger.error(f"[Feishu] 获取视频数据失败: {e}")
             import traceback
             traceback.print_exc()
             # 降级到 Mock 数据
-            return self._get_mock_videos(target_date)
+            return self._get_mock_videos(target_date), {"failed": [], "skipped": [], "mock": True, "error": str(e)}
 
-    def _get_mock_videos(self, target_date: str) -> List[Dict[str, Any]]:
+    def _get_mock_videos(self, target_date: str) -> List[VideoRecord]:
         """
         获取 Mock 视频数据（用于开发测试）
 
@@ -337,13 +432,13 @@ class FeishuDataService:
         ]
 
         logger.info(f"[Feishu] 返回 {len(mock_videos)} 条 Mock 视频数据")
-        return mock_videos
+        return [VideoRecord.from_dict(video) for video in mock_videos]
 
     async def get_videos_by_account(
         self,
         account: str,
         target_date: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
+    ) -> List[VideoRecord]:
         """
         获取指定账号在指定日期发布的视频
 
@@ -352,71 +447,24 @@ class FeishuDataService:
             target_date: 目标日期
 
         Returns:
-            视频数据列表
+            视频记录列表
         """
         all_videos = await self.get_today_videos(target_date)
-        return [v for v in all_videos if v.get("account") == account]
+        return [v for v in all_videos if v.account == account]
 
-    def calculate_summary_stats(self, videos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def calculate_summary_stats(self, videos: List[VideoRecord]) -> Dict[str, Any]:
         """
         计算视频数据的汇总统计
 
+        由列式统计引擎 VideoStats 计算（一次遍历建列），账号下的视频以 video_indices 下标引用
+
         Args:
-            videos: 视频数据列表
+            videos: 视频记录列表
 
         Returns:
-            汇总统计数据
+            汇总统计数据（另含 time_slots / percentiles / outliers / grade_distribution）
         """
-        if not videos:
-            return {
-                "total_videos": 0,
-                "total_views": 0,
-                "avg_views": 0,
-                "avg_engagement_rate": 0,
-                "top_video": None,
-                "accounts": {}
-            }
-
-        total_videos = len(videos)
-        total_views = sum(v.get("readCount", 0) for v in videos)
-        avg_views = total_views / total_videos if total_videos > 0 else 0
-
-        # 计算平均互动率
-        total_interactions = sum(
-            v.get("likeCount", 0) + v.get("commentCount", 0) + v.get("forwardCount", 0)
-            for v in videos
-        )
-        avg_engagement_rate = (total_interactions / total_views * 100) if total_views > 0 else 0
-
-        # 找出最佳视频
-        top_video = max(videos, key=lambda x: x.get("readCount", 0)) if videos else None
-
-        # 按账号分组统计
-        accounts = {}
-        for v in videos:
-            acc = v.get("account", "未知")
-            if acc not in accounts:
-                accounts[acc] = {
-                    "count": 0,
-                    "total_views": 0,
-                    "videos": []
-                }
-            accounts[acc]["count"] += 1
-            accounts[acc]["total_views"] += v.get("readCount", 0)
-            accounts[acc]["videos"].append(v)
-
-        # 计算每个账号的平均播放量
-        for acc_data in accounts.values():
-            acc_data["avg_views"] = acc_data["total_views"] / acc_data["count"] if acc_data["count"] > 0 else 0
-
-        return {
-            "total_videos": total_videos,
-            "total_views": total_views,
-            "avg_views": round(avg_views, 0),
-            "avg_engagement_rate": round(avg_engagement_rate, 2),
-            "top_video": top_video,
-            "accounts": accounts
-        }
+        return VideoStats(videos).summary()
 
 
 # 全局单例
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Feishu Executor - 飞书同步 SDK 调用的异步执行器
+lark SDK 的 bitable 接口是同步阻塞的，统一放到独立的有界线程池中执行，
+避免阻塞 uvicorn 事件循环（包括正在进行的 SSE 流）
+"""
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+# 全局线程池（飞书 API 专用，与默认线程池隔离）
+_feishu_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_feishu_executor() -> ThreadPoolExecutor:
+    """获取飞书 API 线程池单例，并发上限由 FEISHU_MAX_WORKERS 控制（默认 8）"""
+    global _feishu_executor
+    if _feishu_executor is None:
+        max_workers = int(os.getenv("FEISHU_MAX_WORKERS", 8))
+        _feishu_executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="feishu-io"
+        )
+        logger.info(f"[FeishuExecutor] 线程池已创建，max_workers={max_workers}")
+    return _feishu_executor
+
+
+async def run_feishu_call(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在飞书线程池中执行同步调用，并异步等待结果
+
+    Args:
+        func: 同步函数（如 client.bitable.v1.app_table_record.search）
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        func 的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_feishu_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_feishu_executor() -> None:
+    """关闭飞书线程池（应用退出时调用）"""
+    global _feishu_executor
+    if _feishu_executor is not None:
+        _feishu_executor.shutdown(wait=False, cancel_futures=True)
+        _feishu_executor = None
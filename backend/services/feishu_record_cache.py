@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Feishu Record Cache - 飞书多维表格本地镜像
+以 SQLite 持久化每个 (base_token, table_id) 的记录，按 record_id 去重，
+按「发布时间」建立索引，支持基于最后更新时间的增量刷新
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    base_token TEXT NOT NULL,
+    table_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    publish_time INTEGER,
+    last_modified_time INTEGER,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (base_token, table_id, record_id)
+);
+CREATE INDEX IF NOT EXISTS idx_records_publish_time
+    ON records (base_token, table_id, publish_time);
+CREATE TABLE IF NOT EXISTS sync_state (
+    base_token TEXT NOT NULL,
+    table_id TEXT NOT NULL,
+    field_signature TEXT NOT NULL,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    last_sync_at REAL NOT NULL DEFAULT 0,
+    last_full_sync_at REAL NOT NULL DEFAULT 0,
+    incremental_disabled_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (base_token, table_id)
+);
+"""
+
+
+class FeishuRecordCache:
+    """飞书记录本地镜像（SQLite）"""
+
+    def __init__(self, db_path: str):
+        """
+        初始化镜像
+
+        Args:
+            db_path: SQLite 文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # 旧版本镜像文件补充 incremental_disabled_at 列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sync_state)")}
+        if "incremental_disabled_at" not in columns:
+            self._conn.execute(
+                "ALTER TABLE sync_state ADD COLUMN incremental_disabled_at REAL NOT NULL DEFAULT 0"
+            )
+        self._conn.commit()
+
+    def get_sync_state(self, base_token: str, table_id: str) -> Optional[Dict[str, Any]]:
+        """获取表的同步状态，未同步过返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT field_signature, watermark, last_sync_at, last_full_sync_at, incremental_disabled_at "
+                "FROM sync_state WHERE base_token = ? AND table_id = ?",
+                (base_token, table_id)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "field_signature": row[0],
+            "watermark": row[1],
+            "last_sync_at": row[2],
+            "last_full_sync_at": row[3],
+            "incremental_disabled_at": row[4],
+        }
+
+    def disable_incremental(self, base_token: str, table_id: str) -> None:
+        """
+        记录该表无法增量刷新（如缺少「最后更新时间」字段），由读取方在一段时间内跳过镜像
+
+        成功的同步（apply_sync）会清除该标记
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sync_state SET incremental_disabled_at = ? WHERE base_token = ? AND table_id = ?",
+                (time.time(), base_token, table_id)
+            )
+            self._conn.commit()
+
+    def apply_sync(
+        self,
+        base_token: str,
+        table_id: str,
+        records: List[Tuple[str, Dict[str, Any], Optional[int]]],
+        field_signature: str,
+        full: bool
+    ) -> None:
+        """
+        写入一次同步的结果
+
+        Args:
+            base_token: 飞书 Base token
+            table_id: 数据表 ID
+            records: (record_id, fields, last_modified_time) 列表
+            field_signature: 本次拉取的字段投影签名
+            full: 是否为全量同步（全量同步会清除镜像中已被删除的记录）
+        """
+        now = time.time()
+        with self._lock:
+            state = self._conn.execute(
+                "SELECT watermark, last_full_sync_at FROM sync_state WHERE base_token = ? AND table_id = ?",
+                (base_token, table_id)
+            ).fetchone()
+            watermark = 0 if full or not state else state[0]
+            last_full_sync_at = now if full or not state else state[1]
+
+            if full:
+                self._conn.execute(
+                    "DELETE FROM records WHERE base_token = ? AND table_id = ?",
+                    (base_token, table_id)
+                )
+
+            rows = []
+            for record_id, fields, last_modified_time in records:
+                publish_time = fields.get("发布时间")
+                rows.append((
+                    base_token,
+                    table_id,
+                    record_id,
+                    publish_time if isinstance(publish_time, (int, float)) else None,
+                    last_modified_time,
+                    json.dumps(fields, ensure_ascii=False),
+                ))
+                if last_modified_time and last_modified_time > watermark:
+                    watermark = last_modified_time
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records "
+                "(base_token, table_id, record_id, publish_time, last_modified_time, fields) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state "
+                "(base_token, table_id, field_signature, watermark, last_sync_at, last_full_sync_at, "
+                "incremental_disabled_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (base_token, table_id, field_signature, watermark, now, last_full_sync_at)
+            )
+            self._conn.commit()
+
+    def query_by_publish_time(
+        self,
+        base_token: str,
+        table_id: str,
+        start_time: int,
+        end_time: int
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        按发布时间区间 [start_time, end_time) 查询镜像
+
+        Returns:
+            (record_id, fields) 列表，按发布时间升序
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record_id, fields FROM records "
+                "WHERE base_token = ? AND table_id = ? AND publish_time >= ? AND publish_time < ? "
+                "ORDER BY publish_time",
+                (base_token, table_id, start_time, end_time)
+            ).fetchall()
+        return [(record_id, json.loads(fields)) for record_id, fields in rows]
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全局单例
+_record_cache: Optional[FeishuRecordCache] = None
+
+
+def get_record_cache() -> Optional[FeishuRecordCache]:
+    """
+    获取本地镜像单例
+
+    FEISHU_CACHE_ENABLED=false 时禁用；路径由 FEISHU_CACHE_PATH 指定
+    """
+    global _record_cache
+    if os.getenv("FEISHU_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _record_cache is None:
+        db_path = os.getenv(
+            "FEISHU_CACHE_PATH",
+            os.path.join(os.path.dirname(__file__), "..", "data", "feishu_cache.sqlite3")
+        )
+        try:
+            _record_cache = FeishuRecordCache(db_path)
+            logger.info(f"[FeishuCache] 本地镜像已打开: {db_path}")
+        except Exception as e:
+            logger.error(f"[FeishuCache] 打开本地镜像失败，将直接读取飞书: {e}")
+            return None
+    return _record_cache
@@ -5,14 +5,20 @@ Feishu Video Data Reader - 飞书视频数据读取服务
 参考 feishu_writer.py 的实现方式
 """
 import os
+import time
 import logging
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 from lark_oapi.api.bitable.v1 import *
 from lark_oapi import *
 
+from models.video_record import VideoRecord
+from services.feishu_executor import run_feishu_call
+from services.feishu_record_cache import get_record_cache
+from services.feishu_writer import create_feishu_writer
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -21,17 +27,40 @@ logger = logging.getLogger(__name__)
 class FeishuVideoDataReader:
     """飞书视频数据读取服务"""
 
-    def __init__(self, app_id: str, app_secret: str):
+    # search 接口单页上限
+    SEARCH_PAGE_SIZE = 500
+    # list 接口单页大小（兜底路径）
+    LIST_PAGE_SIZE = 100
+
+    # 解析视频所需的字段（search 接口字段投影，实际请求前与表中已有字段取交集）
+    VIDEO_FIELD_NAMES = [
+        "视频标题", "浏览次数", "点赞数", "评论数", "转发数", "收藏数",
+        "完播率", "平均播放时长", "视频链接", "封面图", "标签", "发布时间",
+        "AI 评分", "AI 评级", "病毒指数", "AI 建议", "分析理由",
+        "内容质量", "发布时机", "互动表现", "病毒传播",
+    ]
+
+    _DAY_MS = 24 * 60 * 60 * 1000
+
+    def __init__(self, app_id: str, app_secret: str, use_cache: bool = True):
         """
         初始化服务
 
         Args:
             app_id: 飞书应用 ID
             app_secret: 飞书应用密钥
+            use_cache: 是否使用本地镜像（SQLite）加速按日期查询
         """
         self.app_id = app_id
         self.app_secret = app_secret
         self.client = self._create_client()
+        self.record_cache = get_record_cache() if use_cache else None
+        # 镜像刷新间隔（秒）：间隔内的重复查询直接读本地
+        self.cache_refresh_seconds = float(os.getenv("FEISHU_CACHE_REFRESH_SECONDS", 60))
+        # 全量重建间隔（小时）：增量刷新无法感知删除，定期全量同步一次
+        self.cache_full_sync_seconds = float(os.getenv("FEISHU_CACHE_FULL_SYNC_HOURS", 24)) * 3600
+        # 增量刷新依赖表中的「最后更新时间」类型字段
+        self.modified_field = os.getenv("FEISHU_MODIFIED_FIELD", "最后更新时间")
 
     def _create_client(self) -> Client:
         """创建飞书 API 客户端（SDK 会自动处理 token）"""
@@ -46,7 +75,7 @@ class FeishuVideoDataReader:
         table_id: str,
         target_date: str,
         account_field: str = "账号名称"
-    ) -> List[Dict[str, Any]]:
+    ) -> List[VideoRecord]:
         """
         获取指定日期发布的视频
 
@@ -57,8 +86,36 @@ class FeishuVideoDataReader:
             account_field: 账号字段名
 
         Returns:
-            视频数据列表
+            视频记录列表
+        """
+        videos, _ = await self.get_videos_by_date_with_stats(
+            base_token, table_id, target_date, account_field
+        )
+        return videos
+
+    async def get_videos_by_date_with_stats(
+        self,
+        base_token: str,
+        table_id: str,
+        target_date: str,
+        account_field: str = "账号名称"
+    ) -> Tuple[List[VideoRecord], Dict[str, Any]]:
         """
+        获取指定日期发布的视频，并返回拉取统计
+
+        优先读取本地镜像；镜像不可用时使用 search 接口在服务端按发布时间过滤（带字段投影），
+        search 失败时回退到 list 接口全表分页 + 本地过滤
+
+        Args:
+            base_token: 飞书 Base token (实际是 app_token)
+            table_id: 数据表 ID
+            target_date: 目标日期 YYYY-MM-DD
+            account_field: 账号字段名
+
+        Returns:
+            (视频记录列表, 拉取统计)，统计包含 mode/pages/fetched/kept，读取失败时附带 error
+        """
+        stats = {"mode": "search", "pages": 0, "fetched": 0, "kept": 0}
         try:
             logger.info(f"[FeishuReader] 开始查询，app_token={base_token}, table_id={table_id}")
 
@@ -69,82 +126,112 @@ class FeishuVideoDataReader:
 
             logger.info(f"[FeishuReader] 查询日期: {target_date}, 时间戳范围: {start_time} - {end_time}")
 
-            # 先尝试获取表格数据，使用 ListAppTableRecordRequest
-            all_records = []
-            page_token = ""
-
-            while True:
-                # 使用 list 接口而不是 search
-                request = ListAppTableRecordRequest.builder() \
-                    .app_token(base_token) \
-                    .table_id(table_id) \
-                    .page_size(100) \
-                    .page_token(page_token) \
-                    .build()
-
-                response = self.client.bitable.v1.app_table_record.list(request)
-
-                if not response.success():
-                    logger.error(f"[FeishuReader] 获取记录失败: {response.msg}, code: {response.code}")
-                    # 如果 list 失败，尝试 search
-                    logger.info(f"[FeishuReader] 尝试使用 search 接口...")
-                    return await self._search_records(base_token, table_id, start_time, end_time, account_field)
-
-                if response.data.items:
-                    all_records.extend(response.data.items)
-
-                # 检查是否有下一页
-                if not response.data.has_more or not response.data.page_token:
-                    break
-                page_token = response.data.page_token
-
-            logger.info(f"[FeishuReader] 查询到 {len(all_records)} 条记录")
-
-            # 转换为标准格式并按日期过滤
-            videos = []
-            for record in all_records:
-                video = self._parse_feishu_record(record, account_field)
-                if video:
-                    # 按发布时间过滤：只返回指定日期的视频
-                    publish_time_ms = record.fields.get("发布时间", 0)
-                    if publish_time_ms:
-                        # 检查是否在目标日期范围内
-                        if start_time <= publish_time_ms < end_time:
-                            logger.info(f"[FeishuReader] 匹配视频: {video.get('name')}, 发布时间: {publish_time_ms}")
-                            videos.append(video)
-                    else:
-                        # 没有发布时间的记录，跳过
-                        logger.debug(f"[FeishuReader] 跳过无发布时间的记录: {video.get('name')}")
-
-            logger.info(f"[FeishuReader] 日期过滤后有效视频: {len(videos)} 条")
-            return videos
+            # 优先读取本地镜像（增量刷新后按发布时间索引查询）
+            if self.record_cache is not None:
+                result = await self._read_from_cache(base_token, table_id, start_time, end_time, account_field)
+                if result is not None:
+                    videos, stats = result
+                    logger.info(
+                        f"[FeishuReader] 拉取统计: mode={stats['mode']}, refresh={stats['refresh']}, "
+                        f"页数={stats['pages']}, 拉取={stats['fetched']} 条, 保留={stats['kept']} 条"
+                    )
+                    return videos, stats
+
+            # 其次使用 search 接口（服务端过滤）
+            result = await self._search_records(base_token, table_id, start_time, end_time, account_field)
+            if result is None:
+                # search 失败，回退到 list 接口全表扫描
+                logger.warning(
+                    f"[FeishuReader] search 不可用，回退到 list 接口全表分页拉取（拉取量随表大小增长），"
+                    f"table_id={table_id}"
+                )
+                result = await self._list_records(base_token, table_id, start_time, end_time, account_field)
+
+            videos, stats = result
+            logger.info(
+                f"[FeishuReader] 拉取统计: mode={stats['mode']}, 页数={stats['pages']}, "
+                f"拉取={stats['fetched']} 条, 保留={stats['kept']} 条"
+            )
+            return videos, stats
 
         except Exception as e:
             logger.error(f"[FeishuReader] 获取视频数据异常: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            stats["error"] = str(e)
+            return [], stats
+
+    async def _search_records(
+        self,
+        app_token: str,
+        table_id: str,
+        start_time: int,
+        end_time: int,
+        account_field: str
+    ) -> Optional[Tuple[List[VideoRecord], Dict[str, Any]]]:
+        """
+        使用 search 接口获取记录（服务端按发布时间过滤）
+
+        Returns:
+            (视频列表, 统计)；search 接口调用失败时返回 None，由调用方回退到 list 接口
+        """
+        stats = {"mode": "search", "pages": 0, "fetched": 0, "kept": 0}
+        result = await self._search_all(
+            app_token,
+            table_id,
+            await self._get_field_names(app_token, table_id, account_field),
+            self._build_date_filter(start_time, end_time)
+        )
+        if result is None:
+            return None
+
+        all_records, stats["pages"] = result
+        stats["fetched"] = len(all_records)
+        videos = self._filter_records_by_time(all_records, start_time, end_time, account_field)
+        stats["kept"] = len(videos)
+        return videos, stats
+
+    async def _search_all(
+        self,
+        app_token: str,
+        table_id: str,
+        field_names: List[str],
+        filter_info: Optional[FilterInfo] = None
+    ) -> Optional[Tuple[List[AppTableRecord], int]]:
+        """
+        分页拉取 search 接口的全部结果（附带 created_time / last_modified_time）
 
-    async def _search_records(self, app_token: str, table_id: str, start_time: int, end_time: int, account_field: str) -> List[Dict[str, Any]]:
-        """使用 search 接口获取记录"""
+        Returns:
+            (记录列表, 页数)；接口调用失败时返回 None
+        """
         try:
+            body_builder = SearchAppTableRecordRequestBody.builder() \
+                .field_names(field_names) \
+                .automatic_fields(True)
+            if filter_info is not None:
+                body_builder = body_builder.filter(filter_info)
+            request_body = body_builder.build()
+
             all_records = []
+            pages = 0
             page_token = ""
 
             while True:
                 request = SearchAppTableRecordRequest.builder() \
                     .app_token(app_token) \
                     .table_id(table_id) \
-                    .page_size(100) \
+                    .page_size(self.SEARCH_PAGE_SIZE) \
                     .page_token(page_token) \
+                    .request_body(request_body) \
                     .build()
 
-                response = self.client.bitable.v1.app_table_record.search(request)
+                response = await run_feishu_call(self.client.bitable.v1.app_table_record.search, request)
 
                 if not response.success():
                     logger.error(f"[FeishuReader] search 失败: {response.msg}, code: {response.code}")
-                    break
+                    return None
 
+                pages += 1
                 if response.data.items:
                     all_records.extend(response.data.items)
 
@@ -152,71 +239,282 @@ class FeishuVideoDataReader:
                     break
                 page_token = response.data.page_token
 
-            # 解析并过滤
-            videos = []
-            for record in all_records:
-                video = self._parse_feishu_record(record, account_field)
-                if video:
-                    publish_time_ms = record.fields.get("发布时间", 0)
-                    if publish_time_ms:
-                        if start_time <= publish_time_ms < end_time:
-                            videos.append(video)
-                    else:
-                        videos.append(video)
-
-            return videos
+            return all_records, pages
 
         except Exception as e:
             logger.error(f"[FeishuReader] search 异常: {e}")
-            return []
+            return None
+
+    async def _read_from_cache(
+        self,
+        app_token: str,
+        table_id: str,
+        start_time: int,
+        end_time: int,
+        account_field: str
+    ) -> Optional[Tuple[List[VideoRecord], Dict[str, Any]]]:
+        """
+        刷新本地镜像后按发布时间查询
+
+        Returns:
+            (视频列表, 统计)；镜像不可用或刷新失败时返回 None，由调用方直接读取飞书
+        """
+        stats = {"mode": "cache", "refresh": "none", "pages": 0, "fetched": 0, "kept": 0}
+        try:
+            if not await self._refresh_cache(app_token, table_id, account_field, stats):
+                return None
+
+            rows = await run_feishu_call(
+                self.record_cache.query_by_publish_time, app_token, table_id, start_time, end_time
+            )
+            records = [AppTableRecord({"record_id": record_id, "fields": fields}) for record_id, fields in rows]
+            videos = self._filter_records_by_time(records, start_time, end_time, account_field)
+            stats["kept"] = len(videos)
+            return videos, stats
+
+        except Exception as e:
+            logger.error(f"[FeishuReader] 读取本地镜像异常: {e}")
+            return None
+
+    async def _refresh_cache(
+        self,
+        app_token: str,
+        table_id: str,
+        account_field: str,
+        stats: Dict[str, Any]
+    ) -> bool:
+        """
+        按需刷新本地镜像
+
+        - 距上次刷新不足 cache_refresh_seconds：不刷新
+        - 首次同步 / 字段投影变化 / 超过全量重建间隔：全量同步
+        - 其他情况：按「最后更新时间」增量同步
+
+        增量刷新失败时（表中通常缺少「最后更新时间」字段）不退化为全表拉取，而是标记该表
+        在 cache_full_sync_seconds 内跳过镜像，由调用方走按发布日期过滤的 search；
+        标记过期后先用增量条件探测一次，字段可用时才重新全量同步
 
-    def _parse_feishu_record(self, record: AppTableRecord, account_field: str) -> Optional[Dict[str, Any]]:
+        Returns:
+            镜像是否可用
+        """
+        field_names = await self._get_field_names(app_token, table_id, account_field)
+        signature = ",".join(field_names)
+        state = await run_feishu_call(self.record_cache.get_sync_state, app_token, table_id)
+        now = time.time()
+
+        if state and state.get("incremental_disabled_at"):
+            if now - state["incremental_disabled_at"] < self.cache_full_sync_seconds:
+                stats["refresh"] = "disabled"
+                return False
+            probe = await self._search_all(
+                app_token, table_id, field_names, self._build_modified_filter(int(now * 1000))
+            )
+            if probe is None:
+                await run_feishu_call(self.record_cache.disable_incremental, app_token, table_id)
+                stats["refresh"] = "disabled"
+                return False
+            # 增量字段已可用，重新全量同步
+            state = None
+
+        full = True
+        if state and state["field_signature"] == signature:
+            if now - state["last_sync_at"] < self.cache_refresh_seconds:
+                return True
+            full = now - state["last_full_sync_at"] >= self.cache_full_sync_seconds
+
+        result = None
+        if not full:
+            result = await self._search_all(
+                app_token, table_id, field_names, self._build_modified_filter(state["watermark"])
+            )
+            if result is None:
+                logger.warning(
+                    f"[FeishuReader] 增量刷新失败（表中可能缺少「{self.modified_field}」字段），"
+                    f"暂停使用该表的本地镜像，改为按发布日期查询"
+                )
+                await run_feishu_call(self.record_cache.disable_incremental, app_token, table_id)
+                stats["refresh"] = "disabled"
+                return False
+
+        if full:
+            result = await self._search_all(app_token, table_id, field_names)
+            if result is None:
+                logger.warning(f"[FeishuReader] 本地镜像全量同步失败，改为直接查询飞书，table_id={table_id}")
+                return False
+
+        records, pages = result
+        stats["refresh"] = "full" if full else "incremental"
+        stats["pages"] = pages
+        stats["fetched"] = len(records)
+
+        await run_feishu_call(
+            self.record_cache.apply_sync,
+            app_token,
+            table_id,
+            [(r.record_id, r.fields or {}, r.last_modified_time) for r in records],
+            signature,
+            full
+        )
+        return True
+
+    async def _list_records(
+        self,
+        app_token: str,
+        table_id: str,
+        start_time: int,
+        end_time: int,
+        account_field: str
+    ) -> Tuple[List[VideoRecord], Dict[str, Any]]:
+        """使用 list 接口全表分页获取记录，并在本地按发布时间过滤（兜底路径）"""
+        stats = {"mode": "list", "pages": 0, "fetched": 0, "kept": 0}
+        all_records = []
+        page_token = ""
+
+        while True:
+            request = ListAppTableRecordRequest.builder() \
+                .app_token(app_token) \
+                .table_id(table_id) \
+                .page_size(self.LIST_PAGE_SIZE) \
+                .page_token(page_token) \
+                .build()
+
+            response = await run_feishu_call(self.client.bitable.v1.app_table_record.list, request)
+
+            if not response.success():
+                logger.error(f"[FeishuReader] 获取记录失败: {response.msg}, code: {response.code}")
+                stats["error"] = f"{response.msg} (code: {response.code})"
+                break
+
+            stats["pages"] += 1
+            if response.data.items:
+                all_records.extend(response.data.items)
+
+            # 检查是否有下一页
+            if not response.data.has_more or not response.data.page_token:
+                break
+            page_token = response.data.page_token
+
+        logger.info(f"[FeishuReader] 查询到 {len(all_records)} 条记录")
+
+        stats["fetched"] = len(all_records)
+        videos = self._filter_records_by_time(all_records, start_time, end_time, account_field)
+        stats["kept"] = len(videos)
+        return videos, stats
+
+    def _filter_records_by_time(
+        self,
+        records: List[AppTableRecord],
+        start_time: int,
+        end_time: int,
+        account_field: str
+    ) -> List[VideoRecord]:
+        """解析记录并按发布时间精确过滤 [start_time, end_time)"""
+        videos = []
+        for record in records:
+            publish_time_ms = self._safe_int(record.fields.get("发布时间", 0))
+            if not publish_time_ms:
+                # 没有发布时间的记录，跳过
+                logger.debug(f"[FeishuReader] 跳过无发布时间的记录: {record.record_id}")
+                continue
+            if not (start_time <= publish_time_ms < end_time):
+                continue
+
+            video = self._parse_feishu_record(record, account_field)
+            if video:
+                videos.append(video)
+
+        logger.info(f"[FeishuReader] 日期过滤后有效视频: {len(videos)} 条")
+        return videos
+
+    def _build_date_filter(self, start_time: int, end_time: int) -> FilterInfo:
+        """
+        构建发布时间过滤条件
+
+        飞书日期筛选（ExactDate）按「天」比较且使用多维表格自身的时区，
+        因此两端各放宽一天，精确的毫秒区间由 _filter_records_by_time 在本地保证
+        """
+        return FilterInfo.builder() \
+            .conjunction("and") \
+            .conditions([
+                Condition.builder()
+                    .field_name("发布时间")
+                    .operator("isGreater")
+                    .value(["ExactDate", str(start_time - self._DAY_MS - 1)])
+                    .build(),
+                Condition.builder()
+                    .field_name("发布时间")
+                    .operator("isLess")
+                    .value(["ExactDate", str(end_time + self._DAY_MS)])
+                    .build(),
+            ]) \
+            .build()
+
+    def _build_modified_filter(self, watermark: int) -> FilterInfo:
+        """
+        构建增量刷新条件：最后更新时间不早于水位线所在日期
+
+        同样按天比较，向前放宽一天；重复拉取的记录按 record_id 覆盖写入
+        """
+        return FilterInfo.builder() \
+            .conjunction("and") \
+            .conditions([
+                Condition.builder()
+                    .field_name(self.modified_field)
+                    .operator("isGreater")
+                    .value(["ExactDate", str(watermark - 2 * self._DAY_MS)])
+                    .build(),
+            ]) \
+            .build()
+
+    async def _get_field_names(self, app_token: str, table_id: str, account_field: str) -> List[str]:
+        """
+        search 接口的字段投影：只拉取解析视频所需、且表中实际存在的字段
+
+        投影中包含表里不存在的字段时 search 会整体失败（进而退化为 list 全表拉取），
+        因此先与表字段列表（复用写入服务的字段表缓存）取交集；字段列表获取失败时使用完整投影
         """
-        解析飞书记录为标准视频格式
+        field_names = list(self.VIDEO_FIELD_NAMES)
+        if account_field not in field_names:
+            field_names.append(account_field)
+
+        try:
+            writer = create_feishu_writer(self.app_id, self.app_secret)
+            table_fields = await run_feishu_call(writer.get_table_fields, app_token, table_id)
+        except Exception as e:
+            logger.warning(f"[FeishuReader] 获取字段列表异常，使用完整字段投影: {e}")
+            return field_names
+        if table_fields is None:
+            logger.warning(f"[FeishuReader] 获取字段列表失败，使用完整字段投影，table_id={table_id}")
+            return field_names
+
+        missing = [name for name in field_names if name not in table_fields]
+        if missing:
+            logger.warning(f"[FeishuReader] 表中缺少字段 {missing}，已从字段投影中移除，table_id={table_id}")
+        return [name for name in field_names if name in table_fields]
+
+    def _parse_feishu_record(self, record: AppTableRecord, account_field: str) -> Optional[VideoRecord]:
+        """
+        解析飞书记录为视频记录（数值、完播率、播放时长在此一次解析完成）
 
         Args:
             record: 飞书记录
             account_field: 账号字段名
 
         Returns:
-            视频数据字典
+            VideoRecord
         """
         try:
-            fields = record.fields
-
-            # 提取基本信息
-            video = {
-                "name": fields.get("视频标题", ""),
-                "account": fields.get(account_field, "未知"),
-                "readCount": self._safe_int(fields.get("浏览次数", 0)),
-                "likeCount": self._safe_int(fields.get("点赞数", 0)),
-                "commentCount": self._safe_int(fields.get("评论数", 0)),
-                "forwardCount": self._safe_int(fields.get("转发数", 0)),
-                "favCount": self._safe_int(fields.get("收藏数", 0)),
-                "fullPlayRate": fields.get("完播率", "0%"),
-                "avgPlayTimeSec": fields.get("平均播放时长", "0秒"),
-                "url": fields.get("视频链接", ""),
-                "coverUrl": fields.get("封面图", ""),
-                "objectId": record.record_id,
-                "tags": self._parse_tags(fields.get("标签", "")),
-            }
-
-            # 解析发布时间
-            publish_time_ms = fields.get("发布时间", 0)
-            if publish_time_ms:
-                publish_dt = datetime.fromtimestamp(publish_time_ms / 1000)
-                video["publishTime"] = publish_dt.strftime("%H:%M")
-                video["createTime"] = publish_dt.strftime("%Y-%m-%d %H:%M")
-            else:
-                video["publishTime"] = "00:00"
-                video["createTime"] = ""
-
-            # 解析 AI 分析结果（如果有）
-            ai_analysis = self._parse_ai_analysis(fields)
-            if ai_analysis:
-                video["aiAnalysis"] = ai_analysis
-
-            return video
+            # search 接口的文本字段以富文本片段数组返回，统一转为字符串
+            fields = {k: self._normalize_field_value(v) for k, v in record.fields.items()}
+
+            return VideoRecord.from_feishu(
+                record.record_id,
+                fields,
+                account_field,
+                tags=tuple(self._parse_tags(fields.get("标签", ""))),
+                # 解析 AI 分析结果（如果有）
+                ai_analysis=self._parse_ai_analysis(fields)
+            )
 
         except Exception as e:
             logger.error(f"[FeishuReader] 解析记录失败: {e}")
@@ -246,6 +544,12 @@ class FeishuVideoDataReader:
             logger.warning(f"[FeishuReader] 解析 AI 分析失败: {e}")
             return None
 
+    def _normalize_field_value(self, value: Any) -> Any:
+        """将富文本片段数组（[{"type": "text", "text": ...}]）合并为字符串"""
+        if isinstance(value, list) and value and all(isinstance(v, dict) and "text" in v for v in value):
+            return "".join(v.get("text", "") for v in value)
+        return value
+
     def _parse_tags(self, tags_str: str) -> List[str]:
         """解析标签字符串"""
         if not tags_str:
@@ -3,7 +3,10 @@
 Feishu Writer Service - 飞书 AI 分析结果批量写入服务
 """
 import os
-from typing import List, Dict, Any
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from lark_oapi.api.bitable.v1 import *
 from lark_oapi import *
 
@@ -13,6 +16,15 @@ from models.analysis import VideoScore
 class FeishuWriter:
     """飞书批量写入服务"""
 
+    # 视频编号字段（用于匹配记录）
+    VIDEO_ID_FIELD = "视频编号"
+    # search 接口单页上限
+    SEARCH_PAGE_SIZE = 500
+    # 单个 search 请求合并的视频 ID 数（OR 条件数上限）
+    SEARCH_OR_CHUNK = 50
+    # batch_update 接口单次上限
+    BATCH_UPDATE_SIZE = 500
+
     def __init__(self, app_id: str, app_secret: str):
         """
         初始化飞书写入服务
@@ -25,6 +37,30 @@ class FeishuWriter:
         self.app_secret = app_secret
         self.client = self._create_client()
 
+        # 写入方法在飞书线程池中执行，缓存读写需要加锁
+        self._cache_lock = threading.Lock()
+        # 字段表缓存：(app_token, table_id) -> (过期时间, {字段名: 字段 ID})
+        self._field_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, str]]] = {}
+        self.field_cache_ttl = float(os.getenv("FEISHU_FIELD_CACHE_TTL", 300))
+        # 记录 ID 缓存（LRU）：(app_token, table_id, video_id) -> record_id
+        self._record_id_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self.record_id_cache_size = int(os.getenv("FEISHU_RECORD_ID_CACHE_SIZE", 10000))
+        self.cache_stats = {
+            "field_map_hits": 0,
+            "field_map_misses": 0,
+            "record_id_hits": 0,
+            "record_id_misses": 0,
+        }
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        with self._cache_lock:
+            return {
+                **self.cache_stats,
+                "field_map_entries": len(self._field_cache),
+                "record_id_entries": len(self._record_id_cache),
+            }
+
     def _create_client(self) -> Client:
         """创建飞书 API 客户端"""
         return Client.builder() \
@@ -37,7 +73,8 @@ class FeishuWriter:
         app_token: str,
         table_id: str,
         scores: List[VideoScore],
-        field_mapping: Dict[str, str]
+        field_mapping: Dict[str, str],
+        bulk: bool = True
     ) -> Dict[str, Any]:
         """
         批量更新视频评分到飞书表格
@@ -47,11 +84,12 @@ class FeishuWriter:
             table_id: 数据表 ID
             scores: 视频评分列表
             field_mapping: 字段映射
+            bulk: 是否使用批量模式（OR 条件批量查找 + batch_update 批量写入）
 
         Returns:
-            更新结果统计
+            更新结果统计，包含每条记录的结果明细 results
         """
-        print(f"[FeishuWriter] 开始批量更新，记录数: {len(scores)}")
+        print(f"[FeishuWriter] 开始批量更新，记录数: {len(scores)}, bulk={bulk}")
 
         # 构建字段名到飞书字段 ID 的映射
         field_id_map = self._get_field_id_map(app_token, table_id, field_mapping)
@@ -59,43 +97,119 @@ class FeishuWriter:
         if not field_id_map:
             return {"success": 0, "failed": len(scores), "error": "无法获取字段映射"}
 
-        # 批量更新
-        success_count = 0
-        failed_count = 0
+        if bulk:
+            results = self._bulk_update_scores(app_token, table_id, scores, field_id_map)
+        else:
+            results = self._update_scores_one_by_one(app_token, table_id, scores, field_id_map)
+
+        success_count = sum(1 for r in results if r["success"])
+        result = {
+            "success": success_count,
+            "failed": len(results) - success_count,
+            "total": len(scores),
+            "results": results
+        }
+        print(f"[FeishuWriter] 批量更新完成: success={result['success']}, failed={result['failed']}, total={result['total']}")
+        return result
+
+    def _bulk_update_scores(
+        self,
+        app_token: str,
+        table_id: str,
+        scores: List[VideoScore],
+        field_id_map: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """
+        批量模式：一次性解析 video_id -> record_id，再按 BATCH_UPDATE_SIZE 分块写入
+
+        同一记录在本次调用中出现多次时只写入最后一次的评分（同一 batch_update 请求中
+        重复的 record_id 会导致整块失败或结果不确定），被覆盖的结果标记 superseded
+        """
+        record_id_map = self._find_record_ids_by_video_ids(
+            app_token, table_id, [score.video_id for score in scores]
+        )
+
+        results = []
+        # record_id -> (对应的结果列表, AppTableRecord)，按 record_id 去重
+        pending: "OrderedDict[str, Tuple[List[Dict[str, Any]], AppTableRecord]]" = OrderedDict()
+        for score in scores:
+            record_id = record_id_map.get(score.video_id)
+            result = {"video_id": score.video_id, "record_id": record_id, "success": False, "error": None}
+            results.append(result)
+
+            if not record_id:
+                result["error"] = "未找到记录"
+                print(f"[FeishuWriter] 未找到记录: {score.video_id}")
+                continue
+
+            record_results = [result]
+            if record_id in pending:
+                superseded, _ = pending.pop(record_id)
+                for previous in superseded:
+                    previous["superseded"] = True
+                record_results = superseded + record_results
+
+            pending[record_id] = (record_results, AppTableRecord.builder()
+                .record_id(record_id)
+                .fields(self._build_score_fields(score, field_id_map))
+                .build())
+
+        updates = list(pending.values())
+        for i in range(0, len(updates), self.BATCH_UPDATE_SIZE):
+            chunk = updates[i:i + self.BATCH_UPDATE_SIZE]
+            error = self._batch_update_records(app_token, table_id, [record for _, record in chunk])
+            chunk_results = [result for record_results, _ in chunk for result in record_results]
+            for result in chunk_results:
+                result["success"] = error is None
+                result["error"] = error
+            if error is not None:
+                self._evict_record_ids(app_token, table_id, [result["video_id"] for result in chunk_results])
+            print(f"[FeishuWriter] 批量写入 {i // self.BATCH_UPDATE_SIZE + 1}: {len(chunk)} 条, "
+                  f"{'成功' if error is None else '失败: ' + error}")
+
+        return results
+
+    def _update_scores_one_by_one(
+        self,
+        app_token: str,
+        table_id: str,
+        scores: List[VideoScore],
+        field_id_map: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """逐条模式：每条记录单独查找并更新"""
+        results = []
 
         for score in scores:
+            result = {"video_id": score.video_id, "record_id": None, "success": False, "error": None}
+            results.append(result)
             try:
                 # 先根据 video_id 查找对应的记录
                 record_id = self._find_record_by_video_id(
                     app_token, table_id, score.video_id
                 )
+                result["record_id"] = record_id
 
                 if record_id:
                     # 更新记录
                     if self._update_record(
                         app_token, table_id, record_id, score, field_id_map
                     ):
-                        success_count += 1
+                        result["success"] = True
                         print(f"[FeishuWriter] 成功更新: {score.video_id}")
                     else:
-                        failed_count += 1
+                        result["error"] = "更新失败"
+                        self._evict_record_ids(app_token, table_id, [score.video_id])
                         print(f"[FeishuWriter] 更新失败: {score.video_id}")
                 else:
                     # 未找到记录
-                    failed_count += 1
+                    result["error"] = "未找到记录"
                     print(f"[FeishuWriter] 未找到记录: {score.video_id}")
 
             except Exception as e:
-                failed_count += 1
+                result["error"] = str(e)
                 print(f"[FeishuWriter] 更新异常 {score.video_id}: {e}")
 
-        result = {
-            "success": success_count,
-            "failed": failed_count,
-            "total": len(scores)
-        }
-        print(f"[FeishuWriter] 批量更新完成: {result}")
-        return result
+        return results
 
     def _get_field_id_map(
         self,
@@ -103,25 +217,16 @@ class FeishuWriter:
         table_id: str,
         field_mapping: Dict[str, str]
     ) -> Dict[str, str]:
-        """获取字段名到字段 ID 的映射"""
+        """获取字段名到字段 ID 的映射（表字段列表按 field_cache_ttl 缓存）"""
         try:
-            request = ListAppTableFieldRequest.builder() \
-                .app_token(app_token) \
-                .table_id(table_id) \
-                .build()
-
-            response = self.client.bitable.v1.app_table_field.list(request)
-
-            if not response.success():
-                print(f"[FeishuWriter] 获取字段列表失败: {response.msg}")
+            table_fields = self.get_table_fields(app_token, table_id)
+            if table_fields is None:
                 return {}
 
-            field_map = {}
-            target_field_names = list(field_mapping.keys())
-
-            for field in response.data.items:
-                if field.field_name in target_field_names:
-                    field_map[field.field_name] = field.field_id
+            field_map = {
+                name: field_id for name, field_id in table_fields.items()
+                if name in field_mapping
+            }
 
             print(f"[FeishuWriter] 字段映射: {field_map}")
             return field_map
@@ -130,6 +235,70 @@ class FeishuWriter:
             print(f"[FeishuWriter] 获取字段映射异常: {e}")
             return {}
 
+    def get_table_fields(self, app_token: str, table_id: str) -> Optional[Dict[str, str]]:
+        """获取表的全部字段（字段名 -> 字段 ID，按 field_cache_ttl 缓存），失败返回 None；读取服务也据此裁剪字段投影"""
+        key = (app_token, table_id)
+        with self._cache_lock:
+            cached = self._field_cache.get(key)
+            if cached and cached[0] > time.time():
+                self.cache_stats["field_map_hits"] += 1
+                return cached[1]
+            self.cache_stats["field_map_misses"] += 1
+
+        table_fields = {}
+        page_token = ""
+        while True:
+            request = ListAppTableFieldRequest.builder() \
+                .app_token(app_token) \
+                .table_id(table_id) \
+                .page_size(100) \
+                .page_token(page_token) \
+                .build()
+
+            response = self.client.bitable.v1.app_table_field.list(request)
+
+            if not response.success():
+                print(f"[FeishuWriter] 获取字段列表失败: {response.msg}")
+                return None
+
+            for field in response.data.items or []:
+                table_fields[field.field_name] = field.field_id
+
+            if not response.data.has_more or not response.data.page_token:
+                break
+            page_token = response.data.page_token
+
+        with self._cache_lock:
+            self._field_cache[key] = (time.time() + self.field_cache_ttl, table_fields)
+        return table_fields
+
+    def _get_cached_record_id(self, app_token: str, table_id: str, video_id: str) -> Optional[str]:
+        """从 LRU 中读取记录 ID"""
+        key = (app_token, table_id, video_id)
+        with self._cache_lock:
+            record_id = self._record_id_cache.get(key)
+            if record_id is None:
+                self.cache_stats["record_id_misses"] += 1
+                return None
+            self._record_id_cache.move_to_end(key)
+            self.cache_stats["record_id_hits"] += 1
+            return record_id
+
+    def _cache_record_id(self, app_token: str, table_id: str, video_id: str, record_id: str) -> None:
+        """写入 LRU，超出容量时淘汰最久未使用的条目"""
+        key = (app_token, table_id, video_id)
+        with self._cache_lock:
+            self._record_id_cache[key] = record_id
+            self._record_id_cache.move_to_end(key)
+            while len(self._record_id_cache) > self.record_id_cache_size:
+                self._record_id_cache.popitem(last=False)
+
+    def _evict_record_ids(self, app_token: str, table_id: str, video_ids: List[str]) -> None:
+        """写入失败时淘汰对应缓存（记录可能已被删除）"""
+        with self._cache_lock:
+            for video_id in video_ids:
+                self._record_id_cache.pop((app_token, table_id, video_id), None)
+
     def _find_record_by_video_id(
         self,
         app_token: str,
@@ -137,27 +306,28 @@ class FeishuWriter:
         video_id: str
     ) -> str | None:
         """根据视频 ID 查找记录 ID"""
+        record_id = self._get_cached_record_id(app_token, table_id, video_id)
+        if record_id:
+            return record_id
+
         try:
             # 使用搜索 API
             request = SearchAppTableRecordRequest.builder() \
                 .app_token(app_token) \
                 .table_id(table_id) \
-                .filter(formula_view.Filter.builder()
-                    .conjunction("and")
-                    .conditions([
-                        formula_view.Condition.builder()
-                            .field_name("视频编号")
-                            .operator("is")
-                            .value([video_id])
-                            .build()
-                    ])
+                .page_size(1) \
+                .request_body(SearchAppTableRecordRequestBody.builder()
+                    .field_names([self.VIDEO_ID_FIELD])
+                    .filter(self._build_video_id_filter([video_id]))
                     .build()) \
                 .build()
 
             response = self.client.bitable.v1.app_table_record.search(request)
 
             if response.success() and response.data.items:
-                return response.data.items[0].record_id
+                record_id = response.data.items[0].record_id
+                self._cache_record_id(app_token, table_id, video_id, record_id)
+                return record_id
 
             return None
 
@@ -165,6 +335,151 @@ class FeishuWriter:
             print(f"[FeishuWriter] 查找记录异常: {e}")
             return None
 
+    def _find_record_ids_by_video_ids(
+        self,
+        app_token: str,
+        table_id: str,
+        video_ids: List[str]
+    ) -> Dict[str, str]:
+        """
+        批量查找视频 ID 对应的记录 ID
+
+        每 SEARCH_OR_CHUNK 个视频 ID 合并为一个 OR 条件的 search 请求；
+        同一视频编号对应多条记录时，与逐条模式一致取第一条
+
+        Returns:
+            video_id -> record_id 映射（未找到的视频不在映射中）
+        """
+        unique_ids = list(dict.fromkeys(v for v in video_ids if v))
+        record_id_map: Dict[str, str] = {}
+
+        # 先查 LRU，只搜索未命中的视频
+        missing_ids = []
+        for video_id in unique_ids:
+            record_id = self._get_cached_record_id(app_token, table_id, video_id)
+            if record_id:
+                record_id_map[video_id] = record_id
+            else:
+                missing_ids.append(video_id)
+
+        for i in range(0, len(missing_ids), self.SEARCH_OR_CHUNK):
+            chunk = missing_ids[i:i + self.SEARCH_OR_CHUNK]
+            request_body = SearchAppTableRecordRequestBody.builder() \
+                .field_names([self.VIDEO_ID_FIELD]) \
+                .filter(self._build_video_id_filter(chunk)) \
+                .build()
+            page_token = ""
+
+            try:
+                while True:
+                    request = SearchAppTableRecordRequest.builder() \
+                        .app_token(app_token) \
+                        .table_id(table_id) \
+                        .page_size(self.SEARCH_PAGE_SIZE) \
+                        .page_token(page_token) \
+                        .request_body(request_body) \
+                        .build()
+
+                    response = self.client.bitable.v1.app_table_record.search(request)
+
+                    if not response.success():
+                        print(f"[FeishuWriter] 批量查找记录失败: {response.msg}, code: {response.code}")
+                        break
+
+                    for item in response.data.items or []:
+                        video_id = self._field_text(item.fields.get(self.VIDEO_ID_FIELD))
+                        if video_id and video_id not in record_id_map:
+                            record_id_map[video_id] = item.record_id
+                            self._cache_record_id(app_token, table_id, video_id, item.record_id)
+
+                    if not response.data.has_more or not response.data.page_token:
+                        break
+                    page_token = response.data.page_token
+
+            except Exception as e:
+                print(f"[FeishuWriter] 批量查找记录异常: {e}")
+
+        print(f"[FeishuWriter] 批量查找记录: {len(record_id_map)}/{len(unique_ids)} 个视频匹配 "
+              f"(缓存命中 {len(unique_ids) - len(missing_ids)})")
+        return record_id_map
+
+    def _build_video_id_filter(self, video_ids: List[str]) -> FilterInfo:
+        """构建「视频编号 is ...」的 OR 过滤条件"""
+        return FilterInfo.builder() \
+            .conjunction("or") \
+            .conditions([
+                Condition.builder()
+                    .field_name(self.VIDEO_ID_FIELD)
+                    .operator("is")
+                    .value([video_id])
+                    .build()
+                for video_id in video_ids
+            ]) \
+            .build()
+
+    def _field_text(self, value: Any) -> str:
+        """提取文本字段的值（search 接口的文本字段以富文本片段数组返回）"""
+        if isinstance(value, list):
+            return "".join(v.get("text", "") if isinstance(v, dict) else str(v) for v in value)
+        return str(value) if value is not None else ""
+
+    def _batch_update_records(
+        self,
+        app_token: str,
+        table_id: str,
+        records: List[AppTableRecord]
+    ) -> str | None:
+        """
+        调用 batch_update 接口批量更新（单次最多 BATCH_UPDATE_SIZE 条）
+
+        Returns:
+            失败时返回错误信息，成功返回 None
+        """
+        try:
+            request = BatchUpdateAppTableRecordRequest.builder() \
+                .app_token(app_token) \
+                .table_id(table_id) \
+                .request_body(BatchUpdateAppTableRecordRequestBody.builder()
+                    .records(records)
+                    .build()) \
+                .build()
+
+            response = self.client.bitable.v1.app_table_record.batch_update(request)
+
+            if not response.success():
+                return f"{response.msg} (code: {response.code})"
+            return None
+
+        except Exception as e:
+            print(f"[FeishuWriter] 批量更新记录异常: {e}")
+            return str(e)
+
+    def _build_score_fields(self, score: VideoScore, field_id_map: Dict[str, str]) -> Dict[str, Any]:
+        """构建评分写入字段"""
+        fields = {}
+
+        # AI 评分
+        if "AI 评分" in field_id_map:
+            fields[field_id_map["AI 评分"]] = score.overall_score
+
+        # AI 评级
+        if "AI 评级" in field_id_map:
+            fields[field_id_map["AI 评级"]] = score.grade
+
+        # 病毒指数
+        if "病毒指数" in field_id_map:
+            fields[field_id_map["病毒指数"]] = score.viral_index
+
+        # AI 建议
+        if "AI 建议" in field_id_map:
+            fields[field_id_map["AI 建议"]] = score.optimization_advice
+
+        # 分析理由
+        if "分析理由" in field_id_map:
+            fields[field_id_map["分析理由"]] = score.reasoning
+
+        return fields
+
     def _update_record(
         self,
         app_token: str,
@@ -176,34 +491,14 @@ class FeishuWriter:
         """更新单条记录"""
         try:
             # 构建更新数据
-            fields = {}
-
-            # AI 评分
-            if "AI 评分" in field_id_map:
-                fields[field_id_map["AI 评分"]] = score.overall_score
-
-            # AI 评级
-            if "AI 评级" in field_id_map:
-                fields[field_id_map["AI 评级"]] = score.grade
-
-            # 病毒指数
-            if "病毒指数" in field_id_map:
-                fields[field_id_map["病毒指数"]] = score.viral_index
-
-            # AI 建议
-            if "AI 建议" in field_id_map:
-                fields[field_id_map["AI 建议"]] = score.optimization_advice
-
-            # 分析理由
-            if "分析理由" in field_id_map:
-                fields[field_id_map["分析理由"]] = score.reasoning
+            fields = self._build_score_fields(score, field_id_map)
 
             # 调用更新 API
             request = UpdateAppTableRecordRequest.builder() \
                 .app_token(app_token) \
                 .table_id(table_id) \
                 .record_id(record_id) \
-                .app_table_record(AppTableRecord.builder()
+                .request_body(AppTableRecord.builder()
                     .fields(fields)
                     .build()) \
                 .build()
@@ -217,7 +512,27 @@ class FeishuWriter:
             return False
 
 
+# 进程级写入服务池：按 app_id 复用客户端（保留 tenant token）和缓存
+_writer_pool: Dict[str, FeishuWriter] = {}
+_writer_pool_lock = threading.Lock()
+
+
 # 便捷函数
 def create_feishu_writer(app_id: str, app_secret: str) -> FeishuWriter:
-    """创建飞书写入服务实例"""
-    return FeishuWriter(app_id, app_secret)
+    """获取飞书写入服务实例（同一 app_id 复用同一实例，密钥变化时重建）"""
+    with _writer_pool_lock:
+        writer = _writer_pool.get(app_id)
+        if writer is None or writer.app_secret != app_secret:
+            writer = FeishuWriter(app_id, app_secret)
+            _writer_pool[app_id] = writer
+        return writer
+
+
+def get_writer_pool_stats() -> Dict[str, Any]:
+    """获取写入服务池的缓存统计（app_id 脱敏）"""
+    with _writer_pool_lock:
+        writers = list(_writer_pool.items())
+    return {
+        "writers": len(writers),
+        "stats": {f"{app_id[:10]}...": writer.get_cache_stats() for app_id, writer in writers}
+    }
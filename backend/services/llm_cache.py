@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Result Cache - LLM 结果缓存（内容寻址）
+以「模型名 + 提示词模板版本 + 归一化输入」的哈希为键，SQLite 持久化，
+支持 TTL 过期与按总大小的 LRU 淘汰
+
+读取不写库：命中时只在内存中记录访问时间，按 ACCESS_FLUSH_INTERVAL 批量写回（淘汰前也会写回）；
+所有方法都是同步阻塞的，异步代码中请通过 asyncio.to_thread 调用
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+"""
+
+
+class LLMResultCache:
+    """LLM 结果缓存（SQLite）"""
+
+    # 每写入多少次检查一次总大小
+    EVICT_CHECK_INTERVAL = 50
+    # 命中时的访问时间批量写回间隔（秒）
+    ACCESS_FLUSH_INTERVAL = 30
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_bytes: int):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite 文件路径
+            ttl_seconds: 条目有效期（秒）
+            max_bytes: 缓存总大小上限（字节），超出后按最近访问时间淘汰
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        # 尚未写回的访问时间：key -> last_access
+        self._accessed: Dict[str, float] = {}
+        self._last_flush = time.time()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(namespace: str, model: str, prompt_version: str, payload: Dict[str, Any]) -> str:
+        """
+        生成缓存键
+
+        Args:
+            namespace: 调用类型（如 content_batch / content_single / matrix）
+            model: 模型名
+            prompt_version: 提示词模板版本
+            payload: 归一化后的输入字段
+        """
+        raw = json.dumps(
+            {"ns": namespace, "model": model, "prompt": prompt_version, "input": payload},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，过期或不存在返回 None（过期条目留给淘汰时清理）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if not row or now - row[1] > self.ttl_seconds:
+                self.stats["misses"] += 1
+                return None
+            self._accessed[key] = now
+            self.stats["hits"] += 1
+            if now - self._last_flush >= self.ACCESS_FLUSH_INTERVAL:
+                self._flush_access_locked()
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, namespace: str, value: Dict[str, Any]) -> None:
+        """写入缓存"""
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, namespace, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, data, len(data.encode("utf-8")), now, now)
+            )
+            self._accessed.pop(key, None)
+            self._conn.commit()
+            self.stats["writes"] += 1
+            self._writes += 1
+            if self._writes % self.EVICT_CHECK_INTERVAL == 0:
+                self._evict_locked()
+
+    def _flush_access_locked(self) -> None:
+        """把内存中累积的访问时间批量写回（不提交，由调用方提交）"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE entries SET last_access = MAX(last_access, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+        self._last_flush = time.time()
+
+    def _evict_locked(self) -> None:
+        """清理过期条目，并在超出大小上限时按最近访问时间淘汰到上限的 90%"""
+        self._flush_access_locked()
+        now = time.time()
+        cursor = self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+        evicted = cursor.rowcount
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+            to_delete = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                to_delete.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+            evicted += len(to_delete)
+
+        self._conn.commit()
+        if evicted:
+            self.stats["evictions"] += evicted
+            logger.info(f"[LLMCache] 淘汰 {evicted} 条缓存")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            return {**self.stats, "entries": entries, "bytes": total}
+
+    def close(self) -> None:
+        """写回未保存的访问时间并关闭数据库连接"""
+        with self._lock:
+            self._flush_access_locked()
+            self._conn.commit()
+            self._conn.close()
+
+
+# 全局单例
+_llm_cache: Optional[LLMResultCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResultCache]:
+    """
+    获取 LLM 结果缓存单例
+
+    LLM_CACHE_ENABLED=false 时禁用；路径由 LLM_CACHE_PATH 指定，
+    有效期由 LLM_CACHE_TTL_HOURS 控制（默认 168），大小上限由 LLM_CACHE_MAX_MB 控制（默认 50）
+    """
+    global _llm_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _llm_cache is None:
+        db_path = os.getenv(
+            "LLM_CACHE_PATH",
+            os.path.join(os.path.dirname(__file__), "..", "data", "llm_cache.sqlite3")
+        )
+        try:
+            _llm_cache = LLMResultCache(
+                db_path,
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL_HOURS", 168)) * 3600,
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", 50)) * 1024 * 1024)
+            )
+            logger.info(f"[LLMCache] 缓存已打开: {db_path}")
+        except Exception as e:
+            logger.error(f"[LLMCache] 打开缓存失败，将不使用缓存: {e}")
+            return None
+    return _llm_cache
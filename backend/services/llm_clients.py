@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Clients - 共享的 OpenAI 客户端注册表
+所有 Agent 复用同一组客户端和 HTTP 连接池（keep-alive），避免每次创建 Agent 都重新握手；
+应用退出时统一关闭
+"""
+import os
+import asyncio
+import logging
+import weakref
+from typing import Dict, Tuple, Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _client_key(api_key: Optional[str], base_url: Optional[str]) -> Tuple[str, str]:
+    return (
+        api_key if api_key is not None else os.getenv("OPENAI_API_KEY", ""),
+        base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    )
+
+
+def _pool_limits() -> httpx.Limits:
+    """
+    连接池配置
+
+    LLM_MAX_CONNECTIONS（默认 20）、LLM_MAX_KEEPALIVE_CONNECTIONS（默认 10）、
+    LLM_KEEPALIVE_EXPIRY（空闲连接保留秒数，默认 60）
+    """
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 10)),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60)),
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    """请求超时：LLM_REQUEST_TIMEOUT（默认 600 秒，推理模型输出较慢），连接超时 10 秒"""
+    return httpx.Timeout(float(os.getenv("LLM_REQUEST_TIMEOUT", 600)), connect=10.0)
+
+
+# 同步客户端：进程内共享
+_sync_clients: Dict[Tuple[str, str], OpenAI] = {}
+
+# 异步客户端：每个事件循环一组（httpx 异步连接池不能跨事件循环使用）
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
+    """
+    获取共享的同步 OpenAI 客户端
+
+    Args:
+        api_key: API Key，默认 OPENAI_API_KEY
+        base_url: API 地址，默认 OPENAI_BASE_URL
+    """
+    key = _client_key(api_key, base_url)
+    client = _sync_clients.get(key)
+    if client is None:
+        client = OpenAI(
+            api_key=key[0],
+            base_url=key[1],
+            http_client=httpx.Client(limits=_pool_limits(), timeout=_timeout())
+        )
+        _sync_clients[key] = client
+        logger.info(f"[LLMClients] 创建同步客户端: {key[1]}")
+    return client
+
+
+def get_async_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """
+    获取当前事件循环共享的异步 OpenAI 客户端（需在事件循环中调用）
+
+    Args:
+        api_key: API Key，默认 OPENAI_API_KEY
+        base_url: API 地址，默认 OPENAI_BASE_URL
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    key = _client_key(api_key, base_url)
+    client = clients.get(key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=key[0],
+            base_url=key[1],
+            http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=_timeout())
+        )
+        clients[key] = client
+        logger.info(f"[LLMClients] 创建异步客户端: {key[1]}")
+    return client
+
+
+async def close_llm_clients() -> None:
+    """关闭当前事件循环的异步客户端和所有同步客户端（应用退出时调用）"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    clients = _async_clients.pop(loop, {}) if loop is not None else {}
+    for client in clients.values():
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"[LLMClients] 关闭异步客户端失败: {e}")
+
+    for client in _sync_clients.values():
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"[LLMClients] 关闭同步客户端失败: {e}")
+    _sync_clients.clear()
@@ -5,10 +5,15 @@ MatrixAdvisor - 视频排期智能分析 Agent
 """
 import os
 import json
-from typing import List, Dict
-from openai import OpenAI
+import asyncio
+from typing import List, Dict, Optional
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from services.llm_cache import LLMResultCache, get_llm_cache
+from services.llm_clients import get_async_openai_client
+from services.agents.rate_limiter import estimate_tokens, get_llm_rate_limiter
+
 load_dotenv()
 
 
@@ -22,44 +27,128 @@ class MatrixAdvisor:
     - 输出推理过程
     """
 
+    # 提示词模板版本：修改 _build_prompt / _build_batch_prompt 时递增对应版本，使该模板的旧结果缓存失效
+    PROMPT_VERSIONS = {"single": "1", "batch": "1"}
+
+    # 每个任务预估的输出 token 数（用于 token 预算，推理模型输出较长）
+    COMPLETION_TOKENS_PER_TASK = 800
+
     def __init__(self):
         """初始化 Agent"""
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api.deepseek.com")
-        )
+        self.base_url = os.getenv("OPENAI_BASE_URL", "https://api.deepseek.com")
         self.model = os.getenv("OPENAI_MODEL_NAME", "deepseek-reasoner")
+        # 并发执行配置
+        self.max_workers = max(1, int(os.getenv("MATRIX_MAX_WORKERS", 4)))
+        self.call_timeout = float(os.getenv("MATRIX_CALL_TIMEOUT", 120))
+        self.batch_size = max(1, int(os.getenv("MATRIX_BATCH_SIZE", 1)))
 
         print(f"[MatrixAdvisor] 初始化完成")
         print(f"[MatrixAdvisor] 使用模型: {self.model}")
         print(f"[MatrixAdvisor] API Base: {os.getenv('OPENAI_BASE_URL')}")
 
-    def analyze_schedule(self, tasks: List[Dict]) -> List[Dict]:
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """当前事件循环共享的异步 LLM 客户端（复用连接池）"""
+        return get_async_openai_client(base_url=self.base_url)
+
+    def analyze_schedule(
+        self,
+        tasks: List[Dict],
+        use_cache: bool = True,
+        batch_size: Optional[int] = None
+    ) -> List[Dict]:
         """
-        分析排期任务并返回评分和建议
+        分析排期任务并返回评分和建议（同步入口，兼容旧接口）
+
+        内部用 asyncio.run 运行异步并发引擎，只能在没有运行中事件循环的线程里调用；
+        在事件循环中（如 FastAPI 路由）请直接 await analyze_schedule_async
 
         Args:
             tasks: 任务列表，每个任务包含 id, title, views 等字段
+            use_cache: 是否读取 LLM 结果缓存（False 时强制重新分析，新结果仍写入缓存）
+            batch_size: 每次 LLM 调用评估的任务数，None 时使用 MATRIX_BATCH_SIZE
 
         Returns:
             分析结果列表，每个结果包含 id, score, advice, reasoning
+
+        Raises:
+            RuntimeError: 在运行中的事件循环里调用
         """
-        results = []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.analyze_schedule_async(tasks, use_cache, batch_size))
+        raise RuntimeError(
+            "MatrixAdvisor.analyze_schedule 不能在运行中的事件循环里调用，请改为 await analyze_schedule_async"
+        )
+
+    async def analyze_schedule_async(
+        self,
+        tasks: List[Dict],
+        use_cache: bool = True,
+        batch_size: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        并发分析排期任务
+
+        流程：
+        1. 命中缓存的任务直接复用结果
+        2. 其余任务按 batch_size 分组（1 为逐个分析，>1 为多任务 prompt）
+        3. 各组在 max_workers 个并发槽位内执行，每次调用受 call_timeout 限制
+        4. 按输入顺序输出结果
 
-        for task in tasks:
-            analysis = self._think(task)
-            results.append({
+        Args:
+            tasks: 任务列表
+            use_cache: 是否读取 LLM 结果缓存
+            batch_size: 每次 LLM 调用评估的任务数
+
+        Returns:
+            分析结果列表（与输入顺序一致）
+        """
+        if not tasks:
+            return []
+
+        batch_size = max(1, batch_size or self.batch_size)
+        analyses: List[Optional[Dict]] = [None] * len(tasks)
+
+        if use_cache:
+            # 缓存读写是同步 SQLite 操作，放到线程中执行，避免阻塞事件循环
+            analyses = await asyncio.to_thread(lambda: [self._get_cached_analysis(task) for task in tasks])
+        pending = [index for index, analysis in enumerate(analyses) if analysis is None]
+
+        print(f"[MatrixAdvisor] 共 {len(tasks)} 个任务，缓存命中 {len(tasks) - len(pending)} 个，"
+              f"每次调用 {batch_size} 个任务")
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run_group(indices: List[int]) -> None:
+            async with semaphore:
+                group = [tasks[i] for i in indices]
+                if len(group) == 1:
+                    results = [await self._think_async(group[0])]
+                else:
+                    results = await self._think_batch_async(group)
+            for index, analysis in zip(indices, results):
+                analyses[index] = analysis
+
+        await asyncio.gather(*[
+            run_group(pending[i:i + batch_size])
+            for i in range(0, len(pending), batch_size)
+        ])
+
+        return [
+            {
                 "id": task["id"],
                 "score": analysis["score"],
                 "advice": analysis["advice"],
                 "reasoning": analysis["reasoning"]
-            })
-
-        return results
+            }
+            for task, analysis in zip(tasks, analyses)
+        ]
 
-    def _think(self, task: Dict) -> Dict:
+    async def _think_async(self, task: Dict) -> Dict:
         """
-        调用 LLM 进行分析思考
+        调用 LLM 分析单个任务（异步版本，不读取缓存，成功结果写入缓存）
 
         Args:
             task: 单个任务对象
@@ -70,27 +159,148 @@ class MatrixAdvisor:
         prompt = self._build_prompt(task)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
-
-            result = json.loads(response.choices[0].message.content)
-            return {
-                "score": result.get("score", 5),
-                "advice": result.get("advice", "暂无建议"),
-                "reasoning": result.get("reasoning", "")
-            }
+            result = await self._call_llm_async(prompt, self.COMPLETION_TOKENS_PER_TASK)
+            analysis = self._normalize_analysis(result)
+            if self._has_required_fields(result):
+                await asyncio.to_thread(self._store_analysis, task, analysis, "single")
+            return analysis
+        except asyncio.TimeoutError:
+            print(f"[MatrixAdvisor] LLM 调用超时 ({self.call_timeout}s): {task.get('id')}")
+            return self._get_fallback_result(f"调用超时（{self.call_timeout:.0f} 秒）")
         except Exception as e:
-            # 降级策略：LLM 调用失败时返回默认值
             print(f"[MatrixAdvisor] LLM 调用失败: {str(e)}")
-            return {
-                "score": 5,
-                "advice": f"AI 分析不可用: {str(e)}",
-                "reasoning": "LLM 调用失败，使用默认评分"
-            }
+            return self._get_fallback_result(str(e))
+
+    async def _think_batch_async(self, tasks: List[Dict]) -> List[Dict]:
+        """
+        一次 LLM 调用评估多个任务（多任务 prompt 模式）
+
+        按 id 匹配返回结果；调用失败或缺失的任务降级为逐个分析
+
+        Args:
+            tasks: 任务列表
+
+        Returns:
+            与 tasks 一一对应的分析结果列表
+        """
+        prompt = self._build_batch_prompt(tasks)
+
+        by_id: Dict[str, Dict] = {}
+        # 必需字段全部由模型给出的任务 id（只缓存这些结果）
+        complete = set()
+        try:
+            response = await self._call_llm_async(prompt, self.COMPLETION_TOKENS_PER_TASK * len(tasks))
+            items = response.get("results", []) if isinstance(response, dict) else response
+            for item in items or []:
+                if isinstance(item, dict) and item.get("id") is not None:
+                    by_id[str(item["id"])] = self._normalize_analysis(item)
+                    if self._has_required_fields(item):
+                        complete.add(str(item["id"]))
+        except asyncio.TimeoutError:
+            print(f"[MatrixAdvisor] 批量调用超时 ({self.call_timeout}s)，{len(tasks)} 个任务降级为逐个分析")
+        except Exception as e:
+            print(f"[MatrixAdvisor] 批量调用失败: {e}，{len(tasks)} 个任务降级为逐个分析")
+
+        results: List[Optional[Dict]] = [by_id.get(str(task["id"])) for task in tasks]
+        missing = [index for index, analysis in enumerate(results) if analysis is None]
+
+        def store_results() -> None:
+            for task, analysis in zip(tasks, results):
+                if analysis is not None and str(task["id"]) in complete:
+                    self._store_analysis(task, analysis, "batch")
+
+        await asyncio.to_thread(store_results)
+
+        if missing:
+            retried = await asyncio.gather(*[self._think_async(tasks[i]) for i in missing])
+            for index, analysis in zip(missing, retried):
+                results[index] = analysis
+
+        return results
+
+    async def _call_llm_async(self, prompt: str, expected_completion_tokens: int) -> Dict:
+        """
+        异步调用 LLM 并解析 JSON（受全局限流器和单次调用超时限制）
+
+        Raises:
+            asyncio.TimeoutError: 超过 call_timeout
+        """
+        limiter = get_llm_rate_limiter()
+        async with limiter.limit(estimate_tokens(prompt) + expected_completion_tokens):
+            response = await asyncio.wait_for(
+                self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                ),
+                timeout=self.call_timeout
+            )
+        return json.loads(response.choices[0].message.content)
+
+    def _normalize_analysis(self, result: Dict) -> Dict:
+        """提取 score, advice, reasoning 字段"""
+        return {
+            "score": result.get("score", 5),
+            "advice": result.get("advice", "暂无建议"),
+            "reasoning": result.get("reasoning", "")
+        }
+
+    def _has_required_fields(self, result: Dict) -> bool:
+        """
+        模型返回的结果是否给出了全部必需字段（评分为数字，建议和理由为非空字符串）
+
+        缺失字段时 _normalize_analysis 会补默认值，这类结果可以使用但不写入缓存
+        """
+        if not isinstance(result, dict):
+            return False
+        score = result.get("score")
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            return False
+        return all(
+            isinstance(result.get(field), str) and result[field].strip() for field in ("advice", "reasoning")
+        )
+
+    def _get_fallback_result(self, error: str) -> Dict:
+        """降级策略：LLM 调用失败时返回默认值"""
+        return {
+            "score": 5,
+            "advice": f"AI 分析不可用: {error}",
+            "reasoning": "LLM 调用失败，使用默认评分"
+        }
+
+    def _cache_key(self, task: Dict, prompt: str) -> str:
+        """
+        按模型、提示词模板及其版本和提示词用到的任务字段生成缓存键（不含任务 id）
+
+        Args:
+            task: 任务对象
+            prompt: 生成结果的提示词模板，"single" 或 "batch"
+        """
+        payload = {
+            "title": " ".join(str(task.get("title", "")).split()),
+            "views": task.get("views"),
+            "groupName": task.get("groupName"),
+            "accountName": task.get("accountName"),
+        }
+        return LLMResultCache.make_key(f"matrix_{prompt}", self.model, self.PROMPT_VERSIONS[prompt], payload)
+
+    def _get_cached_analysis(self, task: Dict) -> Optional[Dict]:
+        """读取任务的缓存结果（两种模板的结果格式相同，依次查找），未启用缓存或未命中返回 None"""
+        cache = get_llm_cache()
+        if cache is None:
+            return None
+        for prompt in self.PROMPT_VERSIONS:
+            analysis = cache.get(self._cache_key(task, prompt))
+            if analysis is not None:
+                return analysis
+        return None
+
+    def _store_analysis(self, task: Dict, analysis: Dict, prompt: str) -> None:
+        """写入任务的分析结果缓存（只在模型给出全部必需字段时调用，降级 / 补默认值的结果不缓存）"""
+        cache = get_llm_cache()
+        if cache is not None:
+            cache.set(self._cache_key(task, prompt), f"matrix_{prompt}", analysis)
 
     def _build_prompt(self, task: Dict) -> str:
         """
@@ -123,6 +333,51 @@ class MatrixAdvisor:
   "reasoning": "<评分理由，简明扼要>"
 }}
 
+评分标准：
+- 9-10分：优质内容，强烈推荐发布
+- 7-8分：良好内容，建议发布
+- 5-6分：一般内容，可考虑发布
+- 1-4分：内容欠佳，不建议发布
+"""
+
+    def _build_batch_prompt(self, tasks: List[Dict]) -> str:
+        """
+        构建多任务分析提示词
+
+        Args:
+            tasks: 任务列表
+
+        Returns:
+            完整的提示词字符串
+        """
+        tasks_list = "\n".join(
+            f"{i}. [id: {task['id']}] 标题：{task['title']}｜浏览量：{task['views']}｜"
+            f"分组：{task.get('groupName') or '未知'}｜账号：{task.get('accountName') or '未知'}"
+            for i, task in enumerate(tasks, 1)
+        )
+        return f"""你是一个短视频矩阵运营专家。请逐个分析以下 {len(tasks)} 个视频的排期合理性。
+
+**视频列表：**
+{tasks_list}
+
+**评估维度：**
+1. 内容质量（基于浏览量判断）
+2. 发布时机合理性
+3. 账号定位契合度
+4. 潜力评估
+
+请返回 JSON 格式，results 中每个视频一项，id 与视频列表中的 id 完全一致：
+{{
+  "results": [
+    {{
+      "id": "<视频 id>",
+      "score": <1-10的评分，整数>,
+      "advice": "<具体的优化建议，50字以内>",
+      "reasoning": "<评分理由，简明扼要>"
+    }}
+  ]
+}}
+
 评分标准：
 - 9-10分：优质内容，强烈推荐发布
 - 7-8分：良好内容，建议发布
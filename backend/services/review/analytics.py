@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Review Analytics - 复盘分析数据包
+每次复盘在构建上下文时基于 VideoStats 计算一次（Top/Bottom、异常值、意外表现、时段分布、
+账号对比、互动率、评级分布），随上下文缓存在会话中，三个 Agent 的提示词都从这里读取，
+不再各自排序 / 遍历视频列表
+"""
+from typing import Dict, Any, Optional
+
+from services.video_stats import VideoStats
+
+
+# Top / Bottom 视频数量
+TOP_K = 3
+BOTTOM_K = 3
+
+# 提示词中列出的 AI 分析 / 意外表现 / 异常值视频数量上限
+AI_INSIGHTS_LIMIT = 10
+UNEXPECTED_LIMIT = 10
+OUTLIER_LIMIT = 5
+
+# 低播放量阈值
+LOW_VIEWS_THRESHOLD = 1000
+
+# 意外表现判定：低评级但播放高于均值的倍数 / 高评级但播放低于均值的倍数
+SURPRISE_RATIO = 1.2
+CONCERN_RATIO = 0.8
+
+
+def _video_entry(stats: VideoStats, index: int) -> Dict[str, Any]:
+    """单个视频的精简信息（带列表下标）"""
+    video = stats.videos[index]
+    analysis = video.ai_analysis or {}
+    return {
+        "index": index,
+        "name": video.name or "未知",
+        "account": video.account or "未知",
+        "views": stats.views[index],
+        "engagement_rate": round(stats.engagement_rate(index), 2),
+        "grade": stats.grades[index],
+        "score": analysis.get("overall_score"),
+        "advice": analysis.get("optimization_advice", ""),
+    }
+
+
+def build_review_analytics(stats: VideoStats) -> Dict[str, Any]:
+    """
+    计算复盘分析数据包（可 JSON 序列化）
+
+    Args:
+        stats: 当日视频的 VideoStats
+
+    Returns:
+        {"totals", "top", "bottom", "outliers", "unexpected", "low_views_count",
+         "time_slots", "accounts", "grade_distribution", "avg_score", "ai_insights", "percentiles"}
+    """
+    totals = stats.totals()
+    avg_views = totals["avg_views"]
+    entries: Dict[int, Dict[str, Any]] = {}
+
+    def entry(index: int) -> Dict[str, Any]:
+        if index not in entries:
+            entries[index] = _video_entry(stats, index)
+        return entries[index]
+
+    # 评级与播放量不一致的视频（视频数 >= 2 时判定），按播放量降序，最多 UNEXPECTED_LIMIT 条
+    unexpected = []
+    if len(stats) >= 2:
+        for index in stats.order:
+            views, grade = stats.views[index], stats.grades[index]
+            if len(unexpected) >= UNEXPECTED_LIMIT:
+                break
+            if grade in ("C", "B") and views > avg_views * SURPRISE_RATIO:
+                unexpected.append({**entry(index), "kind": "surprise"})
+            elif grade in ("S", "A") and views < avg_views * CONCERN_RATIO:
+                unexpected.append({**entry(index), "kind": "concern"})
+
+    outliers = stats.outliers()
+    accounts = [
+        {
+            "account": account,
+            "count": data["count"],
+            "total_views": data["total_views"],
+            "avg_views": round(data["avg_views"], 0),
+            "engagement_rate": round(data["engagement_rate"], 2),
+            "best": entry(data["best_index"])["name"] if data["best_index"] >= 0 else None,
+        }
+        for account, data in stats.account_stats().items()
+    ]
+    accounts.sort(key=lambda x: x["avg_views"], reverse=True)
+
+    time_slots = [
+        {
+            "slot": name,
+            "count": data["count"],
+            "avg_views": round(data["avg_views"], 0),
+            "engagement_rate": round(data["engagement_rate"], 2),
+        }
+        for name, data in stats.time_slot_stats().items()
+    ]
+    time_slots.sort(key=lambda x: x["avg_views"], reverse=True)
+
+    # 有 AI 分析的视频（按播放量降序，最多 AI_INSIGHTS_LIMIT 条）
+    ai_insights = []
+    for index in stats.order:
+        if len(ai_insights) >= AI_INSIGHTS_LIMIT:
+            break
+        if stats.videos[index].ai_analysis:
+            ai_insights.append(entry(index))
+
+    avg_score = stats.avg_score()
+    return {
+        "totals": {
+            "total_videos": totals["total_videos"],
+            "total_views": totals["total_views"],
+            "avg_views": round(avg_views, 0),
+            "avg_engagement_rate": round(totals["avg_engagement_rate"], 2),
+        },
+        "top": [entry(i) for i in stats.top_k(TOP_K)],
+        "bottom": [entry(i) for i in stats.bottom_k(BOTTOM_K)] if len(stats) > TOP_K else [],
+        "outliers": {
+            "high": [entry(i) for i in outliers["high"][:OUTLIER_LIMIT]],
+            "low": [entry(i) for i in outliers["low"][:OUTLIER_LIMIT]],
+        },
+        "unexpected": unexpected,
+        "low_views_count": sum(1 for views in stats.views if views < LOW_VIEWS_THRESHOLD),
+        "time_slots": time_slots,
+        "accounts": accounts,
+        "grade_distribution": stats.grade_distribution(),
+        "avg_score": round(avg_score, 2) if avg_score is not None else None,
+        "ai_insights": ai_insights,
+        "percentiles": stats.percentiles(),
+    }
+
+
+def get_review_analytics(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    读取上下文中缓存的分析数据包，缺失时（如旧会话）计算一次并写回上下文
+
+    Args:
+        context: 复盘上下文
+    """
+    analytics: Optional[Dict[str, Any]] = context.get("analytics")
+    if analytics is None:
+        analytics = build_review_analytics(VideoStats(context.get("videos") or []))
+        context["analytics"] = analytics
+    return analytics
@@ -10,6 +10,9 @@ from abc import ABC, abstractmethod
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from models.video_record import json_default
+from services.llm_clients import get_async_openai_client
+
 load_dotenv()
 
 
@@ -24,6 +27,9 @@ class ReviewAgentBase(ABC):
     - 降级策略
     """
 
+    # 已输出过初始化日志的 Agent 类（只在首次创建时输出）
+    _logged_classes: set = set()
+
     def __init__(self, system_prompt: str):
         """
         初始化 Agent
@@ -32,17 +38,20 @@ class ReviewAgentBase(ABC):
             system_prompt: System Prompt
         """
         self.system_prompt = system_prompt
-        self.client = AsyncOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
-        )
         self.model = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
-        self._log_init()
+        if self.__class__ not in ReviewAgentBase._logged_classes:
+            ReviewAgentBase._logged_classes.add(self.__class__)
+            self._log_init()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """共享的异步 LLM 客户端（复用连接池）"""
+        return get_async_openai_client()
 
     def _log_init(self):
         """记录初始化日志"""
         from . import AGENT_NAME
-        print(f"[{AGENT_NAME}] 初始化完成")
+        print(f"[{AGENT_NAME}] {self.__class__.__name__} 初始化完成")
         print(f"[{AGENT_NAME}] 使用模型: {self.model}")
         print(f"[{AGENT_NAME}] API Base: {os.getenv('OPENAI_BASE_URL')}")
 
@@ -58,7 +67,7 @@ class ReviewAgentBase(ABC):
         Returns:
             用户提示字符串
         """
-        return f"请分析以下数据：\n\n{json.dumps(context, ensure_ascii=False, indent=2)}"
+        return f"请分析以下数据：\n\n{json.dumps(context, ensure_ascii=False, indent=2, default=json_default)}"
 
     async def generate_stream(self, context: Dict[str, Any]) -> AsyncIterator[str]:
         """
@@ -109,9 +118,7 @@ class ReviewAgentBase(ABC):
             import traceback
             traceback.print_exc()
             # 返回降级响应
-            fallback = self._get_fallback_response()
-            for char in fallback:
-                yield char
+            yield self._get_fallback_response()
 
     def _get_fallback_response(self) -> str:
         """
@@ -126,7 +133,6 @@ class ReviewAgentFactory:
     """复盘 Agent 工厂"""
 
     _agents: Dict[str, type] = {}
-    _custom_prompts: Dict[str, str] = {}
 
     @classmethod
     def register(cls, agent_type: str, agent_class: type):
@@ -134,20 +140,20 @@ class ReviewAgentFactory:
         cls._agents[agent_type] = agent_class
 
     @classmethod
-    def set_custom_prompts(cls, prompts: dict):
-        """设置自定义提示词"""
-        cls._custom_prompts = prompts
+    def create(cls, agent_type: str, system_prompt: Optional[str] = None, **kwargs) -> ReviewAgentBase:
+        """
+        创建 Agent 实例
 
-    @classmethod
-    def create(cls, agent_type: str, **kwargs) -> ReviewAgentBase:
-        """创建 Agent 实例"""
+        Args:
+            agent_type: Agent 类型
+            system_prompt: 自定义 System Prompt（由会话传入），为空时使用默认提示词
+        """
         agent_class = cls._agents.get(agent_type)
         if not agent_class:
             raise ValueError(f"未知的 Agent 类型: {agent_type}")
 
         # 使用自定义提示词（如果有）
-        custom_prompt = cls._custom_prompts.get(agent_type)
-        if custom_prompt:
-            return agent_class(system_prompt=custom_prompt)
+        if system_prompt:
+            return agent_class(system_prompt=system_prompt, **kwargs)
 
         return agent_class(**kwargs)
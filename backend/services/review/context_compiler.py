@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Context Compiler - 用户提问上下文编译
+把复盘上下文压缩为去重、受 token 预算约束的摘要，
+替代在提示词中直接嵌入完整上下文 JSON；
+概览、账号统计和 Top / Bottom 视频读取复盘分析数据包，与 Agent 提示词保持一致
+"""
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from models.video_record import VideoRecord
+from services.agents.rate_limiter import estimate_tokens
+from services.review.analytics import get_review_analytics
+
+
+# 问题关键词 -> 需要附带的视频字段
+_FIELD_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "engagement": ("互动", "点赞", "评论", "转发", "分享", "收藏"),
+    "play": ("完播", "时长", "播放时长", "留存"),
+    "time": ("时间", "时段", "几点", "排期", "发布", "早上", "中午", "晚上"),
+    "ai": ("评分", "评级", "ai", "AI", "建议", "病毒", "质量"),
+    "tags": ("标签", "话题", "选题", "题材"),
+}
+
+
+def _video_key(video: VideoRecord) -> Tuple[str, str]:
+    return (video.object_id or video.name, video.account)
+
+
+def select_fields(question: str) -> List[str]:
+    """根据问题内容选择需要附带的视频字段组"""
+    return [group for group, keywords in _FIELD_KEYWORDS.items() if any(k in question for k in keywords)]
+
+
+def format_video_line(video: VideoRecord, fields: List[str]) -> str:
+    """格式化单个视频（只包含与问题相关的字段）"""
+    parts = [
+        f"{video.name or '未知'}",
+        f"[{video.account or '未知'}]",
+        f"播放 {video.read_count:,}",
+        f"互动率 {video.engagement_rate:.2f}%",
+    ]
+    if "engagement" in fields:
+        parts.append(f"赞 {video.like_count} / 评 {video.comment_count} / 转 {video.forward_count}")
+    if "play" in fields:
+        parts.append(f"完播率 {video.full_play_rate:.2f}% / 均播 {video.avg_play_time:.1f}秒")
+    if "time" in fields:
+        parts.append(f"发布 {video.publish_time}")
+    analysis = video.ai_analysis or {}
+    if analysis:
+        parts.append(f"评级 {analysis.get('grade', 'N/A')}({analysis.get('overall_score', 0):.1f})")
+        if "ai" in fields and analysis.get("optimization_advice"):
+            parts.append(f"建议：{analysis['optimization_advice'][:60]}")
+    if "tags" in fields and video.tags:
+        parts.append("标签 " + "/".join(video.tags[:5]))
+    return "- " + "｜".join(parts)
+
+
+def _account_lines(analytics: Dict[str, Any]) -> List[str]:
+    """账号统计（分析数据包中已按平均播放量降序）"""
+    return [
+        f"- {data['account']}: {data['count']} 条｜总播放 {data['total_views']:,}｜平均 {data['avg_views']:,.0f}｜"
+        f"互动率 {data['engagement_rate']:.2f}%｜最佳《{data['best'] or '未知'}》"
+        for data in analytics.get("accounts", [])
+    ]
+
+
+def compile_question_context(
+    context: Dict[str, Any],
+    question: str,
+    token_budget: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    编译用户提问的上下文摘要
+
+    按优先级依次加入：今日概览、账号聚合、问题中提到的账号的视频、
+    Top / Bottom 表现视频、昨日假设；每个视频只出现一次，超出 token 预算后停止加入
+
+    Args:
+        context: 复盘上下文（videos / analytics / date / yesterdayHypotheses 等）
+        question: 用户问题
+        token_budget: token 预算，None 时使用 REVIEW_ASK_CONTEXT_TOKENS（默认 3000）
+
+    Returns:
+        {"text": 摘要文本, "tokens": 估算 token 数, "videos_included": 纳入的视频数,
+         "videos_total": 视频总数, "truncated": 是否因预算截断}
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv("REVIEW_ASK_CONTEXT_TOKENS", 3000))
+
+    videos = context.get("videos") or []
+    analytics = get_review_analytics(context)
+    fields = select_fields(question)
+    lines: List[str] = []
+    used = 0
+    truncated = False
+    included = set()
+
+    def add(line: str, reserve: int = 0) -> bool:
+        """加入一行；reserve 为加入后仍需保留的 token 数"""
+        nonlocal used, truncated
+        cost = estimate_tokens(line) + 1
+        if used + cost + reserve > token_budget:
+            truncated = True
+            return False
+        lines.append(line)
+        used += cost
+        return True
+
+    def omitted_note(count: int) -> str:
+        return f"（另有 {count} 条省略）"
+
+    def add_videos(title: str, candidates: List[VideoRecord]) -> None:
+        # 每加入一行都为「其余视频的省略说明」预留空间，截断时说明一定能放进预算
+        candidates = [v for v in candidates if _video_key(v) not in included]
+        if not candidates or not add(title, estimate_tokens(omitted_note(len(candidates))) + 1):
+            return
+        for index, video in enumerate(candidates):
+            remaining = len(candidates) - index - 1
+            reserve = estimate_tokens(omitted_note(remaining)) + 1 if remaining else 0
+            if not add(format_video_line(video, fields), reserve):
+                add(omitted_note(len(candidates) - index))
+                return
+            included.add(_video_key(video))
+
+    # 1. 今日概览
+    totals = analytics["totals"]
+    add(f"【日期】{context.get('date', '')}")
+    add(
+        f"【今日概览】{totals['total_videos']} 条视频｜总播放 {totals['total_views']:,}｜"
+        f"平均播放 {totals['avg_views']:,.0f}｜平均互动率 {totals['avg_engagement_rate']:.2f}%"
+    )
+
+    # 2. 账号统计
+    account_lines = _account_lines(analytics)
+    if account_lines and add("【按账号统计】"):
+        for line in account_lines:
+            if not add(line):
+                break
+
+    # 3. 问题中提到的账号（按播放量降序）
+    mentioned = {v.account for v in videos if v.account and v.account in question}
+    if mentioned:
+        add_videos(
+            "【问题涉及账号的视频】",
+            sorted((v for v in videos if v.account in mentioned), key=lambda v: v.read_count, reverse=True)
+        )
+
+    # 4. Top / Bottom 表现（分析数据包中的下标指向 videos）
+    top, bottom = analytics["top"], analytics["bottom"]
+    add_videos(f"【Top {len(top)} 表现】", [videos[entry["index"]] for entry in top])
+    add_videos(f"【Bottom {len(bottom)} 表现】", [videos[entry["index"]] for entry in bottom])
+
+    # 5. 昨日假设
+    hypotheses = context.get("yesterdayHypotheses") or []
+    if hypotheses and add("【昨日假设】"):
+        for hypothesis in hypotheses:
+            if not add(f"- {hypothesis}"):
+                break
+
+    return {
+        "text": "\n".join(lines),
+        "tokens": used,
+        "videos_included": len(included),
+        "videos_total": len(videos),
+        "truncated": truncated,
+    }
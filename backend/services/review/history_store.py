@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Review History Store - 复盘历史归档
+每次复盘生成总结后追加一条记录（消息、总结、假设、当日统计），只追加不修改；
+按日期和账号建索引，支持按天数范围查询，供历史对比和假设验证使用
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    review_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    accounts TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    hypotheses TEXT NOT NULL,
+    messages TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews (date, created_at);
+CREATE TABLE IF NOT EXISTS review_accounts (
+    review_rowid INTEGER NOT NULL,
+    account TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_review_accounts ON review_accounts (account, date);
+"""
+
+
+def compact_stats(summary_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    提取用于历史对比的统计（去掉视频明细，只保留总量和按账号的汇总）
+
+    Args:
+        summary_stats: calculate_summary_stats 的结果
+    """
+    return {
+        "total_videos": summary_stats.get("total_videos", 0),
+        "total_views": summary_stats.get("total_views", 0),
+        "avg_views": summary_stats.get("avg_views", 0),
+        "avg_engagement_rate": summary_stats.get("avg_engagement_rate", 0),
+        "accounts": {
+            account: {
+                "count": data.get("count", 0),
+                "total_views": data.get("total_views", 0),
+                "avg_views": data.get("avg_views", 0),
+            }
+            for account, data in (summary_stats.get("accounts") or {}).items()
+        },
+    }
+
+
+class ReviewHistoryStore:
+    """复盘历史归档（SQLite，只追加）"""
+
+    def __init__(self, db_path: str):
+        """
+        初始化归档
+
+        Args:
+            db_path: SQLite 文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def append(
+        self,
+        review_id: str,
+        date: str,
+        accounts: List[str],
+        stats: Dict[str, Any],
+        summary: Dict[str, Any],
+        messages: List[Dict[str, Any]]
+    ) -> int:
+        """
+        追加一条复盘记录
+
+        Args:
+            review_id: 复盘 ID
+            date: 复盘日期 YYYY-MM-DD
+            accounts: 本次复盘涉及的账号
+            stats: 当日统计（compact_stats 的结果）
+            summary: ReviewSummary 字典
+            messages: 复盘消息字典列表
+
+        Returns:
+            记录行号
+        """
+        hypotheses = summary.get("hypotheses") or []
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO reviews (review_id, date, accounts, stats, summary, hypotheses, messages, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    review_id,
+                    date,
+                    json.dumps(accounts, ensure_ascii=False),
+                    json.dumps(stats, ensure_ascii=False),
+                    json.dumps(summary, ensure_ascii=False),
+                    json.dumps(hypotheses, ensure_ascii=False),
+                    json.dumps(messages, ensure_ascii=False),
+                    time.time(),
+                )
+            )
+            rowid = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO review_accounts (review_rowid, account, date) VALUES (?, ?, ?)",
+                [(rowid, account, date) for account in dict.fromkeys(accounts)]
+            )
+            self._conn.commit()
+        return rowid
+
+    def query(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        accounts: Optional[List[str]] = None,
+        include_messages: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按日期范围（含两端）和账号查询复盘记录，按日期倒序、同日按归档时间倒序
+
+        Args:
+            start_date: 起始日期 YYYY-MM-DD，None 表示不限
+            end_date: 结束日期 YYYY-MM-DD，None 表示不限
+            accounts: 只返回涉及其中任一账号的记录，None 表示不限
+            include_messages: 是否返回完整消息
+            limit: 最多返回条数
+        """
+        columns = "r.id, r.review_id, r.date, r.accounts, r.stats, r.summary, r.hypotheses, r.created_at"
+        if include_messages:
+            columns += ", r.messages"
+
+        conditions, params = [], []
+        if accounts:
+            # 走 (account, date) 索引
+            account_conditions = ["account IN (%s)" % ",".join("?" * len(accounts))]
+            params.extend(accounts)
+            if start_date:
+                account_conditions.append("date >= ?")
+                params.append(start_date)
+            if end_date:
+                account_conditions.append("date <= ?")
+                params.append(end_date)
+            conditions.append(
+                f"r.id IN (SELECT review_rowid FROM review_accounts WHERE {' AND '.join(account_conditions)})"
+            )
+        else:
+            if start_date:
+                conditions.append("r.date >= ?")
+                params.append(start_date)
+            if end_date:
+                conditions.append("r.date <= ?")
+                params.append(end_date)
+
+        sql = f"SELECT {columns} FROM reviews r"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY r.date DESC, r.created_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        records = []
+        for row in rows:
+            record = {
+                "id": row[0],
+                "reviewId": row[1],
+                "date": row[2],
+                "accounts": json.loads(row[3]),
+                "stats": json.loads(row[4]),
+                "summary": json.loads(row[5]),
+                "hypotheses": json.loads(row[6]),
+                "archivedAt": row[7],
+            }
+            if include_messages:
+                record["messages"] = json.loads(row[8])
+            records.append(record)
+        return records
+
+    def recent(
+        self,
+        days: int,
+        end_date: Optional[str] = None,
+        accounts: Optional[List[str]] = None,
+        include_messages: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        查询最近 days 天（含 end_date 当天）的复盘记录
+
+        Args:
+            days: 天数
+            end_date: 结束日期 YYYY-MM-DD，默认今天
+            accounts: 账号过滤
+            include_messages: 是否返回完整消息
+        """
+        end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.now()
+        start = end - timedelta(days=max(1, days) - 1)
+        return self.query(
+            start.strftime("%Y-%m-%d"),
+            end.strftime("%Y-%m-%d"),
+            accounts=accounts,
+            include_messages=include_messages
+        )
+
+    def latest_before(self, date: str, accounts: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        查询指定日期之前最近的一次复盘（用于验证上一次复盘提出的假设）
+
+        Args:
+            date: 日期 YYYY-MM-DD（不含当天）
+            accounts: 账号过滤
+        """
+        previous_day = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+        records = self.query(end_date=previous_day, accounts=accounts, limit=1)
+        return records[0] if records else None
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全局单例
+_history_store: Optional[ReviewHistoryStore] = None
+
+
+def get_review_history_store() -> Optional[ReviewHistoryStore]:
+    """
+    获取复盘历史归档单例
+
+    路径由 REVIEW_HISTORY_PATH 指定；打开失败时返回 None（复盘照常进行，只是没有历史）
+    """
+    global _history_store
+    if _history_store is None:
+        db_path = os.getenv(
+            "REVIEW_HISTORY_PATH",
+            os.path.join(os.path.dirname(__file__), "..", "..", "data", "review_history.sqlite3")
+        )
+        try:
+            _history_store = ReviewHistoryStore(db_path)
+            logger.info(f"[ReviewHistory] 历史归档已打开: {db_path}")
+        except Exception as e:
+            logger.error(f"[ReviewHistory] 打开历史归档失败: {e}")
+            return None
+    return _history_store
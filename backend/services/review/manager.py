@@ -3,30 +3,143 @@
 Review Manager - 复盘会议管理器
 负责协调三个 Agent 的并发预加载和串行播放
 """
+import os
+import re
+import json
+import time
 import asyncio
 import uuid
 import logging
-from typing import Dict, Optional, AsyncIterator
+from typing import Dict, Any, Optional, AsyncIterator, Iterator
 from datetime import datetime
 from .agents import ReviewAgentFactory
+from .session_store import create_session_store
+from .summarizer import ReviewSummarizer
+from .history_store import get_review_history_store, compact_stats
 
 logger = logging.getLogger(__name__)
-from models.review import AgentType, AgentContext, ReviewMessage
+from models.review import AgentType, AgentContext, ReviewMessage, ReviewSummary
+from models.video_record import VideoRecord, json_default
+
+
+# 回放模式：word 按词/标点切块，time 按固定时间片切块，instant 一次性输出
+REPLAY_MODES = ("word", "time", "instant")
+
+# Agent 状态的先后顺序：合并多个 worker 保存的会话时只向后推进，不回退
+_STATUS_RANK = {"idle": 0, "thinking": 1, "generating": 2, "error": 3, "completed": 4}
+
+# 词/标点边界：连续的非分隔字符 + 其后的分隔符
+_WORD_PATTERN = re.compile(r"[^\s，。！？；：、,.!?;:]*[\s，。！？；：、,.!?;:]+|[^\s，。！？；：、,.!?;:]+")
+
+
+def iter_replay_chunks(content: str, mode: str, chunk_chars: int, slice_chars: int) -> Iterator[str]:
+    """
+    将缓存内容切分为回放块
+
+    Args:
+        content: 完整内容
+        mode: 回放模式（word / time / instant）
+        chunk_chars: word 模式下每块的目标字符数（在词/标点边界处切分）
+        slice_chars: time 模式下每个时间片的字符数
+
+    Yields:
+        内容块
+    """
+    if not content:
+        return
+    if mode == "instant":
+        yield content
+        return
+    if mode == "time":
+        for i in range(0, len(content), slice_chars):
+            yield content[i:i + slice_chars]
+        return
+
+    buffer = ""
+    for token in _WORD_PATTERN.findall(content):
+        # 超长的无分隔片段（如长中文句子）按 chunk_chars 硬切
+        while len(token) > chunk_chars * 2:
+            if buffer:
+                yield buffer
+                buffer = ""
+            yield token[:chunk_chars]
+            token = token[chunk_chars:]
+        buffer += token
+        if len(buffer) >= chunk_chars:
+            yield buffer
+            buffer = ""
+    if buffer:
+        yield buffer
+
+
+class AgentStreamBuffer:
+    """
+    Agent 生成内容的广播缓冲区
+
+    生成任务写入增量，任意数量的订阅者可随时加入：
+    先从 offset 0 追上已生成的内容，再跟随实时增量，直到生成结束
+    """
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def content(self) -> str:
+        """已生成的完整内容"""
+        return "".join(self.parts)
+
+    async def append(self, chunk: str) -> None:
+        """写入增量并唤醒订阅者"""
+        async with self._changed:
+            self.parts.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        """标记生成结束"""
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def subscribe(self, offset: int = 0) -> AsyncIterator[str]:
+        """
+        订阅内容
+
+        Args:
+            offset: 起始增量序号（0 表示从头开始）
+
+        Yields:
+            内容增量（追赶阶段积压的增量合并为一块输出）
+        """
+        while True:
+            async with self._changed:
+                while offset >= len(self.parts) and not self.done:
+                    await self._changed.wait()
+                pending = self.parts[offset:]
+                done = self.done
+            if pending:
+                offset += len(pending)
+                yield "".join(pending)
+            if done and offset >= len(self.parts):
+                return
 
 
 class ReviewSession:
     """复盘会话"""
 
-    def __init__(self, review_id: str, context: AgentContext):
+    def __init__(self, review_id: str, context: AgentContext, custom_prompts: Optional[Dict[str, str]] = None):
         """
         初始化会话
 
         Args:
             review_id: 复盘 ID
             context: Agent 上下文
+            custom_prompts: 本会话的自定义提示词（analyst / strategist / hacker / summarizer -> 提示词）
         """
         self.review_id = review_id
         self.context = context
+        self.custom_prompts: Dict[str, str] = dict(custom_prompts or {})
         self.content_cache: Dict[AgentType, str] = {}
         self.agent_status: Dict[AgentType, str] = {
             AgentType.ANALYST: "idle",
@@ -34,8 +147,119 @@ class ReviewSession:
             AgentType.HACKER: "idle"
         }
         self.messages: list[ReviewMessage] = []
+        # 缓存的总结（三个 Agent 发言完成后预先生成，重复调用 summarize 直接返回）
+        self.summary: Optional[ReviewSummary] = None
         self.created_at = datetime.now()
+        self.updated_at = time.time()
         self.ready = False
+        # 生成中 Agent 的心跳时间戳（生成期间定期刷新，其他 worker 据此判断生成方是否仍在运行）
+        self.agent_heartbeat: Dict[AgentType, float] = {}
+        # 以下为进程内状态，不随会话持久化
+        # 生成中的内容广播缓冲区，speak 可在生成过程中订阅
+        self.streams: Dict[AgentType, AgentStreamBuffer] = {}
+        self.prepare_task: Optional[asyncio.Task] = None
+        self.summary_task: Optional[asyncio.Task] = None
+        self._context_bytes: Optional[int] = None
+
+    def approx_bytes(self) -> int:
+        """
+        估算会话占用的内存（字节）
+
+        上下文按 JSON 序列化长度估算（只计算一次），生成内容和消息按字符数实时累加
+        """
+        if self._context_bytes is None:
+            context = self.context if isinstance(self.context, dict) else getattr(self.context, "__dict__", {})
+            try:
+                self._context_bytes = len(json.dumps(context, ensure_ascii=False, default=json_default).encode("utf-8"))
+            except (TypeError, ValueError):
+                self._context_bytes = 0
+        content_chars = sum(len(c) for c in self.content_cache.values())
+        content_chars += sum(len(m.content) for m in self.messages)
+        content_chars += sum(len(s.content) for s in self.streams.values() if not s.done)
+        # 中文字符 UTF-8 编码约 3 字节
+        return self._context_bytes + content_chars * 3
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典（用于持久化存储）"""
+        context = self.context if isinstance(self.context, dict) else getattr(self.context, "__dict__", {})
+        return {
+            "review_id": self.review_id,
+            "context": context,
+            "custom_prompts": self.custom_prompts,
+            "content_cache": {agent_type.value: content for agent_type, content in self.content_cache.items()},
+            "agent_status": {agent_type.value: status for agent_type, status in self.agent_status.items()},
+            "messages": [message.model_dump(mode="json") for message in self.messages],
+            "summary": self.summary.model_dump(mode="json") if self.summary else None,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at,
+            "ready": self.ready,
+            "agent_heartbeat": {agent_type.value: beat for agent_type, beat in self.agent_heartbeat.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReviewSession":
+        """由 to_dict 的结果还原会话（上下文中的视频还原为 VideoRecord）"""
+        context = data.get("context", {})
+        if context.get("videos"):
+            context["videos"] = [VideoRecord.from_dict(video) for video in context["videos"]]
+        session = cls(data["review_id"], context, data.get("custom_prompts"))
+        session.content_cache = {AgentType(k): v for k, v in data.get("content_cache", {}).items()}
+        session.agent_status.update({AgentType(k): v for k, v in data.get("agent_status", {}).items()})
+        session.messages = [ReviewMessage(**message) for message in data.get("messages", [])]
+        if data.get("summary"):
+            session.summary = ReviewSummary(**data["summary"])
+        session.created_at = datetime.fromisoformat(data["created_at"])
+        session.updated_at = data.get("updated_at", session.updated_at)
+        session.ready = data.get("ready", False)
+        session.agent_heartbeat = {AgentType(k): v for k, v in data.get("agent_heartbeat", {}).items()}
+        return session
+
+    @staticmethod
+    def merge_data(stored: Dict[str, Any], local: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        合并已存储的会话字典与本地快照（持久化存储保存时调用）
+
+        会话字段只增不减：内容按 Agent 合并、消息按 id 合并、状态只向后推进、总结和 ready 保留已有的，
+        持有旧快照的 worker 保存时不会覆盖其他 worker 写入的回答和总结
+        """
+        merged = dict(local)
+        merged["content_cache"] = {**stored.get("content_cache", {}), **local.get("content_cache", {})}
+        statuses = dict(stored.get("agent_status", {}))
+        for agent, status in local.get("agent_status", {}).items():
+            if _STATUS_RANK.get(status, 0) >= _STATUS_RANK.get(statuses.get(agent), 0):
+                statuses[agent] = status
+        merged["agent_status"] = statuses
+        known = {message["id"] for message in local.get("messages", [])}
+        messages = local.get("messages", []) + [m for m in stored.get("messages", []) if m["id"] not in known]
+        merged["messages"] = sorted(messages, key=lambda message: message.get("timestamp", 0))
+        merged["summary"] = local.get("summary") or stored.get("summary")
+        merged["ready"] = bool(local.get("ready") or stored.get("ready"))
+        merged["updated_at"] = max(local.get("updated_at", 0), stored.get("updated_at", 0))
+        heartbeat = dict(stored.get("agent_heartbeat", {}))
+        for agent, beat in local.get("agent_heartbeat", {}).items():
+            heartbeat[agent] = max(beat, heartbeat.get(agent, 0))
+        merged["agent_heartbeat"] = heartbeat
+        return merged
+
+    def merge_state(self, data: Dict[str, Any]) -> None:
+        """把存储中的会话状态（merge_data 的结果）合并到本对象，规则同 merge_data"""
+        for agent, content in data.get("content_cache", {}).items():
+            self.content_cache.setdefault(AgentType(agent), content)
+        for agent, status in data.get("agent_status", {}).items():
+            agent_type = AgentType(agent)
+            if _STATUS_RANK.get(status, 0) > _STATUS_RANK.get(self.agent_status.get(agent_type), 0):
+                self.agent_status[agent_type] = status
+        known = {message.id for message in self.messages}
+        new_messages = [ReviewMessage(**m) for m in data.get("messages", []) if m["id"] not in known]
+        if new_messages:
+            self.messages = sorted(self.messages + new_messages, key=lambda message: message.timestamp)
+        if self.summary is None and data.get("summary"):
+            self.summary = ReviewSummary(**data["summary"])
+        self.ready = self.ready or bool(data.get("ready"))
+        self.updated_at = max(self.updated_at, data.get("updated_at", 0))
+        for agent, beat in data.get("agent_heartbeat", {}).items():
+            agent_type = AgentType(agent)
+            self.agent_heartbeat[agent_type] = max(beat, self.agent_heartbeat.get(agent_type, 0))
 
     def get_agent_status(self, agent_type: AgentType) -> str:
         """获取 Agent 状态"""
@@ -58,10 +282,29 @@ class ReviewManager:
 
     def __init__(self):
         """初始化管理器"""
-        self.sessions: Dict[str, ReviewSession] = {}
+        self.sessions = create_session_store(
+            loads=ReviewSession.from_dict,
+            on_evict=self._on_session_evicted,
+            merge=ReviewSession.merge_data
+        )
+        # 本进程内正在生成内容的会话（持有广播缓冲区和后台任务）
+        self._live: Dict[str, ReviewSession] = {}
         self.agent_factory = ReviewAgentFactory()
 
-    def create_session(
+        # 其他 worker 正在生成时轮询共享存储等待内容；生成方心跳超过该时长（秒）未刷新视为已退出
+        self.follow_timeout = float(os.getenv("REVIEW_FOLLOW_TIMEOUT", 300))
+        self.follow_interval = 0.5
+        # 生成期间刷新心跳并保存会话的间隔（秒）
+        self.heartbeat_interval = max(1.0, float(os.getenv("REVIEW_HEARTBEAT_INTERVAL", 10)))
+
+        # 缓存内容的回放配置（打字机效果）
+        mode = os.getenv("REVIEW_REPLAY_MODE", "word").lower()
+        self.replay_mode = mode if mode in REPLAY_MODES else "word"
+        self.replay_chars_per_second = float(os.getenv("REVIEW_REPLAY_CHARS_PER_SECOND", 100))
+        self.replay_chunk_chars = max(1, int(os.getenv("REVIEW_REPLAY_CHUNK_CHARS", 24)))
+        self.replay_interval = max(0.01, int(os.getenv("REVIEW_REPLAY_INTERVAL_MS", 100)) / 1000)
+
+    async def create_session(
         self,
         context: AgentContext,
         agent_prompts: Optional[dict] = None
@@ -77,22 +320,103 @@ class ReviewManager:
             ReviewSession 实例
         """
         review_id = f"rev_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
-        session = ReviewSession(review_id, context)
 
-        # 设置自定义提示词
+        # 自定义提示词绑定到会话，不影响其他并发的复盘
+        custom_prompts = {}
         if agent_prompts:
             prompt_mapping = {
                 "analyst": agent_prompts.get("data_analyst"),
                 "strategist": agent_prompts.get("strategist"),
                 "hacker": agent_prompts.get("growth_hacker"),
+                "summarizer": agent_prompts.get("summarizer"),
             }
             # 过滤掉 None 值
-            filtered_prompts = {k: v for k, v in prompt_mapping.items() if v}
-            self.agent_factory.set_custom_prompts(filtered_prompts)
+            custom_prompts = {k: v for k, v in prompt_mapping.items() if v}
 
-        self.sessions[review_id] = session
+        session = ReviewSession(review_id, context, custom_prompts)
+        await self.save_session(session)
         return session
 
+    def create_agent(self, session: ReviewSession, agent_type: AgentType):
+        """
+        按会话的自定义提示词创建 Agent
+
+        Args:
+            session: 复盘会话
+            agent_type: Agent 类型
+
+        Returns:
+            ReviewAgentBase 实例
+        """
+        return self.agent_factory.create(
+            agent_type.value,
+            system_prompt=session.custom_prompts.get(agent_type.value)
+        )
+
+    async def record_answer(self, session: ReviewSession, agent_type: AgentType, answer: str) -> ReviewMessage:
+        """
+        将提问的回答追加到会话消息并保存
+
+        Args:
+            session: 复盘会话
+            agent_type: 回答的 Agent
+            answer: 完整回答
+
+        Returns:
+            ReviewMessage 实例
+        """
+        message = ReviewMessage(
+            id=f"msg_{datetime.now().timestamp()}_{agent_type.value}",
+            agent=agent_type,
+            content=answer,
+            timestamp=int(datetime.now().timestamp()),
+            type="text"
+        )
+        session.messages.append(message)
+        await self.save_session(session)
+        return message
+
+    async def save_session(self, session: ReviewSession) -> None:
+        """
+        将会话写回存储（持久化存储下其他 worker 可见；序列化和写入不占用事件循环）
+
+        存储与其他 worker 写入的版本合并后，把合并结果（如其他 worker 的回答和总结）同步回本地会话
+        """
+        session.updated_at = time.time()
+        try:
+            merged = await self.sessions.save_async(session.review_id, session)
+            if merged:
+                session.merge_state(merged)
+        except Exception as e:
+            logger.error(f"[ReviewManager] 保存会话 {session.review_id} 失败: {e}")
+
+    def _track_live(self, session: ReviewSession, task: asyncio.Task) -> None:
+        """登记本进程内的生成任务，任务结束且没有进行中的生成 / 总结时注销"""
+        self._live[session.review_id] = session
+
+        def release(_):
+            summarizing = session.summary_task is not None and not session.summary_task.done()
+            if all(stream.done for stream in session.streams.values()) and not summarizing:
+                self._live.pop(session.review_id, None)
+
+        task.add_done_callback(release)
+
+    def start_preparation(self, session: ReviewSession) -> None:
+        """
+        在后台启动所有 Agent 的预加载，立即返回（需在事件循环中调用）
+
+        广播缓冲区在返回前创建，随后连接的 speak 请求可直接订阅生成中的内容
+
+        Args:
+            session: 复盘会话
+        """
+        if session.prepare_task is not None:
+            return
+        for agent_type in (AgentType.ANALYST, AgentType.STRATEGIST, AgentType.HACKER):
+            session.streams.setdefault(agent_type, AgentStreamBuffer())
+        session.prepare_task = asyncio.create_task(self.prepare_all_agents(session))
+        self._track_live(session, session.prepare_task)
+
     async def prepare_all_agents(self, session: ReviewSession) -> None:
         """
         并发预加载所有 Agent 内容
@@ -101,14 +425,15 @@ class ReviewManager:
             session: 复盘会话
         """
         tasks = [
-            self._generate_agent_content(session, AgentType.ANALYST),
-            self._generate_agent_content(session, AgentType.STRATEGIST),
-            self._generate_agent_content(session, AgentType.HACKER)
+            self._generate_agent_content(session, agent_type)
+            for agent_type in (AgentType.ANALYST, AgentType.STRATEGIST, AgentType.HACKER)
         ]
 
         # 并发执行
         await asyncio.gather(*tasks, return_exceptions=True)
         session.ready = True
+        await self.save_session(session)
+        logger.info(f"预加载完成，reviewId={session.review_id}, cache={list(session.content_cache.keys())}")
 
     async def _generate_agent_content(self, session: ReviewSession, agent_type: AgentType) -> None:
         """
@@ -118,21 +443,28 @@ class ReviewManager:
             session: 复盘会话
             agent_type: Agent 类型
         """
+        stream = session.streams.setdefault(agent_type, AgentStreamBuffer())
+        heartbeat: Optional[asyncio.Task] = None
         try:
             session.set_agent_status(agent_type, "thinking")
+            session.agent_heartbeat[agent_type] = time.time()
+            await self.save_session(session)
+            heartbeat = asyncio.create_task(self._heartbeat(session, agent_type))
 
             # 创建 Agent
-            agent = self.agent_factory.create(agent_type.value)
+            agent = self.create_agent(session, agent_type)
 
-            # 生成内容（流式收集）
-            content_parts = []
+            # 生成内容（流式收集，同时广播给订阅者）
             # session.context 可能是对象或 dict
             context_data = session.context if isinstance(session.context, dict) else session.context.__dict__
             async for chunk in agent.generate_stream(context_data):
-                content_parts.append(chunk)
+                if not stream.parts:
+                    session.set_agent_status(agent_type, "generating")
+                    await self.save_session(session)
+                await stream.append(chunk)
 
             # 缓存完整内容
-            full_content = "".join(content_parts)
+            full_content = stream.content
             session.content_cache[agent_type] = full_content
             session.set_agent_status(agent_type, "completed")
 
@@ -151,54 +483,221 @@ class ReviewManager:
             import traceback
             traceback.print_exc()
             session.set_agent_status(agent_type, "error")
-            # 使用降级内容
-            agent = self.agent_factory.create(agent_type.value)
-            fallback = agent._get_fallback_response()
-            logger.warning(f"使用降级响应: {fallback[:50]}...")
-            session.content_cache[agent_type] = fallback
+            if stream.parts:
+                # 订阅者已收到部分内容，保留已生成的部分
+                session.content_cache[agent_type] = stream.content
+            else:
+                # 使用降级内容
+                agent = self.create_agent(session, agent_type)
+                fallback = agent._get_fallback_response()
+                logger.warning(f"使用降级响应: {fallback[:50]}...")
+                session.content_cache[agent_type] = fallback
+                await stream.append(fallback)
+
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            await stream.finish()
+            await self.save_session(session)
+            # 三个 Agent 的发言都已就绪时，预先开始生成总结
+            if all(t in session.content_cache for t in (AgentType.ANALYST, AgentType.STRATEGIST, AgentType.HACKER)):
+                self.start_summary(session)
+
+    async def _heartbeat(self, session: ReviewSession, agent_type: AgentType) -> None:
+        """生成期间每 heartbeat_interval 秒刷新该 Agent 的心跳并保存会话，直到被取消"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            session.agent_heartbeat[agent_type] = time.time()
+            await self.save_session(session)
+
+    def start_summary(self, session: ReviewSession) -> None:
+        """
+        在后台启动总结生成（已有缓存的总结或总结任务进行中时不重复启动）
+
+        Args:
+            session: 复盘会话
+        """
+        if session.summary is not None:
+            return
+        if session.summary_task is not None and not session.summary_task.done():
+            return
+        session.summary_task = asyncio.create_task(self._generate_summary(session))
+        self._track_live(session, session.summary_task)
+
+    async def get_summary(self, session: ReviewSession) -> ReviewSummary:
+        """
+        获取复盘总结
+
+        优先返回会话缓存的总结；总结正在预生成时等待其完成；
+        Agent 仍在预加载时先等待预加载结束
+
+        Args:
+            session: 复盘会话
+
+        Returns:
+            ReviewSummary
+        """
+        if session.summary is not None:
+            return session.summary
+        if session.prepare_task is not None and not session.prepare_task.done():
+            await asyncio.shield(session.prepare_task)
+        if session.summary is not None:
+            return session.summary
+        self.start_summary(session)
+        return await asyncio.shield(session.summary_task)
+
+    async def _generate_summary(self, session: ReviewSession) -> ReviewSummary:
+        """
+        调用总结器生成总结并缓存到会话（使用本会话的自定义总结提示词）
+
+        失败时返回降级总结，降级结果不缓存，下次调用会重试
+        """
+        contents = dict(session.content_cache)
+        summarizer = ReviewSummarizer(system_prompt=session.custom_prompts.get("summarizer"))
+        # 数据读取提示（部分分组读取失败等）随总结返回
+        context = session.context if isinstance(session.context, dict) else getattr(session.context, "__dict__", {})
+        warnings = list(context.get("warnings") or [])
+        try:
+            start = time.time()
+            summary = await summarizer.summarize(contents)
+        except Exception as e:
+            logger.error(f"[ReviewManager] 生成总结失败，使用降级总结: {e}")
+            fallback = summarizer.get_fallback_summary(contents)
+            fallback.warnings = warnings
+            return fallback
+
+        summary.warnings = warnings
+
+        session.summary = summary
+        await self.save_session(session)
+        await self._archive_review(session)
+        logger.info(
+            f"[ReviewManager] 总结完成，reviewId={session.review_id}, "
+            f"洞察 {len(summary.keyInsights)} 条, 操作项 {len(summary.actionItems)} 条, 耗时 {time.time() - start:.1f}s"
+        )
+        return summary
 
     async def get_agent_stream(
         self,
         session: ReviewSession,
-        agent_type: AgentType
+        agent_type: AgentType,
+        mode: Optional[str] = None
     ) -> AsyncIterator[str]:
         """
         获取 Agent 的流式输出
 
-        优先从缓存读取，模拟打字机效果
+        - 内容已生成完毕：从缓存按块回放模拟打字机效果，
+          每块之后按 REVIEW_REPLAY_CHARS_PER_SECOND 的速率等待，<= 0 时不等待
+        - 正在生成：订阅广播缓冲区，先追上已生成的内容，再跟随实时增量
+        - 其他 worker 正在生成（共享存储）：轮询存储等待生成完成后回放
+        - 尚未开始：启动该 Agent 的生成并订阅
 
         Args:
             session: 复盘会话
             agent_type: Agent 类型
+            mode: 回放模式（word / time / instant），None 时使用 REVIEW_REPLAY_MODE
 
         Yields:
             内容增量
         """
+        stream = session.streams.get(agent_type)
+        if stream is not None and not stream.done:
+            async for chunk in stream.subscribe():
+                yield chunk
+            return
+
+        if agent_type not in session.content_cache and self.sessions.shared:
+            session = await self._wait_for_remote_content(session, agent_type)
+
         # 检查缓存
         if agent_type in session.content_cache:
             content = session.content_cache[agent_type]
-            # 模拟打字机效果
-            for char in content:
-                yield char
-                await asyncio.sleep(0.01)  # 10ms 延迟
+            mode = mode if mode in REPLAY_MODES else self.replay_mode
+            rate = self.replay_chars_per_second
+            slice_chars = max(1, int(rate * self.replay_interval)) if rate > 0 else len(content) or 1
+            for chunk in iter_replay_chunks(content, mode, self.replay_chunk_chars, slice_chars):
+                yield chunk
+                if mode != "instant" and rate > 0:
+                    await asyncio.sleep(len(chunk) / rate)
         else:
-            # 缓存未命中，实时生成
-            agent = self.agent_factory.create(agent_type.value)
-            context_data = session.context if isinstance(session.context, dict) else session.context.__dict__
-            async for chunk in agent.generate_stream(context_data):
+            # 缓存未命中，实时生成（结果写入缓存，其他订阅者可共享）
+            stream = session.streams[agent_type] = AgentStreamBuffer()
+            task = asyncio.create_task(self._generate_agent_content(session, agent_type))
+            self._track_live(session, task)
+            async for chunk in stream.subscribe():
                 yield chunk
+            await task
+
+    async def _wait_for_remote_content(self, session: ReviewSession, agent_type: AgentType) -> ReviewSession:
+        """
+        其他 worker 正在生成该 Agent 的内容时，轮询共享存储直到内容写入
+
+        生成方持续刷新心跳时一直等待（生成时长不受限制）；心跳超过 follow_timeout 未刷新
+        （如进程已退出）时不再等待，由调用方在本地生成
 
-    def get_session(self, review_id: str) -> Optional[ReviewSession]:
+        Returns:
+            最新的会话
+        """
+        while True:
+            if agent_type in session.content_cache:
+                break
+            if session.get_agent_status(agent_type) not in ("thinking", "generating"):
+                break
+            beat = session.agent_heartbeat.get(agent_type, session.updated_at)
+            if time.time() - beat > self.follow_timeout:
+                break
+            await asyncio.sleep(self.follow_interval)
+            state = await self.sessions.get_state_async(session.review_id)
+            if state:
+                session.merge_state(state)
+        return session
+
+    async def _archive_review(self, session: ReviewSession) -> None:
+        """把已完成总结的复盘追加到历史归档（记录在事件循环上生成，SQLite 写入在线程中执行；归档失败不影响复盘）"""
+        history = get_review_history_store()
+        if history is None or session.summary is None:
+            return
+        context = session.context if isinstance(session.context, dict) else session.context.__dict__
+        accounts = context.get("accountFilter") or sorted({
+            v.account for v in context.get("videos") or [] if v.account
+        })
+        try:
+            await asyncio.to_thread(
+                history.append,
+                review_id=session.review_id,
+                date=context.get("date", datetime.now().strftime("%Y-%m-%d")),
+                accounts=list(accounts),
+                stats=compact_stats(context.get("summary") or {}),
+                summary=session.summary.model_dump(mode="json"),
+                messages=[message.model_dump(mode="json") for message in session.messages]
+            )
+        except Exception as e:
+            logger.error(f"[ReviewManager] 归档复盘 {session.review_id} 失败: {e}")
+
+    async def get_session(self, review_id: str) -> Optional[ReviewSession]:
         """
         获取复盘会话
 
+        本进程正在生成内容的会话直接返回内存中的实例（含广播缓冲区），
+        否则从会话存储读取（持久化存储在线程中读取）
+
         Args:
             review_id: 复盘 ID
 
         Returns:
             ReviewSession 实例或 None
         """
-        return self.sessions.get(review_id)
+        return self._live.get(review_id) or await self.sessions.get_async(review_id)
+
+    def _on_session_evicted(self, session: ReviewSession) -> None:
+        """会话被移出时取消仍在运行的预加载 / 总结任务"""
+        for task in (session.prepare_task, session.summary_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+    def get_session_metrics(self) -> dict:
+        """获取会话存储的统计（会话数、估算大小、淘汰次数等）"""
+        return self.sessions.get_metrics()
 
     def get_session_status(self, session: ReviewSession) -> dict:
         """
@@ -2,11 +2,13 @@
 """
 Review Routes - 每日复盘会议 API 路由
 """
+import os
 import json
+import asyncio
 import logging
 logger = logging.getLogger(__name__)
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 from datetime import datetime, timedelta
@@ -14,11 +16,15 @@ from datetime import datetime, timedelta
 from models.review import (
     StartReviewRequest, StartReviewResponse, DataSummary, AgentType,
     ReviewStatusResponse, AskQuestionRequest, AskQuestionResponse,
-    SummarizeResponse, ReviewSummary, ExecuteActionRequest, ExecuteActionResponse
+    SummarizeResponse, ExecuteActionRequest, ExecuteActionResponse
 )
 from services.review.manager import get_review_manager
-from services.review.agents import ReviewAgentFactory
-from services.feishu_data_service import get_feishu_service
+from services.review.context_compiler import compile_question_context
+from services.review.history_store import get_review_history_store
+from services.review.analytics import build_review_analytics
+from services.video_stats import VideoStats
+from services.agents.rate_limiter import estimate_tokens
+from services.feishu_data_service import get_feishu_service, describe_fetch_warnings
 
 router = APIRouter(prefix="/api/review", tags=["每日复盘"])
 
@@ -30,7 +36,8 @@ async def start_review(request: StartReviewRequest, background_tasks: Background
     """
     启动复盘会议
 
-    从飞书获取当天数据，并发预加载所有 Agent 内容
+    从飞书获取当天数据，在后台并发预加载所有 Agent 内容后立即返回；
+    speak 可在生成过程中订阅实时内容，无需等待预加载完成
     """
     try:
         # 验证提示词配置
@@ -70,12 +77,11 @@ async def start_review(request: StartReviewRequest, background_tasks: Background
                 "growth_hacker": request.agentPrompts.growth_hacker,
                 "summarizer": request.agentPrompts.summarizer,
             }
-        session = manager.create_session(context, agent_prompts=agent_prompts_dict)
+        session = await manager.create_session(context, agent_prompts=agent_prompts_dict)
 
-        # 同步开始预加载
+        # 后台开始预加载
         logger.info(f"开始预加载 Agent，reviewId={session.review_id}")
-        await manager.prepare_all_agents(session)
-        logger.info(f"预加载完成，ready={session.ready}, cache={list(session.content_cache.keys())}")
+        manager.start_preparation(session)
 
         # 计算数据摘要
         summary = context.get("summary", {})
@@ -89,7 +95,8 @@ async def start_review(request: StartReviewRequest, background_tasks: Background
             reviewId=session.review_id,
             dataSummary=data_summary,
             agents=[AgentType.ANALYST, AgentType.STRATEGIST, AgentType.HACKER],
-            estimatedTime=10
+            estimatedTime=10,
+            warnings=context.get("warnings", [])
         )
 
     except Exception as e:
@@ -101,6 +108,16 @@ async def start_review(request: StartReviewRequest, background_tasks: Background
 
 # ==================== 查询状态 ====================
 
+@router.get("/metrics")
+async def get_session_metrics():
+    """
+    查询复盘会话存储统计
+
+    返回会话数、估算内存占用、过期和淘汰次数
+    """
+    return get_review_manager().get_session_metrics()
+
+
 @router.get("/{review_id}/status", response_model=ReviewStatusResponse)
 async def get_review_status(review_id: str):
     """
@@ -110,7 +127,7 @@ async def get_review_status(review_id: str):
     """
     try:
         manager = get_review_manager()
-        session = manager.get_session(review_id)
+        session = await manager.get_session(review_id)
 
         if not session:
             raise HTTPException(status_code=404, detail="复盘会话不存在")
@@ -128,15 +145,17 @@ async def get_review_status(review_id: str):
 # ==================== Agent 发言（SSE）====================
 
 @router.get("/{review_id}/agent/{agent_type}/speak")
-async def agent_speak(review_id: str, agent_type: AgentType):
+async def agent_speak(review_id: str, agent_type: AgentType, mode: Optional[str] = None):
     """
     Agent 发言（SSE 流式输出）
 
-    返回 Server-Sent Events 流
+    返回 Server-Sent Events 流；已缓存的内容按块回放，
+    mode 可选 word（按词/标点切块）、time（按时间片切块）、instant（一次性输出），
+    默认取 REVIEW_REPLAY_MODE，回放速率由服务端 REVIEW_REPLAY_CHARS_PER_SECOND 控制
     """
     try:
         manager = get_review_manager()
-        session = manager.get_session(review_id)
+        session = await manager.get_session(review_id)
 
         if not session:
             raise HTTPException(status_code=404, detail="复盘会话不存在")
@@ -144,7 +163,7 @@ async def agent_speak(review_id: str, agent_type: AgentType):
         async def event_generator():
             """SSE 事件生成器"""
             try:
-                async for chunk in manager.get_agent_stream(session, agent_type):
+                async for chunk in manager.get_agent_stream(session, agent_type, mode):
                     # 发送数据增量
                     data = {
                         "agent": agent_type.value,
@@ -201,35 +220,26 @@ async def ask_question(review_id: str, request: AskQuestionRequest):
     """
     try:
         manager = get_review_manager()
-        session = manager.get_session(review_id)
+        session = await manager.get_session(review_id)
 
         if not session:
             raise HTTPException(status_code=404, detail="复盘会话不存在")
 
-        # 如果指定了目标 Agent，由该 Agent 回答
-        target_agent = request.targetAgent or AgentType.ANALYST
-
-        # 调用 Agent 生成回答
-        agent_factory = ReviewAgentFactory()
-        agent = agent_factory.create(target_agent.value)
-
-        # 构建提问上下文
-        context_data = session.context if isinstance(session.context, dict) else session.context.__dict__
-
-        # 添加用户问题到上下文
-        context_data["user_question"] = request.question
+        target_agent, agent, question_context, prompt_tokens = _prepare_question(manager, session, request)
 
         # 调用 Agent 生成回复
         answer_parts = []
-        async for chunk in agent.generate_stream(context_data):
+        async for chunk in agent.generate_stream(question_context):
             answer_parts.append(chunk)
 
         answer = "".join(answer_parts)
+        await manager.record_answer(session, target_agent, answer)
 
         return AskQuestionResponse(
             agent=target_agent,
             answer=answer,
-            timestamp=int(datetime.now().timestamp())
+            timestamp=int(datetime.now().timestamp()),
+            promptTokens=prompt_tokens
         )
 
     except HTTPException:
@@ -241,6 +251,97 @@ async def ask_question(review_id: str, request: AskQuestionRequest):
         raise HTTPException(status_code=500, detail=f"提问失败: {str(e)}")
 
 
+@router.post("/{review_id}/ask/stream")
+async def ask_question_stream(review_id: str, request: AskQuestionRequest):
+    """
+    用户提问（SSE 流式输出）
+
+    与 speak 使用相同的事件格式逐段返回回答，完成后将完整回答追加到会话消息中
+    """
+    manager = get_review_manager()
+    session = await manager.get_session(review_id)
+
+    if not session:
+        raise HTTPException(status_code=404, detail="复盘会话不存在")
+
+    target_agent, agent, question_context, prompt_tokens = _prepare_question(manager, session, request)
+
+    async def event_generator():
+        """SSE 事件生成器"""
+        answer_parts = []
+        try:
+            async for chunk in agent.generate_stream(question_context):
+                answer_parts.append(chunk)
+                data = {
+                    "agent": target_agent.value,
+                    "content_delta": chunk,
+                    "status": "streaming"
+                }
+                yield {
+                    "event": "message",
+                    "data": json.dumps(data, ensure_ascii=False)
+                }
+
+            await manager.record_answer(session, target_agent, "".join(answer_parts))
+
+            # 发送完成信号
+            complete_data = {
+                "agent": target_agent.value,
+                "content_delta": "",
+                "status": "complete",
+                "promptTokens": prompt_tokens
+            }
+            yield {
+                "event": "message",
+                "data": json.dumps(complete_data, ensure_ascii=False)
+            }
+
+        except Exception as e:
+            logger.error(f"[SSE] 提问流式输出失败: {e}")
+            import traceback
+            traceback.print_exc()
+            error_data = {
+                "agent": target_agent.value,
+                "status": "error",
+                "message": str(e)
+            }
+            yield {
+                "event": "error",
+                "data": json.dumps(error_data, ensure_ascii=False)
+            }
+
+    return EventSourceResponse(event_generator())
+
+
+def _prepare_question(manager, session, request: AskQuestionRequest):
+    """
+    准备提问：选择回答的 Agent 并编译受 token 预算约束的上下文（不修改会话上下文）
+
+    Returns:
+        (目标 Agent 类型, Agent 实例, 提问上下文, 估算 prompt token 数)
+    """
+    # 如果指定了目标 Agent，由该 Agent 回答
+    target_agent = request.targetAgent or AgentType.ANALYST
+
+    # 使用本会话的自定义提示词创建 Agent
+    agent = manager.create_agent(session, target_agent)
+
+    context_data = session.context if isinstance(session.context, dict) else session.context.__dict__
+    compiled = compile_question_context(context_data, request.question)
+    question_context = {
+        **context_data,
+        "user_question": request.question,
+        "question_context": compiled["text"],
+    }
+    prompt_tokens = estimate_tokens(agent.system_prompt) + estimate_tokens(agent.build_prompt(question_context))
+    logger.info(
+        f"[Review] 提问上下文: {compiled['videos_included']}/{compiled['videos_total']} 条视频, "
+        f"摘要 {compiled['tokens']} tokens, prompt 约 {prompt_tokens} tokens"
+        f"{'（已按预算截断）' if compiled['truncated'] else ''}"
+    )
+    return target_agent, agent, question_context, prompt_tokens
+
+
 # ==================== 生成总结 ====================
 
 @router.post("/{review_id}/summarize", response_model=SummarizeResponse)
@@ -252,13 +353,13 @@ async def summarize_review(review_id: str):
     """
     try:
         manager = get_review_manager()
-        session = manager.get_session(review_id)
+        session = await manager.get_session(review_id)
 
         if not session:
             raise HTTPException(status_code=404, detail="复盘会话不存在")
 
-        # 从缓存的消息生成总结
-        summary = _generate_summary(session)
+        # 三个 Agent 发言完成后已在后台预生成，重复调用直接返回缓存
+        summary = await manager.get_summary(session)
 
         return SummarizeResponse(summary=summary)
 
@@ -314,17 +415,25 @@ async def execute_action(review_id: str, request: ExecuteActionRequest):
 # ==================== 历史记录 ====================
 
 @router.get("/history", response_model=Dict[str, Any])
-async def get_review_history(days: int = 7):
+async def get_review_history(
+    days: int = 7,
+    account: Optional[List[str]] = Query(None),
+    includeMessages: bool = False
+):
     """
     获取复盘历史记录
 
     Args:
-        days: 查询天数，默认 7 天
+        days: 查询天数（含今天），默认 7 天
+        account: 账号过滤（可重复传入多个）
+        includeMessages: 是否返回完整的复盘消息
     """
     try:
-        # 简化实现：返回空历史
-        # 实际应从数据库或文件读取
-        return {"history": []}
+        history = get_review_history_store()
+        if history is None:
+            return {"history": []}
+        records = await asyncio.to_thread(history.recent, days, accounts=account, include_messages=includeMessages)
+        return {"history": records}
 
     except Exception as e:
         print(f"[API] 获取历史失败: {e}")
@@ -352,62 +461,76 @@ async def _build_review_context(date: str, account_filter: list = None, feishu_c
 
     # 每日复盘功能始终使用 .env 配置
     logger.info(f"[Review] 使用 .env 配置获取数据")
-    videos = await feishu_service.get_today_videos(date)
+    videos, fetch_report = await feishu_service.get_today_videos_with_report(date)
+    warnings = describe_fetch_warnings(fetch_report)
+    if warnings:
+        logger.warning(f"[Review] 数据不完整: {'; '.join(warnings)}")
 
     # 应用账号过滤
     if account_filter:
-        videos = [v for v in videos if v.get("account") in account_filter]
+        videos = [v for v in videos if v.account in account_filter]
+
+    # 计算汇总统计和复盘分析数据包（同一个统计引擎，只遍历一次视频列表）
+    stats = VideoStats(videos)
+    summary_stats = stats.summary()
+    analytics = build_review_analytics(stats)
 
-    # 计算汇总统计
-    summary_stats = feishu_service.calculate_summary_stats(videos)
+    # 历史复盘：最近 REVIEW_HISTORY_CONTEXT_DAYS 天（不含当天）的每日统计和结论，以及上一次复盘的假设
+    previous_reviews, yesterday_hypotheses = await asyncio.to_thread(_load_review_history, date, account_filter)
 
     # 构建上下文
     context = {
         "date": date,
         "videos": videos,
         "summary": summary_stats,
+        "analytics": analytics,
         "videoDetails": [],  # 可选：视频详细信息
-        "aiScores": [v.get("aiAnalysis", {}) for v in videos],
+        "aiScores": [v.ai_analysis or {} for v in videos],
         "feishuData": None,
-        "previousReviews": [],
-        "yesterdayHypotheses": []
+        "accountFilter": account_filter or [],
+        "previousReviews": previous_reviews,
+        "yesterdayHypotheses": yesterday_hypotheses,
+        "warnings": warnings
     }
 
     logger.info(f"[Review] 构建上下文: {len(videos)} 条视频, 总播放 {summary_stats['total_views']}")
     return context
 
 
-def _generate_summary(session) -> ReviewSummary:
-    """生成总结"""
-    # 简化实现：返回固定总结
-    # 实际应该调用总结 Agent 或分析消息内容
-
-    from models.review import ActionItem, ActionItemType, Priority
-
-    return ReviewSummary(
-        keyInsights=[
-            "AI 图书赛道流量整体上升趋势明显",
-            "19:30-20:30 是黄金发布时段",
-            "疑问句式标题可提升点击率"
-        ],
-        actionItems=[
-            ActionItem(
-                id="act_1",
-                text="明天 19:30 在 ai图书 账号发布视频",
-                priority=Priority.HIGH,
-                type=ActionItemType.SCHEDULING,
-                executable=True
-            ),
-            ActionItem(
-                id="act_2",
-                text="A/B 测试疑问句式标题",
-                priority=Priority.MEDIUM,
-                type=ActionItemType.EXPERIMENT,
-                executable=True
-            )
-        ],
-        hypotheses=[
-            "H1: 前 3 秒加入 AI 图书实物展示，可能提升完播率",
-            "H2: 标题增加疑问句式，可能提升点击率"
-        ]
-    )
+def _load_review_history(date: str, account_filter: list = None):
+    """
+    读取历史复盘（每天只取最近归档的一次；同步读取 SQLite，异步代码中通过 asyncio.to_thread 调用）
+
+    Returns:
+        (previousReviews 列表, 上一次复盘的假设列表)
+    """
+    history = get_review_history_store()
+    if history is None:
+        return [], []
+
+    try:
+        days = int(os.getenv("REVIEW_HISTORY_CONTEXT_DAYS", 7))
+        previous_day = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+        records = history.recent(days, end_date=previous_day, accounts=account_filter)
+    except Exception as e:
+        logger.error(f"[Review] 读取历史复盘失败: {e}")
+        return [], []
+
+    previous_reviews, seen_dates = [], set()
+    for record in records:
+        if record["date"] in seen_dates:
+            continue
+        seen_dates.add(record["date"])
+        previous_reviews.append({
+            "date": record["date"],
+            "stats": record["stats"],
+            "keyInsights": record["summary"].get("keyInsights", []),
+            "hypotheses": record["hypotheses"],
+        })
+
+    # 上一次复盘的假设（不限于回看窗口内）
+    latest = records[0] if records else history.latest_before(date, accounts=account_filter)
+    yesterday_hypotheses = latest["hypotheses"] if latest else []
+
+    logger.info(f"[Review] 历史复盘: {len(previous_reviews)} 天, 待验证假设 {len(yesterday_hypotheses)} 条")
+    return previous_reviews, yesterday_hypotheses
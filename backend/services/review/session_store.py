@@ -0,0 +1,640 @@
+# -*- coding: utf-8 -*-
+"""
+Session Store - 复盘会话存储
+- MemorySessionStore: 进程内 LRU（空闲 TTL + 总大小预算），单 worker 默认方案
+- SQLiteSessionStore: SQLite 文件，重启后保留，同机多 worker 共享
+- RedisSessionStore: Redis 协议，多机多 worker 共享
+
+持久化存储保存会话的可序列化部分（上下文、已生成内容、状态、消息），
+生成中的广播缓冲区和后台任务只存在于发起生成的进程内；
+事件循环中通过 save_async 保存：快照在事件循环上生成，序列化和 IO 在线程中执行。
+多个 worker 保存同一会话时，持久化存储在写入时用 merge 把快照与已存储的版本合并
+（读取与写入在同一事务内），不会用过期的快照覆盖其他 worker 写入的消息、内容和总结；
+读取同样通过 get_async / get_state_async 在线程中执行
+"""
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+from dotenv import load_dotenv
+
+from models.video_record import json_default
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """会话存储接口"""
+
+    # 后端名称（用于统计）
+    backend = "base"
+    # 是否可在多个 worker 之间共享
+    shared = False
+
+    def __init__(self):
+        # review_id -> 写入锁（同一会话的异步写入按调用顺序串行，会话不再写入后自动回收）
+        self._write_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    @abstractmethod
+    def get(self, review_id: str) -> Optional[Any]:
+        """获取会话并刷新访问时间，过期或不存在返回 None"""
+
+    async def get_async(self, review_id: str) -> Optional[Any]:
+        """在线程中读取并还原会话（反序列化上下文不占用事件循环）"""
+        return await asyncio.to_thread(self.get, review_id)
+
+    def get_state(self, review_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取会话字典（不含上下文，不还原会话对象），用于轮询其他 worker 的生成进度
+
+        不在 worker 之间共享的存储返回 None
+        """
+        return None
+
+    async def get_state_async(self, review_id: str) -> Optional[Dict[str, Any]]:
+        """在线程中执行 get_state"""
+        return await asyncio.to_thread(self.get_state, review_id)
+
+    @abstractmethod
+    def save(self, review_id: str, session: Any) -> None:
+        """保存（新建或更新）会话"""
+
+    def snapshot(self, session: Any) -> Any:
+        """
+        在事件循环上生成会话快照（之后在线程中写入，不再访问可变的会话对象）
+
+        默认使用 session.to_dict()（其中的上下文按引用保存，创建会话后不再修改）
+        """
+        return session.to_dict()
+
+    @abstractmethod
+    def write(self, review_id: str, snapshot: Any) -> Optional[Dict[str, Any]]:
+        """
+        写入 snapshot 生成的快照（save_async 中在线程里执行）
+
+        Returns:
+            与已存储版本合并后的会话字典（不含上下文），没有合并时返回 None
+        """
+
+    async def save_async(self, review_id: str, session: Any) -> Optional[Dict[str, Any]]:
+        """
+        异步保存会话：快照在事件循环上生成，序列化和写入通过 asyncio.to_thread 执行；
+        同一会话的写入按调用顺序串行，避免旧快照覆盖新快照
+
+        Returns:
+            合并后的会话字典（不含上下文），调用方可据此更新内存中的会话
+        """
+        snapshot = self.snapshot(session)
+        lock = self._write_locks.get(review_id)
+        if lock is None:
+            lock = self._write_locks[review_id] = asyncio.Lock()
+        async with lock:
+            return await asyncio.to_thread(self.write, review_id, snapshot)
+
+    @abstractmethod
+    def remove(self, review_id: str) -> None:
+        """删除会话"""
+
+    @abstractmethod
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取会话数、估算大小和命中/淘汰统计"""
+
+    def __contains__(self, review_id: str) -> bool:
+        return self.get(review_id) is not None
+
+    def close(self) -> None:
+        """释放连接"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    复盘会话存储（内存，LRU）
+
+    - idle_ttl: 会话空闲超过该时长（秒）后过期
+    - max_bytes: 所有会话的估算总大小上限，超出后淘汰最久未访问的会话
+    - max_sessions: 会话数上限
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        idle_ttl: float = 7200,
+        max_bytes: int = 200 * 1024 * 1024,
+        max_sessions: int = 1000,
+        on_evict: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        初始化存储
+
+        Args:
+            idle_ttl: 空闲过期时长（秒）
+            max_bytes: 估算总大小上限（字节）
+            max_sessions: 会话数上限
+            on_evict: 会话被移出时的回调（用于取消后台任务等）
+        """
+        super().__init__()
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max(1, max_sessions)
+        self.on_evict = on_evict
+        # review_id -> session，按访问时间从旧到新排列
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self.stats = {"created": 0, "hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, review_id: str) -> bool:
+        return review_id in self._sessions
+
+    def save(self, review_id: str, session: Any) -> None:
+        """保存会话，并按需淘汰"""
+        if review_id not in self._sessions:
+            self.stats["created"] += 1
+        self._sessions[review_id] = session
+        self._sessions.move_to_end(review_id)
+        self._last_access[review_id] = time.time()
+        self._enforce_limits()
+
+    def snapshot(self, session: Any) -> Any:
+        """内存存储直接保存会话对象"""
+        return session
+
+    def write(self, review_id: str, snapshot: Any) -> None:
+        self.save(review_id, snapshot)
+
+    async def save_async(self, review_id: str, session: Any) -> None:
+        """内存存储没有 IO，直接保存（进程内只有一个会话对象，无需合并）"""
+        self.save(review_id, session)
+
+    async def get_async(self, review_id: str) -> Optional[Any]:
+        """内存存储没有 IO，直接读取"""
+        return self.get(review_id)
+
+    def get(self, review_id: str) -> Optional[Any]:
+        """获取会话并刷新访问时间，过期或不存在返回 None"""
+        session = self._sessions.get(review_id)
+        if session is None:
+            self.stats["misses"] += 1
+            return None
+        if time.time() - self._last_access[review_id] > self.idle_ttl:
+            self._remove(review_id, "expired")
+            self.stats["misses"] += 1
+            return None
+        self._sessions.move_to_end(review_id)
+        self._last_access[review_id] = time.time()
+        self.stats["hits"] += 1
+        return session
+
+    def remove(self, review_id: str) -> None:
+        """删除会话"""
+        if review_id in self._sessions:
+            self._remove(review_id, None)
+
+    def _remove(self, review_id: str, reason: Optional[str]) -> None:
+        session = self._sessions.pop(review_id)
+        self._last_access.pop(review_id, None)
+        if reason:
+            self.stats[reason] += 1
+            logger.info(f"[SessionStore] 会话 {review_id} 已移出: {reason}")
+        if self.on_evict:
+            try:
+                self.on_evict(session)
+            except Exception as e:
+                logger.warning(f"[SessionStore] 会话移出回调失败: {e}")
+
+    def purge_expired(self) -> int:
+        """清理所有空闲过期的会话，返回清理数量"""
+        now = time.time()
+        expired = [
+            review_id for review_id, last_access in self._last_access.items()
+            if now - last_access > self.idle_ttl
+        ]
+        for review_id in expired:
+            self._remove(review_id, "expired")
+        return len(expired)
+
+    def _enforce_limits(self) -> None:
+        """清理过期会话，并按 LRU 淘汰直到满足数量和大小上限（至少保留最新的会话）"""
+        self.purge_expired()
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)), "evicted")
+
+        total = self.total_bytes()
+        while total > self.max_bytes and len(self._sessions) > 1:
+            review_id = next(iter(self._sessions))
+            total -= self._session_bytes(self._sessions[review_id])
+            self._remove(review_id, "evicted")
+
+    @staticmethod
+    def _session_bytes(session: Any) -> int:
+        approx_bytes = getattr(session, "approx_bytes", None)
+        return approx_bytes() if callable(approx_bytes) else 0
+
+    def total_bytes(self) -> int:
+        """所有会话的估算总大小（字节）"""
+        return sum(self._session_bytes(session) for session in self._sessions.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取会话数、估算大小和命中/淘汰统计"""
+        self.purge_expired()
+        return {
+            "backend": self.backend,
+            **self.stats,
+            "sessions": len(self._sessions),
+            "approx_bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+        }
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    review_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    context TEXT,
+    context_size INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    复盘会话存储（SQLite 文件）
+
+    会话以 JSON 保存；同一文件可被同机的多个 worker 进程共享（WAL 模式）
+
+    上下文（视频列表和统计，会话中最大且创建后不变的部分）单独存一列，只在记录不存在时序列化；
+    之后的保存只在事务内读取、合并并写回内容、状态和消息。
+    读取产生的访问时间先记在内存中，每 ACCESS_FLUSH_INTERVAL 秒（以及保存、清理时）批量写入
+    """
+
+    backend = "sqlite"
+    shared = True
+
+    # 每保存多少次检查一次过期和大小上限
+    EVICT_CHECK_INTERVAL = 20
+    # 读取产生的访问时间批量写入的间隔（秒）
+    ACCESS_FLUSH_INTERVAL = 30
+
+    def __init__(
+        self,
+        db_path: str,
+        loads: Callable[[Dict[str, Any]], Any],
+        idle_ttl: float = 7200,
+        max_bytes: int = 200 * 1024 * 1024,
+        merge: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None
+    ):
+        """
+        初始化存储
+
+        Args:
+            db_path: SQLite 文件路径
+            loads: 由 dict 还原会话对象的函数
+            merge: 合并 (已存储的会话字典, 本次快照) 的函数，None 时直接覆盖
+            idle_ttl: 空闲过期时长（秒）
+            max_bytes: 会话数据总大小上限（字节）
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.loads = loads
+        self.merge = merge
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._saves = 0
+        # 尚未写入的访问时间 review_id -> 时间戳
+        self._accessed: Dict[str, float] = {}
+        self._last_flush = time.time()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SQLITE_SCHEMA)
+        # 旧版本会话文件补充上下文列（旧记录的上下文仍在 data 中）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "context" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN context TEXT")
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN context_size INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    def get(self, review_id: str) -> Optional[Any]:
+        row = self._read(review_id, "data, context")
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        if row[1] is not None:
+            data["context"] = json.loads(row[1])
+        return self.loads(data)
+
+    def get_state(self, review_id: str) -> Optional[Dict[str, Any]]:
+        row = self._read(review_id, "data")
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        data.pop("context", None)
+        return data
+
+    def _read(self, review_id: str, columns: str) -> Optional[Tuple]:
+        """读取一行（过期时删除），访问时间记入待写入列表"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT last_access, {columns} FROM sessions WHERE review_id = ?", (review_id,)
+            ).fetchone()
+            if row and now - max(row[0], self._accessed.get(review_id, 0)) > self.idle_ttl:
+                self._conn.execute("DELETE FROM sessions WHERE review_id = ?", (review_id,))
+                self._conn.commit()
+                self._accessed.pop(review_id, None)
+                self.stats["expired"] += 1
+                row = None
+            if not row:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self._accessed[review_id] = now
+            if now - self._last_flush >= self.ACCESS_FLUSH_INTERVAL:
+                self._flush_access_locked()
+                self._conn.commit()
+        return row[1:]
+
+    def _flush_access_locked(self) -> None:
+        """把待写入的访问时间批量写入（不提交，由调用方提交）"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE sessions SET last_access = MAX(last_access, ?) WHERE review_id = ?",
+                [(accessed, review_id) for review_id, accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+        self._last_flush = time.time()
+
+    def save(self, review_id: str, session: Any) -> None:
+        self.write(review_id, self.snapshot(session))
+
+    def snapshot(self, session: Any) -> Tuple[Dict[str, Any], Any]:
+        """(不含上下文的会话字典, 上下文引用)"""
+        data = session.to_dict()
+        context = data.pop("context", None)
+        return data, context
+
+    def write(self, review_id: str, snapshot: Tuple[Dict[str, Any], Any]) -> Dict[str, Any]:
+        data, context = snapshot
+        now = time.time()
+        with self._lock:
+            # 读取、合并、写回在同一个写事务内，其他 worker 的写入在此期间等待
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data, context IS NOT NULL FROM sessions WHERE review_id = ?", (review_id,)
+                ).fetchone()
+                if row and self.merge:
+                    data = self.merge(json.loads(row[0]), data)
+                data_json = json.dumps(data, ensure_ascii=False, default=json_default)
+                size = len(data_json.encode("utf-8"))
+                if row and row[1]:
+                    # 上下文已在库中：只更新其余部分
+                    self._conn.execute(
+                        "UPDATE sessions SET data = ?, size = ?, updated_at = ?, last_access = ? WHERE review_id = ?",
+                        (data_json, size, now, now, review_id)
+                    )
+                else:
+                    # 首次保存、记录已被淘汰或旧版本记录：连同上下文一起写入
+                    context_json = json.dumps(context, ensure_ascii=False, default=json_default)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO sessions "
+                        "(review_id, data, size, context, context_size, updated_at, last_access) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (review_id, data_json, size, context_json, len(context_json.encode("utf-8")), now, now)
+                    )
+                self._accessed.pop(review_id, None)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._saves += 1
+            if self._saves % self.EVICT_CHECK_INTERVAL == 0:
+                self._enforce_limits_locked()
+        return data
+
+    def remove(self, review_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE review_id = ?", (review_id,))
+            self._conn.commit()
+            self._accessed.pop(review_id, None)
+
+    def _enforce_limits_locked(self) -> None:
+        """清理过期会话，并在超出大小上限时按最近访问时间淘汰"""
+        self._flush_access_locked()
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE last_access < ?", (time.time() - self.idle_ttl,)
+        )
+        self.stats["expired"] += cursor.rowcount
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size + context_size), 0) FROM sessions").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT review_id, size + context_size FROM sessions ORDER BY last_access"
+            ).fetchall()
+            to_delete = []
+            # 至少保留最近访问的会话
+            for review_id, size in rows[:-1]:
+                if total <= self.max_bytes:
+                    break
+                to_delete.append((review_id,))
+                total -= size
+            self._conn.executemany("DELETE FROM sessions WHERE review_id = ?", to_delete)
+            self.stats["evicted"] += len(to_delete)
+        self._conn.commit()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._enforce_limits_locked()
+            sessions, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size + context_size), 0) FROM sessions"
+            ).fetchone()
+            return {
+                "backend": self.backend,
+                **self.stats,
+                "sessions": sessions,
+                "approx_bytes": total,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    复盘会话存储（Redis 协议）
+
+    每个会话一个键，空闲 TTL 由键过期时间实现（每次读取时续期），
+    内存上限由 Redis 自身的 maxmemory 策略控制。
+    保存时在 WATCH / MULTI 事务中读取、合并并写回（键被其他 worker 修改时自动重试）。
+    client 只需提供 get / set(ex=) / expire / delete / scan_iter / transaction，
+    可传入 redis.Redis 或本地替身（如 fakeredis.FakeRedis）
+    """
+
+    backend = "redis"
+    shared = True
+
+    def __init__(
+        self,
+        client: Any,
+        loads: Callable[[Dict[str, Any]], Any],
+        idle_ttl: float = 7200,
+        prefix: str = "video_ops:review:",
+        merge: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None
+    ):
+        """
+        初始化存储
+
+        Args:
+            client: Redis 客户端
+            loads: 由 dict 还原会话对象的函数
+            idle_ttl: 空闲过期时长（秒）
+            prefix: 键前缀
+            merge: 合并 (已存储的会话字典, 本次快照) 的函数，None 时直接覆盖
+        """
+        super().__init__()
+        self.client = client
+        self.loads = loads
+        self.merge = merge
+        self.idle_ttl = max(1, int(idle_ttl))
+        self.prefix = prefix
+        self.stats = {"hits": 0, "misses": 0}
+
+    @classmethod
+    def from_url(cls, url: str, loads: Callable[[Dict[str, Any]], Any], **kwargs) -> "RedisSessionStore":
+        """通过 URL 创建（需要安装 redis 包）"""
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("REVIEW_SESSION_BACKEND=redis 需要安装 redis 包: pip install redis") from e
+        return cls(redis.Redis.from_url(url), loads, **kwargs)
+
+    def _key(self, review_id: str) -> str:
+        return f"{self.prefix}{review_id}"
+
+    def get(self, review_id: str) -> Optional[Any]:
+        key = self._key(review_id)
+        data = self.client.get(key)
+        if data is None:
+            self.stats["misses"] += 1
+            return None
+        self.client.expire(key, self.idle_ttl)
+        self.stats["hits"] += 1
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return self.loads(json.loads(data))
+
+    def get_state(self, review_id: str) -> Optional[Dict[str, Any]]:
+        key = self._key(review_id)
+        data = self.client.get(key)
+        if data is None:
+            return None
+        self.client.expire(key, self.idle_ttl)
+        state = json.loads(data)
+        state.pop("context", None)
+        return state
+
+    def save(self, review_id: str, session: Any) -> None:
+        self.write(review_id, self.snapshot(session))
+
+    def write(self, review_id: str, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        key = self._key(review_id)
+        merged = snapshot
+
+        def update(pipe) -> None:
+            nonlocal merged
+            current = pipe.get(key)
+            merged = self.merge(json.loads(current), snapshot) if current is not None and self.merge else snapshot
+            pipe.multi()
+            pipe.set(key, json.dumps(merged, ensure_ascii=False, default=json_default), ex=self.idle_ttl)
+
+        self.client.transaction(update, key)
+        return {k: v for k, v in merged.items() if k != "context"}
+
+    def remove(self, review_id: str) -> None:
+        self.client.delete(self._key(review_id))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        sessions = sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}*", count=500))
+        return {
+            "backend": self.backend,
+            **self.stats,
+            "sessions": sessions,
+            "idle_ttl": self.idle_ttl,
+        }
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if callable(close):
+            close()
+
+
+def create_session_store(
+    loads: Callable[[Dict[str, Any]], Any],
+    on_evict: Optional[Callable[[Any], None]] = None,
+    merge: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None
+) -> SessionStore:
+    """
+    按配置创建会话存储
+
+    REVIEW_SESSION_BACKEND: memory（默认）/ sqlite / redis
+    - 公共：REVIEW_SESSION_TTL（空闲过期秒数，默认 7200）、REVIEW_SESSION_MAX_MB（默认 200）
+    - memory：REVIEW_SESSION_MAX_COUNT（默认 1000）
+    - sqlite：REVIEW_SESSION_PATH（默认 backend/data/review_sessions.sqlite3）
+    - redis：REVIEW_REDIS_URL（默认 redis://localhost:6379/0）
+
+    Args:
+        loads: 由 dict 还原会话对象的函数（持久化存储使用）
+        on_evict: 会话被移出时的回调（内存存储使用）
+        merge: 保存时合并已存储版本与快照的函数（持久化存储使用）
+    """
+    backend = os.getenv("REVIEW_SESSION_BACKEND", "memory").lower()
+    idle_ttl = float(os.getenv("REVIEW_SESSION_TTL", 7200))
+    max_bytes = int(float(os.getenv("REVIEW_SESSION_MAX_MB", 200)) * 1024 * 1024)
+
+    if backend == "sqlite":
+        db_path = os.getenv(
+            "REVIEW_SESSION_PATH",
+            os.path.join(os.path.dirname(__file__), "..", "..", "data", "review_sessions.sqlite3")
+        )
+        logger.info(f"[SessionStore] 使用 SQLite 会话存储: {db_path}")
+        return SQLiteSessionStore(db_path, loads, idle_ttl=idle_ttl, max_bytes=max_bytes, merge=merge)
+
+    if backend == "redis":
+        url = os.getenv("REVIEW_REDIS_URL", "redis://localhost:6379/0")
+        logger.info(f"[SessionStore] 使用 Redis 会话存储: {url}")
+        return RedisSessionStore.from_url(url, loads, idle_ttl=idle_ttl, merge=merge)
+
+    if backend != "memory":
+        logger.warning(f"[SessionStore] 未知的 REVIEW_SESSION_BACKEND={backend}，使用内存存储")
+    return MemorySessionStore(
+        idle_ttl=idle_ttl,
+        max_bytes=max_bytes,
+        max_sessions=int(os.getenv("REVIEW_SESSION_MAX_COUNT", 1000)),
+        on_evict=on_evict
+    )
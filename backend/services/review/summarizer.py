@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Review Summarizer - 复盘总结
+整合三个 Agent 的发言生成结构化总结（ReviewSummary）
+
+过长的发言不做截断，而是按段落切块后并发提炼（map），
+再把提炼结果交给总结提示词生成最终报告（reduce）
+"""
+import os
+import re
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+from models.review import AgentType, ActionItem, ActionItemType, Priority, ReviewSummary
+from prompts.review_prompts import (
+    SUMMARIZER_SYSTEM_PROMPT,
+    build_summarizer_prompt,
+    build_chunk_summary_prompt
+)
+from services.llm_clients import get_async_openai_client
+from services.agents.rate_limiter import get_llm_rate_limiter, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# Agent 在提示词中的名称
+AGENT_LABELS = {
+    AgentType.ANALYST: "数据分析",
+    AgentType.STRATEGIST: "排期策略",
+    AgentType.HACKER: "增长黑客",
+}
+
+# 总结报告预留的输出 token 数
+SUMMARY_COMPLETION_TOKENS = 1500
+
+# 最多提炼轮数（模型未按字数要求输出时再提炼一轮，仍超长则截断）
+MAX_CONDENSE_ROUNDS = 2
+
+
+def split_chunks(content: str, chunk_chars: int) -> List[str]:
+    """
+    按段落 / 行边界把内容切分为不超过 chunk_chars 的块（超长的单行按字符硬切）
+    """
+    chunks: List[str] = []
+    buffer = ""
+    for line in content.splitlines(keepends=True):
+        while len(line) > chunk_chars:
+            if buffer:
+                chunks.append(buffer)
+                buffer = ""
+            chunks.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+        if len(buffer) + len(line) > chunk_chars:
+            chunks.append(buffer)
+            buffer = ""
+        buffer += line
+    if buffer.strip():
+        chunks.append(buffer)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class ReviewSummarizer:
+    """
+    复盘总结器
+
+    配置（环境变量）：
+    - REVIEW_SUMMARY_MESSAGE_CHARS: 单个 Agent 发言直接送入总结的最大字符数，超过则分段提炼（默认 1500）
+    - REVIEW_SUMMARY_CHUNK_CHARS: 分段提炼时每段的字符数（默认 2000）
+    - REVIEW_SUMMARY_TIMEOUT: 单次 LLM 调用超时秒数（默认 120）
+    """
+
+    def __init__(self, system_prompt: Optional[str] = None):
+        """
+        初始化总结器
+
+        Args:
+            system_prompt: 会话的自定义总结提示词，为空时使用默认提示词
+        """
+        self.system_prompt = system_prompt or SUMMARIZER_SYSTEM_PROMPT
+        self.model = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
+        self.message_chars = max(200, int(os.getenv("REVIEW_SUMMARY_MESSAGE_CHARS", 1500)))
+        self.chunk_chars = max(200, int(os.getenv("REVIEW_SUMMARY_CHUNK_CHARS", 2000)))
+        self.call_timeout = float(os.getenv("REVIEW_SUMMARY_TIMEOUT", 120))
+
+    async def summarize(self, contents: Dict[AgentType, str]) -> ReviewSummary:
+        """
+        生成总结
+
+        Args:
+            contents: Agent 类型 -> 完整发言
+
+        Returns:
+            ReviewSummary
+
+        Raises:
+            Exception: LLM 调用或解析失败（由调用方降级）
+        """
+        agent_types = (AgentType.ANALYST, AgentType.STRATEGIST, AgentType.HACKER)
+        condensed = await asyncio.gather(*[
+            self._condense(agent_type, contents.get(agent_type, ""))
+            for agent_type in agent_types
+        ])
+        prompt = build_summarizer_prompt(*condensed)
+
+        content = await self._complete(prompt, SUMMARY_COMPLETION_TOKENS, system_prompt=self.system_prompt, json_mode=True)
+        return self._parse_summary(json.loads(content))
+
+    async def _condense(self, agent_type: AgentType, content: str) -> str:
+        """
+        把单个 Agent 的发言压缩到 message_chars 以内
+
+        短发言原样返回；长发言切块后并发提炼，提炼结果仍超长时再提炼一轮
+        """
+        label = AGENT_LABELS.get(agent_type, agent_type.value)
+        for round_index in range(MAX_CONDENSE_ROUNDS):
+            if len(content) <= self.message_chars:
+                return content
+            chunks = split_chunks(content, self.chunk_chars)
+            max_chars = max(100, self.message_chars // len(chunks))
+            logger.info(
+                f"[Summarizer] {label} 发言 {len(content)} 字，第 {round_index + 1} 轮分 {len(chunks)} 段提炼"
+            )
+            digests = await asyncio.gather(*[
+                self._complete(
+                    build_chunk_summary_prompt(label, chunk, index, len(chunks), max_chars),
+                    max_chars
+                )
+                for index, chunk in enumerate(chunks, 1)
+            ])
+            content = "\n".join(digest.strip() for digest in digests if digest and digest.strip())
+        return content[:self.message_chars]
+
+    async def _complete(
+        self,
+        prompt: str,
+        expected_completion_tokens: int,
+        system_prompt: Optional[str] = None,
+        json_mode: bool = False
+    ) -> str:
+        """
+        调用 LLM（受全局限流器和单次调用超时限制）
+
+        Raises:
+            asyncio.TimeoutError: 超过 call_timeout
+        """
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        kwargs: Dict[str, Any] = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+        limiter = get_llm_rate_limiter()
+        estimated = estimate_tokens(system_prompt or "") + estimate_tokens(prompt) + expected_completion_tokens
+        async with limiter.limit(estimated):
+            response = await asyncio.wait_for(
+                get_async_openai_client().chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    **kwargs
+                ),
+                timeout=self.call_timeout
+            )
+        return response.choices[0].message.content or ""
+
+    def _parse_summary(self, data: Dict[str, Any]) -> ReviewSummary:
+        """把模型返回的 JSON 规范化为 ReviewSummary（非法的操作项字段取默认值）"""
+        priorities = {p.value for p in Priority}
+        action_types = {t.value for t in ActionItemType}
+
+        action_items = []
+        for index, item in enumerate(data.get("actionItems") or [], 1):
+            if not isinstance(item, dict) or not item.get("text"):
+                continue
+            priority = str(item.get("priority", "")).lower()
+            action_type = str(item.get("type", "")).lower()
+            action_items.append(ActionItem(
+                id=str(item.get("id") or f"act_{index}"),
+                text=str(item["text"]),
+                priority=priority if priority in priorities else Priority.MEDIUM,
+                type=action_type if action_type in action_types else ActionItemType.GENERAL,
+                executable=bool(item.get("executable", False))
+            ))
+
+        return ReviewSummary(
+            keyInsights=[str(x) for x in data.get("keyInsights") or [] if x],
+            actionItems=action_items,
+            hypotheses=[str(x) for x in data.get("hypotheses") or [] if x]
+        )
+
+    def get_fallback_summary(self, contents: Dict[AgentType, str]) -> ReviewSummary:
+        """
+        降级总结：LLM 不可用时从各 Agent 发言中抽取要点行作为洞察，
+        含“假设”的行作为假设
+        """
+        insights: List[str] = []
+        hypotheses: List[str] = []
+        for agent_type in (AgentType.ANALYST, AgentType.STRATEGIST, AgentType.HACKER):
+            points = []
+            for line in (contents.get(agent_type) or "").splitlines():
+                text = re.sub(r"^[\s#>*\-•\d.、)）]+", "", line).strip().strip("*")
+                if len(text) < 6:
+                    continue
+                if "假设" in text and len(hypotheses) < 3:
+                    hypotheses.append(text[:120])
+                elif not line.lstrip().startswith("#") and len(points) < 2:
+                    points.append(text[:120])
+            insights.extend(points)
+
+        return ReviewSummary(keyInsights=insights, actionItems=[], hypotheses=hypotheses)
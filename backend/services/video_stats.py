@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Video Stats - 视频数据统计引擎（列式）
+一次遍历把视频记录（VideoRecord，数值字段在读取时已解析）转换为数值列，之后的总量、按账号 / 时段聚合、分位数、Top-K 和异常值
+都基于这些列计算；结果中的视频以列表下标引用，不复制视频字典
+"""
+import math
+from array import array
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from models.video_record import VideoRecord
+
+
+# 发布时段划分：(名称, 起始小时, 结束小时（不含）)
+TIME_SLOTS: Tuple[Tuple[str, int, int], ...] = (
+    ("凌晨 00-06", 0, 6),
+    ("早间 06-11", 6, 11),
+    ("午间 11-14", 11, 14),
+    ("下午 14-17", 14, 17),
+    ("傍晚 17-19", 17, 19),
+    ("晚间 19-22", 19, 22),
+    ("深夜 22-24", 22, 24),
+)
+
+# 评级展示顺序
+GRADE_ORDER = ("S", "A", "B", "C", "D", "N/A")
+
+# 默认统计的分位数
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+# IQR 异常值判定系数
+OUTLIER_IQR_FACTOR = 1.5
+
+
+def _slot_index(hour: int) -> int:
+    """小时所属的时段下标，未知时返回 -1"""
+    for index, (_, start, end) in enumerate(TIME_SLOTS):
+        if start <= hour < end:
+            return index
+    return -1
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    """已排序序列的分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return float(sorted_values[lower])
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class VideoStats:
+    """
+    视频统计引擎
+
+    构建时一次遍历视频列表生成数值列（播放、互动、发布小时、账号编号、AI 评分），
+    各项统计按需计算并缓存
+    """
+
+    def __init__(self, videos: List[VideoRecord]):
+        """
+        构建数值列
+
+        Args:
+            videos: 视频记录列表（只保存引用，不复制）
+        """
+        self.videos = videos
+        self.views = array("q")
+        self.interactions = array("q")
+        self.hours = array("b")
+        self.account_ids = array("i")
+        self.scores = array("d")
+        self.grades: List[str] = []
+        self.account_names: List[str] = []
+
+        account_lookup: Dict[str, int] = {}
+        for video in videos:
+            self.views.append(video.read_count)
+            self.interactions.append(video.interactions)
+            self.hours.append(video.publish_hour)
+
+            account = video.account or "未知"
+            account_id = account_lookup.get(account)
+            if account_id is None:
+                account_id = account_lookup[account] = len(self.account_names)
+                self.account_names.append(account)
+            self.account_ids.append(account_id)
+
+            analysis = video.ai_analysis or {}
+            score = analysis.get("overall_score")
+            self.scores.append(float(score) if isinstance(score, (int, float)) else math.nan)
+            self.grades.append(analysis.get("grade") or "N/A")
+
+        self._order: Optional[List[int]] = None
+        self._groups: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    @property
+    def order(self) -> List[int]:
+        """按播放量降序的视频下标（只排序一次）"""
+        if self._order is None:
+            views = self.views
+            self._order = sorted(range(len(views)), key=views.__getitem__, reverse=True)
+        return self._order
+
+    def engagement_rate(self, index: int) -> float:
+        """单个视频的互动率（%）"""
+        views = self.views[index]
+        return self.interactions[index] / views * 100 if views > 0 else 0.0
+
+    def totals(self) -> Dict[str, Any]:
+        """总量与均值"""
+        count = len(self.views)
+        total_views = sum(self.views)
+        total_interactions = sum(self.interactions)
+        return {
+            "total_videos": count,
+            "total_views": total_views,
+            "total_interactions": total_interactions,
+            "avg_views": total_views / count if count else 0,
+            "avg_engagement_rate": total_interactions / total_views * 100 if total_views > 0 else 0,
+        }
+
+    def _group(self) -> Dict[str, Any]:
+        """一次遍历数值列，同时完成按账号、按时段和按评级的聚合"""
+        if self._groups is not None:
+            return self._groups
+
+        accounts = [
+            {"count": 0, "total_views": 0, "total_interactions": 0, "best_index": -1, "indices": []}
+            for _ in self.account_names
+        ]
+        slots = [
+            {"count": 0, "total_views": 0, "total_interactions": 0, "indices": []}
+            for _ in TIME_SLOTS
+        ]
+        grades: Dict[str, int] = {}
+        score_sum, score_count = 0.0, 0
+
+        for index in range(len(self.views)):
+            views = self.views[index]
+            interactions = self.interactions[index]
+
+            account = accounts[self.account_ids[index]]
+            account["count"] += 1
+            account["total_views"] += views
+            account["total_interactions"] += interactions
+            account["indices"].append(index)
+            if account["best_index"] < 0 or views > self.views[account["best_index"]]:
+                account["best_index"] = index
+
+            slot_index = _slot_index(self.hours[index])
+            if slot_index >= 0:
+                slot = slots[slot_index]
+                slot["count"] += 1
+                slot["total_views"] += views
+                slot["total_interactions"] += interactions
+                slot["indices"].append(index)
+
+            grade = self.grades[index]
+            grades[grade] = grades.get(grade, 0) + 1
+            score = self.scores[index]
+            if not math.isnan(score):
+                score_sum += score
+                score_count += 1
+
+        for data in accounts + slots:
+            data["avg_views"] = data["total_views"] / data["count"] if data["count"] else 0
+            data["engagement_rate"] = (
+                data["total_interactions"] / data["total_views"] * 100 if data["total_views"] > 0 else 0
+            )
+
+        self._groups = {
+            "accounts": dict(zip(self.account_names, accounts)),
+            "time_slots": {
+                name: slot for (name, _, _), slot in zip(TIME_SLOTS, slots) if slot["count"]
+            },
+            "grades": {g: grades[g] for g in GRADE_ORDER if g in grades},
+            "avg_score": score_sum / score_count if score_count else None,
+        }
+        # 不在预设顺序中的评级排在最后
+        self._groups["grades"].update({g: c for g, c in grades.items() if g not in GRADE_ORDER})
+        return self._groups
+
+    def account_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按账号聚合：count / total_views / avg_views / engagement_rate / best_index / indices"""
+        return self._group()["accounts"]
+
+    def time_slot_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按发布时段聚合（只包含有视频的时段）"""
+        return self._group()["time_slots"]
+
+    def grade_distribution(self) -> Dict[str, int]:
+        """AI 评级分布"""
+        return self._group()["grades"]
+
+    def avg_score(self) -> Optional[float]:
+        """AI 评分均值（没有评分时为 None）"""
+        return self._group()["avg_score"]
+
+    def percentiles(self, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """播放量分位数，如 {"p50": 1234.0}"""
+        ascending = [self.views[i] for i in reversed(self.order)]
+        return {f"p{q:g}": round(_percentile(ascending, q), 1) for q in qs}
+
+    def top_k(self, k: int) -> List[int]:
+        """播放量最高的 k 个视频下标"""
+        return self.order[:k]
+
+    def bottom_k(self, k: int) -> List[int]:
+        """播放量最低的 k 个视频下标（从低到高）"""
+        return list(reversed(self.order[-k:])) if k > 0 else []
+
+    def outliers(self) -> Dict[str, List[int]]:
+        """
+        播放量异常值（IQR 规则），视频数少于 4 条时不判定
+
+        Returns:
+            {"high": 明显高于同批视频的下标, "low": 明显低于同批视频的下标}
+        """
+        if len(self.views) < 4:
+            return {"high": [], "low": []}
+        ascending = [self.views[i] for i in reversed(self.order)]
+        q1, q3 = _percentile(ascending, 25), _percentile(ascending, 75)
+        spread = (q3 - q1) * OUTLIER_IQR_FACTOR
+        return {
+            "high": [i for i in self.order if self.views[i] > q3 + spread],
+            "low": [i for i in reversed(self.order) if self.views[i] < q1 - spread],
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        汇总统计（可 JSON 序列化）
+
+        兼容原 calculate_summary_stats 的字段（total_videos / total_views / avg_views /
+        avg_engagement_rate / top_video / accounts），账号下的视频改为 video_indices 下标列表
+        """
+        totals = self.totals()
+        groups = self._group()
+        top_index = self.order[0] if self.order else None
+
+        return {
+            "total_videos": totals["total_videos"],
+            "total_views": totals["total_views"],
+            "avg_views": round(totals["avg_views"], 0),
+            "avg_engagement_rate": round(totals["avg_engagement_rate"], 2),
+            "top_video": self.videos[top_index].to_dict() if top_index is not None else None,
+            "top_index": top_index,
+            "accounts": {
+                account: {
+                    "count": data["count"],
+                    "total_views": data["total_views"],
+                    "avg_views": data["avg_views"],
+                    "engagement_rate": round(data["engagement_rate"], 2),
+                    "best_index": data["best_index"],
+                    "video_indices": data["indices"],
+                }
+                for account, data in groups["accounts"].items()
+            },
+            "time_slots": {
+                name: {
+                    "count": data["count"],
+                    "total_views": data["total_views"],
+                    "avg_views": round(data["avg_views"], 0),
+                    "engagement_rate": round(data["engagement_rate"], 2),
+                    "video_indices": data["indices"],
+                }
+                for name, data in groups["time_slots"].items()
+            },
+            "percentiles": self.percentiles(),
+            "outliers": self.outliers(),
+            "grade_distribution": groups["grades"],
+            "avg_score": round(groups["avg_score"], 2) if groups["avg_score"] is not None else None,
+        }
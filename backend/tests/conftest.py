@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+pytest 配置：把 backend 目录加入 sys.path，测试按应用内的方式导入模块（services.xxx / models.xxx）
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+内容分析后台任务：部分结果带输入位置；配置共享存储时其他 worker 可查询任务状态
+"""
+import asyncio
+
+from services.analysis_jobs import AnalysisJob, AnalysisJobManager
+from services.review.session_store import SQLiteSessionStore
+
+
+class FakeAgent:
+    """按批次回调的 ContentQualityAgent 替身：第一批完成后等待放行，再完成第二批"""
+
+    def __init__(self):
+        self.first_batch_done = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def batch_analyze_async(self, videos, on_plan=None, on_batch_done=None, use_cache=True):
+        results = [{"video_id": video["video_id"], "overall_score": 8} for video in videos]
+        on_plan(2)
+        on_batch_done([1], [results[1]])
+        self.first_batch_done.set()
+        await self.release.wait()
+        on_batch_done([0], [results[0]])
+        return results
+
+
+def test_partial_results_carry_input_index():
+    job = AnalysisJob("ana_1", [{"video_id": "v0"}, {"video_id": "v1"}])
+    job.on_plan(2)
+    job.on_batch_done([1], [{"video_id": "v1", "overall_score": 8}])
+
+    assert job.to_status()["results"] == [{"video_id": "v1", "overall_score": 8, "index": 1}]
+
+
+def test_other_worker_reads_job_from_shared_store(tmp_path):
+    def make_store():
+        return SQLiteSessionStore(str(tmp_path / "jobs.db"), AnalysisJob.from_dict, idle_ttl=3600)
+
+    async def scenario():
+        agent = FakeAgent()
+        owner = AnalysisJobManager(agent, store=make_store())
+        other = AnalysisJobManager(agent, store=make_store())
+
+        job = await owner.submit([{"video_id": "v0"}, {"video_id": "v1"}])
+        await agent.first_batch_done.wait()
+        await asyncio.gather(*owner._persist_tasks)
+
+        partial = (await other.get_job(job.task_id)).to_status()
+        agent.release.set()
+        await owner._queue.join()
+        final = (await other.get_job(job.task_id)).to_status()
+        await owner.shutdown()
+        return partial, final
+
+    partial, final = asyncio.run(scenario())
+
+    assert partial["status"] == "analyzing"
+    assert partial["batches_done"] == 1
+    assert [result["index"] for result in partial["results"]] == [1]
+    assert final["status"] == "completed"
+    assert [result["index"] for result in final["results"]] == [0, 1]
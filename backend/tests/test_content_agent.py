@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+ContentQualityAgent 批量响应解析：重试耗尽后的降级结果不能被当作模型结果接受
+"""
+import asyncio
+
+from services.agents.content_agent import ContentQualityAgent
+
+
+def test_single_video_batch_rejects_fallback_result(monkeypatch):
+    agent = ContentQualityAgent()
+    monkeypatch.setattr("services.agents.content_agent.get_llm_cache", lambda: None)
+    video = {"video_id": "v1", "title": "视频", "account_name": "账号A"}
+    calls = []
+
+    async def call_llm(prompt, **kwargs):
+        # 模拟 _call_llm_async 重试耗尽后返回降级结果
+        calls.append(prompt)
+        return agent._get_fallback_result()
+
+    agent._call_llm_async = call_llm
+
+    assert agent._parse_batch_response(agent._get_fallback_result(), [video]) == [None]
+    results = asyncio.run(agent._analyze_batch_async([video], "账号A", use_cache=False))
+
+    # 降级结果触发一次合并重试，最终仍以降级结果返回
+    assert len(calls) == 2
+    assert results[0]["video_id"] == "v1"
+    assert results[0]["reasoning"] == ContentQualityAgent.FALLBACK_REASONING
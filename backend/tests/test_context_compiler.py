@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+提问上下文编译：视频列表被预算截断时，省略说明也在预算之内
+"""
+import re
+
+from models.video_record import VideoRecord
+from services.review.context_compiler import compile_question_context
+
+
+def make_context(videos: int = 20) -> dict:
+    return {
+        "date": "2026-10-18",
+        "videos": [
+            VideoRecord(f"rec_{i}", f"测试视频标题{i}", "账号A", read_count=(i + 1) * 1000, like_count=i * 10)
+            for i in range(videos)
+        ],
+    }
+
+
+def test_omitted_note_fits_in_budget():
+    question = "账号A 今天表现怎么样"
+    noted = 0
+    for budget in range(40, 600, 3):
+        result = compile_question_context(make_context(), question, token_budget=budget)
+        assert result["tokens"] <= budget
+
+        section = result["text"].split("【问题涉及账号的视频】\n", 1)
+        if len(section) < 2:
+            continue
+        shown = len(re.findall(r"^- ", section[1].split("\n【", 1)[0], flags=re.M))
+        if shown < 20:
+            # 视频被截断时一定附带省略说明，且条数与实际省略的一致
+            assert f"（另有 {20 - shown} 条省略）" in section[1]
+            noted += 1
+    assert noted
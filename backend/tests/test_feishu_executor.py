@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+飞书同步 SDK 调用在线程池中执行时，不应阻塞同一事件循环上的 SSE 流
+"""
+import time
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from services.feishu_video_reader import FeishuVideoDataReader
+
+
+SEARCH_SECONDS = 1.0
+TICK_SECONDS = 0.05
+
+
+class BlockingSearchClient:
+    """bitable 客户端替身：search 同步阻塞约 1 秒后返回一页记录"""
+
+    def __init__(self, publish_ms: int):
+        self.calls = 0
+        self.publish_ms = publish_ms
+        self.bitable = SimpleNamespace(
+            v1=SimpleNamespace(app_table_record=SimpleNamespace(search=self.search))
+        )
+
+    def search(self, request):
+        self.calls += 1
+        time.sleep(SEARCH_SECONDS)
+        record = SimpleNamespace(
+            record_id="rec_1",
+            fields={"视频标题": "测试视频", "账号名称": "账号A", "发布时间": self.publish_ms, "浏览次数": "1,234"},
+            last_modified_time=self.publish_ms,
+        )
+        return SimpleNamespace(
+            success=lambda: True,
+            data=SimpleNamespace(items=[record], has_more=False, page_token=None),
+        )
+
+
+async def sse_ticker(events: list, stop: asyncio.Event):
+    """模拟 SSE 生成器：每个时间片产出一个事件"""
+    while not stop.is_set():
+        events.append({"event": "tick", "data": time.monotonic()})
+        await asyncio.sleep(TICK_SECONDS)
+
+
+def test_sse_events_keep_flowing_during_large_table_read():
+    target_date = "2026-10-18"
+    publish_ms = int(datetime.strptime(target_date, "%Y-%m-%d").timestamp() * 1000) + 3600 * 1000
+
+    reader = FeishuVideoDataReader("app_id", "app_secret", use_cache=False)
+    reader.client = BlockingSearchClient(publish_ms)
+
+    async def scenario():
+        events: list = []
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(sse_ticker(events, stop))
+        await asyncio.sleep(0)
+
+        started = time.monotonic()
+        videos = await reader.get_videos_by_date("app_token", "table_id", target_date)
+        elapsed = time.monotonic() - started
+
+        stop.set()
+        await ticker
+        during_read = [e for e in events if started <= e["data"] <= started + elapsed]
+        return videos, elapsed, during_read
+
+    videos, elapsed, during_read = asyncio.run(scenario())
+
+    assert reader.client.calls == 1
+    assert [v.name for v in videos] == ["测试视频"]
+    assert elapsed >= SEARCH_SECONDS
+    # 读取期间事件循环未被阻塞：约 1 秒内应产出接近 20 个事件，至少要有一半
+    assert len(during_read) >= int(SEARCH_SECONDS / TICK_SECONDS) // 2
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+FeishuWriter 批量写入：同一记录在一次调用中重复出现时只写入最后一次的评分
+"""
+from models.analysis import VideoScore
+from services.feishu_writer import FeishuWriter
+
+
+def make_score(video_id: str, overall_score: int) -> VideoScore:
+    return VideoScore(
+        video_id=video_id,
+        overall_score=overall_score,
+        grade="A",
+        optimization_advice="建议",
+        reasoning="理由",
+    )
+
+
+def make_writer(record_id_map, batch_size=None):
+    writer = FeishuWriter("app_id", "app_secret")
+    calls = []
+    writer._get_field_id_map = lambda app_token, table_id, field_mapping: {"AI 评分": "fld_score"}
+    writer._find_record_ids_by_video_ids = lambda app_token, table_id, video_ids: dict(record_id_map)
+
+    def batch_update(app_token, table_id, records):
+        calls.append([(record.record_id, record.fields) for record in records])
+        return None
+
+    writer._batch_update_records = batch_update
+    if batch_size is not None:
+        writer.BATCH_UPDATE_SIZE = batch_size
+    return writer, calls
+
+
+def test_duplicate_video_ids_are_deduplicated_by_record_id_keeping_last():
+    writer, calls = make_writer({"v1": "rec_1", "v2": "rec_2"})
+    scores = [make_score("v1", 3), make_score("v2", 5), make_score("v1", 9)]
+
+    result = writer.batch_update_video_scores("app", "tbl", scores, {}, bulk=True)
+
+    assert len(calls) == 1
+    record_ids = [record_id for record_id, _ in calls[0]]
+    assert sorted(record_ids) == ["rec_1", "rec_2"]
+    assert dict(calls[0])["rec_1"] == {"fld_score": 9}
+
+    assert result["total"] == 3
+    assert result["success"] == 3
+    assert result["results"][0]["superseded"] is True
+    assert "superseded" not in result["results"][2]
+
+
+def test_different_video_ids_sharing_a_record_never_share_a_chunk():
+    # 两个视频编号解析到同一条记录，且分块边界落在两者之间
+    writer, calls = make_writer({"v1": "rec_1", "v2": "rec_2", "v3": "rec_1"}, batch_size=2)
+    scores = [make_score("v1", 2), make_score("v2", 4), make_score("v3", 6)]
+
+    writer.batch_update_video_scores("app", "tbl", scores, {}, bulk=True)
+
+    written = [record_id for chunk in calls for record_id, _ in chunk]
+    assert sorted(written) == ["rec_1", "rec_2"]
+    for chunk in calls:
+        ids = [record_id for record_id, _ in chunk]
+        assert len(ids) == len(set(ids))
+    assert {record_id: fields for chunk in calls for record_id, fields in chunk}["rec_1"] == {"fld_score": 6}
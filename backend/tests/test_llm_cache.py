@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 结果缓存：命中时不立即写库，访问时间按间隔批量写回
+"""
+import time
+
+from services.llm_cache import LLMResultCache
+
+
+def test_hits_defer_access_time_writes(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = LLMResultCache(str(tmp_path / "llm_cache.sqlite3"), ttl_seconds=3600, max_bytes=1024 * 1024)
+    cache.ACCESS_FLUSH_INTERVAL = 1000
+    cache.set("key", "matrix", {"score": 8})
+    written_at = now[0]
+
+    def stored_last_access():
+        return cache._conn.execute("SELECT last_access FROM entries WHERE key = 'key'").fetchone()[0]
+
+    now[0] += 10
+    assert cache.get("key") == {"score": 8}
+    assert stored_last_access() == written_at
+    assert cache.get("missing") is None
+    assert cache.get_stats()["hits"] == 1
+
+    # 到达写回间隔后一次写入
+    cache.ACCESS_FLUSH_INTERVAL = 0
+    now[0] += 10
+    cache.get("key")
+    assert stored_last_access() == now[0]
+
+
+def test_expired_entries_miss_without_writing(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = LLMResultCache(str(tmp_path / "llm_cache.sqlite3"), ttl_seconds=60, max_bytes=1024 * 1024)
+    cache.set("key", "matrix", {"score": 8})
+
+    now[0] += 61
+    assert cache.get("key") is None
+    # 过期条目留给淘汰时清理
+    assert cache.get_stats()["entries"] == 1
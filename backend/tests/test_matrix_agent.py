@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+MatrixAdvisor：结果缓存（只缓存完整结果、单个 / 多任务模板分开版本）与同步入口的事件循环保护
+"""
+import asyncio
+
+import pytest
+
+from services.matrix_agent import MatrixAdvisor
+
+
+def make_advisor(response):
+    advisor = MatrixAdvisor()
+    stored = []
+
+    async def call_llm(prompt, expected_completion_tokens):
+        return response
+
+    advisor._call_llm_async = call_llm
+    advisor._store_analysis = lambda task, analysis, prompt: stored.append((task["id"], prompt))
+    return advisor, stored
+
+
+def make_task(task_id: str) -> dict:
+    return {"id": task_id, "title": f"视频{task_id}", "views": 100}
+
+
+def test_single_result_with_defaults_is_not_cached():
+    advisor, stored = make_advisor({"score": 7})
+
+    analysis = asyncio.run(advisor._think_async(make_task("t1")))
+
+    assert analysis["advice"] == "暂无建议"
+    assert stored == []
+
+
+def test_batch_caches_only_complete_results():
+    advisor, stored = make_advisor({"results": [
+        {"id": "t1", "score": 8, "advice": "建议", "reasoning": "理由"},
+        {"id": "t2", "score": 6, "reasoning": "理由"},
+    ]})
+
+    results = asyncio.run(advisor._think_batch_async([make_task("t1"), make_task("t2")]))
+
+    assert [result["score"] for result in results] == [8, 6]
+    assert stored == [("t1", "batch")]
+
+
+def test_single_and_batch_prompts_use_separate_cache_keys():
+    advisor = MatrixAdvisor()
+    task = make_task("t1")
+
+    assert advisor._cache_key(task, "single") != advisor._cache_key(task, "batch")
+
+
+def test_sync_entry_rejects_running_event_loop():
+    advisor = MatrixAdvisor()
+
+    async def call_sync_entry():
+        advisor.analyze_schedule([make_task("t1")])
+
+    with pytest.raises(RuntimeError, match="analyze_schedule_async"):
+        asyncio.run(call_sync_entry())
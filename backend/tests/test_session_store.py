@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+复盘会话存储：内存 / SQLite / Redis（本地替身）的读写往返、空闲过期与淘汰
+"""
+import json
+import time
+import asyncio
+import fnmatch
+import sqlite3
+
+import pytest
+
+from models.review import AgentType, ReviewMessage, ReviewSummary
+from models.video_record import VideoRecord, json_default
+from services.review.manager import ReviewSession
+from services.review.session_store import MemorySessionStore, SQLiteSessionStore, RedisSessionStore
+
+
+class FakeClock:
+    """可手动推进的 time.time 替身"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeRedis:
+    """Redis 客户端替身：只实现 RedisSessionStore 用到的 get / set(ex=) / expire / delete / scan_iter / transaction"""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.data = {}
+        self.expires_at = {}
+
+    def _alive(self, key):
+        if key in self.expires_at and self.clock() >= self.expires_at[key]:
+            self.data.pop(key, None)
+            self.expires_at.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key].encode("utf-8") if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        if ex is not None:
+            self.expires_at[key] = self.clock() + ex
+
+    def expire(self, key, seconds):
+        if self._alive(key):
+            self.expires_at[key] = self.clock() + seconds
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.expires_at.pop(key, None)
+
+    def scan_iter(self, match="*", count=None):
+        return [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatch(key, match)]
+
+    def transaction(self, func, *watches):
+        # 单线程替身：WATCH 期间不会有其他写入，直接以自身作为 pipeline 执行一次
+        func(self)
+
+    def multi(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+
+def make_session(review_id: str, videos: int = 3) -> ReviewSession:
+    context = {
+        "date": "2026-10-18",
+        "videos": [
+            VideoRecord(f"rec_{i}", f"视频{i}", "账号A", read_count=i * 100, full_play_rate=85.5,
+                        full_play_rate_text="85.5%", publish_ms=1_760_000_000_000)
+            for i in range(videos)
+        ],
+    }
+    session = ReviewSession(review_id, context, {"analyst": "自定义提示词"})
+    session.content_cache[AgentType.ANALYST] = "分析内容"
+    session.set_agent_status(AgentType.ANALYST, "completed")
+    return session
+
+
+# ==================== 内存 ====================
+
+def test_memory_round_trip_and_idle_expiry(clock):
+    store = MemorySessionStore(idle_ttl=60)
+    session = make_session("rev_1")
+    store.save("rev_1", session)
+
+    assert store.get("rev_1") is session
+    clock.advance(59)
+    assert store.get("rev_1") is session  # 读取刷新访问时间
+    clock.advance(61)
+    assert store.get("rev_1") is None
+    assert store.get_metrics()["expired"] == 1
+
+
+def test_memory_evicts_least_recently_used_beyond_max_sessions(clock):
+    evicted = []
+    store = MemorySessionStore(max_sessions=2, on_evict=evicted.append)
+    sessions = {review_id: make_session(review_id) for review_id in ("rev_1", "rev_2", "rev_3")}
+
+    store.save("rev_1", sessions["rev_1"])
+    clock.advance(1)
+    store.save("rev_2", sessions["rev_2"])
+    clock.advance(1)
+    store.get("rev_1")
+    clock.advance(1)
+    asyncio.run(store.save_async("rev_3", sessions["rev_3"]))
+
+    assert "rev_2" not in store
+    assert evicted == [sessions["rev_2"]]
+    assert store.get("rev_1") is sessions["rev_1"]
+    assert store.get("rev_3") is sessions["rev_3"]
+
+
+# ==================== SQLite ====================
+
+def make_sqlite_store(tmp_path, **kwargs) -> SQLiteSessionStore:
+    return SQLiteSessionStore(
+        str(tmp_path / "sessions.db"), ReviewSession.from_dict, merge=ReviewSession.merge_data, **kwargs
+    )
+
+
+def make_message(message_id: str, timestamp: int) -> ReviewMessage:
+    return ReviewMessage(id=message_id, agent=AgentType.ANALYST, content=message_id, timestamp=timestamp)
+
+
+def assert_stale_save_keeps_other_workers_fields(store) -> None:
+    """两个 worker 各持有一份会话：持有旧快照的一方保存时不应覆盖另一方写入的回答和总结"""
+    generating = make_session("rev_1")
+    asyncio.run(store.save_async("rev_1", generating))
+    answering = store.get("rev_1")
+
+    answering.messages.append(make_message("msg_answer", 200))
+    answering.summary = ReviewSummary(keyInsights=["洞察"], actionItems=[])
+    asyncio.run(store.save_async("rev_1", answering))
+
+    generating.messages.append(make_message("msg_generated", 100))
+    generating.set_agent_status(AgentType.HACKER, "generating")
+    merged = asyncio.run(store.save_async("rev_1", generating))
+    generating.merge_state(merged)
+
+    loaded = store.get("rev_1")
+    assert [message.id for message in loaded.messages] == ["msg_generated", "msg_answer"]
+    assert loaded.summary is not None
+    assert loaded.get_agent_status(AgentType.HACKER) == "generating"
+    # 合并结果同步回本地会话：生成方不会再重复生成总结
+    assert generating.summary is not None
+    assert [message.id for message in generating.messages] == ["msg_generated", "msg_answer"]
+
+
+def test_sqlite_round_trip(tmp_path, clock):
+    store = make_sqlite_store(tmp_path)
+    session = make_session("rev_1")
+    store.save("rev_1", session)
+
+    loaded = store.get("rev_1")
+    assert loaded is not session
+    # 上下文中的视频还原为 VideoRecord，原始文本原样保留
+    videos = loaded.context["videos"]
+    assert all(isinstance(video, VideoRecord) for video in videos)
+    assert [video.read_count for video in videos] == [0, 100, 200]
+    assert videos[0].to_dict() == session.context["videos"][0].to_dict()
+    assert videos[0].to_dict()["fullPlayRate"] == "85.5%"
+    assert loaded.content_cache == session.content_cache
+    assert store.get("missing") is None
+
+
+def test_sqlite_async_save_writes_context_once(tmp_path, clock):
+    store = make_sqlite_store(tmp_path)
+    session = make_session("rev_1")
+
+    asyncio.run(store.save_async("rev_1", session))
+
+    # 之后的保存只更新内容和消息，上下文列保持不变
+    session.context["videos"].append(VideoRecord("rec_x", "不应写入"))
+    session.content_cache[AgentType.HACKER] = "增长建议"
+    asyncio.run(store.save_async("rev_1", session))
+
+    loaded = store.get("rev_1")
+    assert loaded.content_cache[AgentType.HACKER] == "增长建议"
+    assert [video.name for video in loaded.context["videos"]] == ["视频0", "视频1", "视频2"]
+
+
+def test_sqlite_stale_save_is_merged(tmp_path, clock):
+    assert_stale_save_keeps_other_workers_fields(make_sqlite_store(tmp_path))
+
+
+def test_sqlite_merge_keeps_latest_agent_heartbeat(tmp_path, clock):
+    store = make_sqlite_store(tmp_path)
+    generating = make_session("rev_1")
+    generating.agent_heartbeat[AgentType.HACKER] = clock()
+    store.save("rev_1", generating)
+    follower = store.get("rev_1")
+
+    # 生成方刷新心跳后，持有旧心跳的一方保存不应把心跳回退
+    clock.advance(10)
+    generating.agent_heartbeat[AgentType.HACKER] = clock()
+    store.save("rev_1", generating)
+    store.save("rev_1", follower)
+
+    assert store.get_state("rev_1")["agent_heartbeat"] == {"hacker": clock()}
+
+
+def test_sqlite_rewrites_context_when_row_was_evicted(tmp_path, clock):
+    store = make_sqlite_store(tmp_path)
+    session = make_session("rev_1")
+    store.save("rev_1", session)
+    store.remove("rev_1")
+
+    store.save("rev_1", session)
+
+    assert [video.name for video in store.get("rev_1").context["videos"]] == ["视频0", "视频1", "视频2"]
+
+
+def test_sqlite_reads_rows_written_before_context_column(tmp_path, clock):
+    path = tmp_path / "sessions.db"
+    session = make_session("rev_old")
+    data = json.dumps(session.to_dict(), ensure_ascii=False, default=json_default)
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE sessions (review_id TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, "
+        "updated_at REAL NOT NULL, last_access REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)", ("rev_old", data, len(data), clock(), clock()))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteSessionStore(str(path), ReviewSession.from_dict, merge=ReviewSession.merge_data)
+
+    loaded = store.get("rev_old")
+    assert [video.name for video in loaded.context["videos"]] == ["视频0", "视频1", "视频2"]
+    assert loaded.content_cache == session.content_cache
+
+
+def test_sqlite_idle_expiry(tmp_path, clock):
+    store = make_sqlite_store(tmp_path, idle_ttl=60)
+    store.save("rev_1", make_session("rev_1"))
+    store.save("rev_2", make_session("rev_2"))
+
+    clock.advance(30)
+    assert store.get("rev_1") is not None
+    clock.advance(45)
+
+    assert store.get("rev_2") is None
+    metrics = store.get_metrics()
+    assert metrics["sessions"] == 1
+    assert metrics["expired"] == 1
+    clock.advance(61)
+    assert store.get("rev_1") is None
+
+
+def test_sqlite_reads_defer_access_time_writes(tmp_path, clock):
+    store = make_sqlite_store(tmp_path, idle_ttl=60)
+    store.ACCESS_FLUSH_INTERVAL = 1000
+    store.save("rev_1", make_session("rev_1"))
+    saved_at = clock()
+
+    def stored_last_access():
+        return store._conn.execute("SELECT last_access FROM sessions WHERE review_id = 'rev_1'").fetchone()[0]
+
+    clock.advance(50)
+    assert asyncio.run(store.get_async("rev_1")) is not None
+    assert asyncio.run(store.get_state_async("rev_1"))["content_cache"] == {"analyst": "分析内容"}
+    # 读取不立即写库，但过期判断使用内存中的访问时间
+    assert stored_last_access() == saved_at
+    clock.advance(50)
+    assert store.get_state("rev_1") is not None
+    assert stored_last_access() == saved_at
+
+    # 到达批量写入间隔后一次写入
+    store.ACCESS_FLUSH_INTERVAL = 0
+    store.get_state("rev_1")
+    assert stored_last_access() == clock()
+
+
+def test_sqlite_evicts_least_recently_accessed_beyond_max_bytes(tmp_path, clock):
+    store = make_sqlite_store(tmp_path, max_bytes=1)
+    for review_id in ("rev_1", "rev_2", "rev_3"):
+        store.save(review_id, make_session(review_id, videos=50))
+        clock.advance(1)
+    store.get("rev_1")
+
+    metrics = store.get_metrics()
+
+    # 超出上限时至少保留最近访问的会话
+    assert metrics["sessions"] == 1
+    assert metrics["evicted"] == 2
+    assert store.get("rev_1") is not None
+    assert store.get("rev_2") is None
+
+
+# ==================== Redis（本地替身） ====================
+
+def test_redis_round_trip_and_remove(clock):
+    store = RedisSessionStore(FakeRedis(clock), ReviewSession.from_dict, idle_ttl=60, merge=ReviewSession.merge_data)
+    session = make_session("rev_1")
+    asyncio.run(store.save_async("rev_1", session))
+
+    loaded = store.get("rev_1")
+    assert [video.name for video in loaded.context["videos"]] == ["视频0", "视频1", "视频2"]
+    assert loaded.messages == session.messages
+    assert store.get_metrics()["sessions"] == 1
+
+    store.remove("rev_1")
+    assert store.get("rev_1") is None
+
+
+def test_redis_idle_expiry_is_renewed_on_read(clock):
+    store = RedisSessionStore(FakeRedis(clock), ReviewSession.from_dict, idle_ttl=60, merge=ReviewSession.merge_data)
+    store.save("rev_1", make_session("rev_1"))
+
+    clock.advance(50)
+    assert store.get("rev_1") is not None
+    clock.advance(50)
+    assert store.get("rev_1") is not None
+    clock.advance(61)
+
+    assert store.get("rev_1") is None
+    assert store.get_metrics()["sessions"] == 0
+
+
+def test_redis_stale_save_is_merged(clock):
+    store = RedisSessionStore(FakeRedis(clock), ReviewSession.from_dict, merge=ReviewSession.merge_data)
+    assert_stale_save_keeps_other_workers_fields(store)
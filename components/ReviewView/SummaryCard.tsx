@@ -71,6 +71,22 @@ export const SummaryCard: React.FC<SummaryCardProps> = ({
         </div>
       </div>
 
+      {/* 数据读取提示（部分分组读取失败 / Mock 数据） */}
+      {summary.warnings && summary.warnings.length > 0 && (
+        <div className="mb-6 p-3 rounded-xl bg-amber-50 border border-amber-200">
+          <h4 className="text-sm font-bold mb-2 text-amber-700">
+            ⚠️ 数据不完整
+          </h4>
+          <ul className="space-y-1">
+            {summary.warnings.map((warning, index) => (
+              <li key={index} className="text-xs text-amber-700">
+                • {warning}
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+
       {/* 关键洞察 */}
       <div className="mb-6">
         <h4 className={`text-sm font-bold uppercase tracking-wider mb-3 ${isAI ? 'text-indigo-600' : 'text-slate-400'}`}>
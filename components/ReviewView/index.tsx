@@ -180,25 +180,10 @@ export const ReviewView: React.FC<ReviewViewProps> = ({ config }) => {
         { label: '初始化 Agent...', status: 'loading' }
       ]);
 
-      // 轮询检查准备状态
-      const pollStatus = setInterval(async () => {
-        try {
-          const statusResp = await reviewService.getReviewStatus(response.reviewId);
-          setProgress(statusResp.progress);
-
-          if (statusResp.ready) {
-            clearInterval(pollStatus);
-            setStatus('in_progress');
-            setCurrentStage('数据分析');
-            startAgentSequence(response.reviewId);
-          }
-        } catch (err) {
-          console.error('[Review] 轮询状态失败:', err);
-          clearInterval(pollStatus);
-          // 降级到 Mock 模式
-          fallbackToMock();
-        }
-      }, 1000);
+      // Agent 内容在后台生成，SSE 可直接订阅生成中的内容，无需等待预加载完成
+      setStatus('in_progress');
+      setCurrentStage('数据分析');
+      startAgentSequence(response.reviewId);
 
     } catch (err) {
       console.error('[Review] 启动复盘失败，使用 Mock 模式:', err);
@@ -488,22 +473,28 @@ export const ReviewView: React.FC<ReviewViewProps> = ({ config }) => {
         setMessages(prev => [...prev, mockReply]);
       }, 1000);
     } else {
-      // 真实 API：调用后端提问接口
+      // 真实 API：调用后端流式提问接口，回答边生成边显示
+      const replyId = `msg_${Date.now()}_${agentToAsk}`;
+      setMessages(prev => [...prev, {
+        id: replyId,
+        agent: agentToAsk,
+        content: '',
+        timestamp: Date.now(),
+        type: 'text'
+      }]);
+
       try {
-        const response = await reviewService.askQuestion(reviewId, {
-          question,
-          targetAgent: agentToAsk
-        });
-
-        const agentReply: ReviewMessage = {
-          id: `msg_${Date.now()}_${response.agent}`,
-          agent: response.agent,
-          content: response.answer,
-          timestamp: response.timestamp,
-          type: 'text'
-        };
-        setMessages(prev => [...prev, agentReply]);
+        await reviewService.askQuestionStream(
+          reviewId,
+          { question, targetAgent: agentToAsk },
+          (delta) => {
+            setMessages(prev => prev.map(msg =>
+              msg.id === replyId ? { ...msg, content: msg.content + delta } : msg
+            ));
+          }
+        );
       } catch (err) {
+        setMessages(prev => prev.filter(msg => msg.id !== replyId || msg.content));
         console.error('[Review] 提问失败:', err);
         toast.error('提问失败，请重试');
       }
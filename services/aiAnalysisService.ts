@@ -43,6 +43,19 @@ export interface AIAnalysisResponse {
   results?: VideoScore[];
 }
 
+export interface AnalysisTaskStatus {
+  task_id: string;
+  status: 'queued' | 'analyzing' | 'completed' | 'error';
+  progress: number;
+  message: string;
+  total_videos: number;
+  videos_scored: number;
+  total_batches: number;
+  batches_done: number;
+  eta_seconds?: number | null;
+  results: VideoScore[];
+}
+
 export interface FeishuWriteRequest {
   app_id: string;
   app_secret: string;
@@ -85,6 +98,11 @@ export async function analyzeVideoContent(videos: VideoItem[]): Promise<AIAnalys
     }
 
     const data: AIAnalysisResponse = await response.json();
+
+    // 后台任务模式：轮询任务状态直到完成
+    if (data.status === 'analyzing' && data.task_id) {
+      return await waitForAnalysis(data.task_id);
+    }
     return data;
   } catch (error) {
     console.error('[AI Analysis Service] 分析失败:', error);
@@ -92,6 +110,24 @@ export async function analyzeVideoContent(videos: VideoItem[]): Promise<AIAnalys
   }
 }
 
+/**
+ * 轮询分析任务直到完成，返回与同步接口一致的结构
+ */
+async function waitForAnalysis(taskId: string, intervalMs: number = 2000): Promise<AIAnalysisResponse> {
+  while (true) {
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+    const status: AnalysisTaskStatus = await getAnalysisStatus(taskId);
+    console.log(`[AI Analysis Service] 任务 ${taskId}: ${status.message} (${status.videos_scored}/${status.total_videos})`);
+
+    if (status.status === 'completed') {
+      return { status: 'success', message: status.message, task_id: taskId, results: status.results };
+    }
+    if (status.status === 'error') {
+      return { status: 'error', message: status.message, task_id: taskId, results: status.results };
+    }
+  }
+}
+
 /**
  * 将 AI 分析结果写入飞书表格
  */
@@ -140,9 +176,9 @@ export async function writeScoresToFeishu(request: FeishuWriteRequest): Promise<
 }
 
 /**
- * 查询分析任务状态（预留接口）
+ * 查询分析任务状态
  */
-export async function getAnalysisStatus(taskId: string): Promise<any> {
+export async function getAnalysisStatus(taskId: string): Promise<AnalysisTaskStatus> {
   try {
     const response = await fetch(`${API_BASE_URL}/api/analyze/status/${taskId}`);
 
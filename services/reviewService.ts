@@ -30,6 +30,7 @@ export interface StartReviewResponse {
   dataSummary: DataSummary;
   agents: string[];
   estimatedTime: number;
+  warnings?: string[];  // 数据读取提示（读取失败的分组、Mock 数据等）
 }
 
 export interface ReviewStatusResponse {
@@ -48,6 +49,7 @@ export interface AskQuestionResponse {
   agent: string;
   answer: string;
   timestamp: number;
+  promptTokens?: number;
 }
 
 export interface ActionItem {
@@ -72,6 +74,7 @@ export interface ReviewSummary {
   keyInsights: string[];
   actionItems: ActionItem[];
   hypotheses: string[];
+  warnings?: string[];  // 非空时本次复盘基于不完整的数据
 }
 
 export interface SummarizeResponse {
@@ -156,6 +159,66 @@ export async function askQuestion(
   }
 }
 
+/**
+ * 用户提问（SSE 流式输出）
+ *
+ * EventSource 不支持 POST，这里用 fetch 读取响应流并按 SSE 格式解析；
+ * 每收到一段回答调用 onDelta，返回完整回答
+ */
+export async function askQuestionStream(
+  reviewId: string,
+  request: AskQuestionRequest,
+  onDelta: (delta: string) => void
+): Promise<string> {
+  const response = await fetch(`${API_BASE_URL}/api/review/${reviewId}/ask/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(request),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let answer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE 事件以空行分隔
+    const events = buffer.split(/\r?\n\r?\n/);
+    buffer = events.pop() || '';
+
+    for (const rawEvent of events) {
+      let eventName = 'message';
+      const dataLines: string[] = [];
+      for (const line of rawEvent.split(/\r?\n/)) {
+        if (line.startsWith('event:')) eventName = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+      }
+      if (dataLines.length === 0) continue;
+
+      const data = JSON.parse(dataLines.join('\n'));
+      if (eventName === 'error' || data.status === 'error') {
+        throw new Error(data.message || '提问失败');
+      }
+      if (data.content_delta) {
+        answer += data.content_delta;
+        onDelta(data.content_delta);
+      }
+    }
+  }
+
+  return answer;
+}
+
 /**
  * 生成复盘总结
  */
@@ -54,7 +54,7 @@ export interface ReviewHistory {
   date: string;
   summary: ReviewSummary;
   hypotheses: string[];
-  validatedHypotheses: Array<{
+  validatedHypotheses?: Array<{
     hypothesis: string;
     result: 'proven' | 'disproven' | 'inconclusive';
     evidence: string;
@@ -65,6 +65,7 @@ export interface ReviewSummary {
   keyInsights: string[];
   actionItems: ActionItem[];
   hypotheses: string[];
+  warnings?: string[];  // 非空时本次复盘基于不完整的数据
 }
 
 // Agent 上下文（包含视频详细信息）